@@ -7,6 +7,38 @@
 
 This is a set of modest utilities that may be helpful when talking to
 PostgreSQL.
+
+.. note::
+
+    The functions exported here are imported the first time they are
+    accessed so that importing the package (for example, to get the version)
+    doesn't pay for importing `psycopg2`.
 """
-from .pg import connect, execute, execute_rows, execute_scalar
+from importlib import import_module
 from .version import __version__, __release__
+
+_LAZY = {
+    'connect': 'pg',
+    'execute': 'pg',
+    'execute_rows': 'pg',
+    'execute_scalar': 'pg'
+}  #: maps lazily-imported names to the modules that define them
+
+__all__ = ['__version__', '__release__'] + list(_LAZY)
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+    value = getattr(import_module(f'.{module}', __name__), name)
+    # Cache the value so we don't come back here.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.bench
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains standard workloads for measuring throughput and latency
+against a database instance.  (The `normanpg bench` command uses it.)
+"""
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List
+import psycopg2.extensions
+import psycopg2.extras
+from .constants import (
+    BENCH_WORKLOADS, DEFAULT_BENCH_BATCH_SIZE, DEFAULT_BENCH_SCAN_ROWS
+)
+from .pg import connect, execute, execute_rows, execute_scalar
+
+#: the default number of rows per scan
+DEFAULT_SCAN_ROWS: int = DEFAULT_BENCH_SCAN_ROWS
+#: the default number of rows per write
+DEFAULT_BATCH_SIZE: int = DEFAULT_BENCH_BATCH_SIZE
+
+
+class BenchParams:
+    """
+    These are the parameters that shape the workloads.
+    """
+    def __init__(
+            self,
+            scan_rows: int = DEFAULT_SCAN_ROWS,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            table: str = None,
+            schema: str = None
+    ):
+        """
+
+        :param scan_rows: the number of rows returned by each scan
+        :param batch_size: the number of rows in each bulk write
+        :param table: the feature table used for metadata lookups
+        :param schema: the schema in which the feature table resides
+        """
+        self.scan_rows = scan_rows
+        self.batch_size = batch_size
+        self.table = table
+        self.schema = schema
+
+
+class Workload:
+    """
+    A workload is a single operation that is repeated for the duration of a
+    benchmark.
+    """
+    def __init__(
+            self,
+            name: str,
+            description: str,
+            run: Callable[[psycopg2.extensions.connection, BenchParams], int],
+            setup: Callable[
+                [psycopg2.extensions.connection, BenchParams], None
+            ] = None
+    ):
+        """
+
+        :param name: the workload name
+        :param description: a short description
+        :param run: performs one operation on a connection and returns the
+            number of rows read or written
+        :param setup: prepares a connection (once) before the operations
+            begin
+        """
+        self.name = name
+        self.description = description
+        self.run = run
+        self.setup = setup
+
+
+def _scalar(cnx: psycopg2.extensions.connection, _: BenchParams) -> int:
+    execute_scalar(cnx=cnx, query='SELECT 1', caller='bench.scalar')
+    return 1
+
+
+def _scan(cnx: psycopg2.extensions.connection, params: BenchParams) -> int:
+    rows = 0
+    for _ in execute_rows(
+            cnx=cnx,
+            query=f'SELECT g AS id, md5(g::text) AS val '
+                  f'FROM generate_series(1, {int(params.scan_rows)}) AS g',
+            caller='bench.scan'
+    ):
+        rows += 1
+    return rows
+
+
+def _setup_write(cnx: psycopg2.extensions.connection, _: BenchParams):
+    execute(
+        cnx=cnx,
+        query='CREATE TEMPORARY TABLE IF NOT EXISTS normanpg_bench '
+              '(id integer, val text)',
+        caller='bench.write'
+    )
+
+
+def _write(cnx: psycopg2.extensions.connection, params: BenchParams) -> int:
+    with cnx.cursor() as crs:
+        psycopg2.extras.execute_values(
+            crs,
+            'INSERT INTO normanpg_bench (id, val) VALUES %s',
+            ((i, f'value {i}') for i in range(params.batch_size)),
+            page_size=params.batch_size
+        )
+    execute(cnx=cnx, query='TRUNCATE normanpg_bench', caller='bench.write')
+    return params.batch_size
+
+
+def _setup_srid(_: psycopg2.extensions.connection, params: BenchParams):
+    if not params.table:
+        raise ValueError('The srid workload requires a table.')
+
+
+def _srid(cnx: psycopg2.extensions.connection, params: BenchParams) -> int:
+    # pylint: disable=import-outside-toplevel
+    from .functions.tables import srid
+    srid(cnx=cnx, table_name=params.table, schema_name=params.schema)
+    return 1
+
+
+# (The CLI lists the workloads without importing this module, so their
+# names and order come from the constants.)
+WORKLOADS: Dict[str, Workload] = {
+    w.name: w for w in sorted(
+        [
+            Workload('scalar', 'scalar round trips (SELECT 1)', _scalar),
+            Workload('scan', 'streaming execute_rows scans', _scan),
+            Workload('write', 'bulk writes to a temporary table', _write,
+                     setup=_setup_write),
+            Workload('srid', 'metadata lookups (srid)', _srid,
+                     setup=_setup_srid)
+        ],
+        key=lambda w: BENCH_WORKLOADS.index(w.name)
+    )
+}  #: the standard workloads, indexed by name
+
+
+def percentile(values: List[float], p: float) -> float or None:
+    """
+    Get a percentile from a sorted list of values (by the nearest-rank
+    method).
+
+    :param values: the sorted values
+    :param p: the percentile (between 0 and 100)
+    :return: the percentile, or `None` if there are no values
+    """
+    if not values:
+        return None
+    rank = max(int(round(p / 100.0 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def max_rss() -> int:
+    """
+    Get the peak resident set size of this process.
+
+    :return: the peak RSS (in bytes)
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, but macOS reports bytes.
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class BenchResult:
+    """
+    The result of running a workload.
+    """
+    def __init__(
+            self,
+            workload: str,
+            concurrency: int,
+            elapsed: float,
+            latencies: Iterable[float],
+            rows: int,
+            errors: int
+    ):
+        """
+
+        :param workload: the workload name
+        :param concurrency: the number of concurrent workers
+        :param elapsed: the wall-clock duration (in seconds)
+        :param latencies: the latency of each operation (in seconds)
+        :param rows: the total number of rows read or written
+        :param errors: the number of failed operations
+        """
+        self.workload = workload
+        self.concurrency = concurrency
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+        self.rows = rows
+        self.errors = errors
+        self.rss = max_rss()
+
+    @property
+    def ops(self) -> int:
+        """
+        Get the number of completed operations.
+        """
+        return len(self.latencies)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the result as a dictionary.
+        """
+        elapsed = self.elapsed if self.elapsed > 0 else float('nan')
+        return {
+            'workload': self.workload,
+            'concurrency': self.concurrency,
+            'seconds': round(self.elapsed, 3),
+            'ops': self.ops,
+            'errors': self.errors,
+            'ops_per_sec': round(self.ops / elapsed, 1),
+            'rows_per_sec': round(self.rows / elapsed, 1),
+            'p50_ms': _ms(percentile(self.latencies, 50)),
+            'p95_ms': _ms(percentile(self.latencies, 95)),
+            'p99_ms': _ms(percentile(self.latencies, 99)),
+            'rss_mb': round(self.rss / (1024 * 1024), 1)
+        }
+
+
+def _ms(seconds: float or None) -> float or None:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def run_workload(
+        url: str,
+        workload: str,
+        concurrency: int = 1,
+        duration: float = 10.0,
+        params: BenchParams = None
+) -> BenchResult:
+    """
+    Run a workload for a period of time.
+
+    :param url: the database URL
+    :param workload: the name of the workload
+    :param concurrency: the number of concurrent workers (each with its own
+        connection)
+    :param duration: the number of seconds to run
+    :param params: the workload parameters
+    :return: the result
+    """
+    _workload = WORKLOADS[workload]
+    _params = params if params else BenchParams()
+    latencies: List[float] = []
+    totals = {'rows': 0, 'errors': 0}
+    lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+    failures: List[Exception] = []
+
+    def _worker():
+        _latencies = []
+        rows = 0
+        errors = 0
+        try:
+            cnx = connect(url=url, autocommit=True)
+        except psycopg2.Error as ex:
+            failures.append(ex)
+            ready.abort()
+            return
+        try:
+            if _workload.setup:
+                try:
+                    _workload.setup(cnx, _params)
+                except Exception as ex:  # pylint: disable=broad-except
+                    failures.append(ex)
+                    ready.abort()
+                    return
+            ready.wait()
+            deadline = time.perf_counter() + duration
+            while True:
+                started = time.perf_counter()
+                if started >= deadline:
+                    break
+                try:
+                    rows += _workload.run(cnx, _params)
+                except psycopg2.Error:
+                    errors += 1
+                    continue
+                _latencies.append(time.perf_counter() - started)
+        except threading.BrokenBarrierError:
+            return
+        finally:
+            cnx.close()
+        with lock:
+            latencies.extend(_latencies)
+            totals['rows'] += rows
+            totals['errors'] += errors
+
+    threads = [
+        threading.Thread(target=_worker, daemon=True)
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        ready.wait()
+    except threading.BrokenBarrierError:
+        for thread in threads:
+            thread.join()
+        raise failures[0] if failures else RuntimeError(
+            'The benchmark workers failed to start.'
+        )
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return BenchResult(
+        workload=workload,
+        concurrency=concurrency,
+        elapsed=time.perf_counter() - started,
+        latencies=latencies,
+        rows=totals['rows'],
+        errors=totals['errors']
+    )
@@ -17,9 +17,14 @@ can be used as a handy facility for running the task from a command line.
     To learn more about running Luigi, visit the Luigi project's
     `Read-The-Docs <http://luigi.readthedocs.io/en/stable/>`_ page.
 """
+import json
 import logging
 import click
-from .__init__ import __version__
+from .constants import (
+    BENCH_WORKLOADS, DEFAULT_BENCH_BATCH_SIZE, DEFAULT_BENCH_SCAN_ROWS,
+    MEMORY_SORT_KEYS
+)
+from .version import __version__
 
 LOGGING_LEVELS = {
     0: logging.NOTSET,
@@ -87,3 +92,202 @@ def version():
     Get the library version.
     """
     click.echo(click.style(f'{__version__}', bold=True))
+
+
+@cli.command()
+@click.argument('url')
+@click.option(
+    '--workload', '-w', 'workloads',
+    multiple=True,
+    type=click.Choice(BENCH_WORKLOADS),
+    help='Run this workload.  (May be repeated.  The default is all the '
+         'workloads that need no table.)'
+)
+@click.option(
+    '--concurrency', '-c', default=1, show_default=True,
+    help='the number of concurrent connections'
+)
+@click.option(
+    '--duration', '-d', default=10.0, show_default=True,
+    help='the number of seconds to run each workload'
+)
+@click.option(
+    '--scan-rows', default=DEFAULT_BENCH_SCAN_ROWS, show_default=True,
+    help='the number of rows returned by each scan'
+)
+@click.option(
+    '--batch-size', default=DEFAULT_BENCH_BATCH_SIZE, show_default=True,
+    help='the number of rows in each bulk write'
+)
+@click.option('--table', help='the feature table for metadata lookups')
+@click.option('--schema', help='the schema of the feature table')
+@click.option('--json', 'as_json', is_flag=True, help='Report as JSON.')
+@pass_info
+def bench(
+        _: Info,
+        url: str,
+        workloads,
+        concurrency: int,
+        duration: float,
+        scan_rows: int,
+        batch_size: int,
+        table: str,
+        schema: str,
+        as_json: bool
+):
+    """
+    Benchmark throughput and latency against a database URL.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .bench import BenchParams, run_workload
+    _workloads = workloads if workloads else [
+        w for w in BENCH_WORKLOADS if w != 'srid' or table
+    ]
+    params = BenchParams(
+        scan_rows=scan_rows,
+        batch_size=batch_size,
+        table=table,
+        schema=schema
+    )
+    results = [
+        run_workload(
+            url=url,
+            workload=workload,
+            concurrency=concurrency,
+            duration=duration,
+            params=params
+        ).to_dict()
+        for workload in _workloads
+    ]
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+        return
+    columns = list(results[0].keys()) if results else []
+    widths = [
+        max([len(c)] + [len(str(r[c])) for r in results]) for c in columns
+    ]
+    click.echo(
+        click.style(
+            '  '.join(c.ljust(w) for c, w in zip(columns, widths)),
+            bold=True
+        )
+    )
+    for result in results:
+        click.echo(
+            '  '.join(str(result[c]).ljust(w) for c, w in zip(columns, widths))
+        )
+
+
+def _parse_bbox(_, __, value: str):
+    """
+    Parse a `minx,miny,maxx,maxy` bounding box option.
+    """
+    if value is None:
+        return None
+    try:
+        bbox = tuple(float(v) for v in value.split(','))
+    except ValueError:
+        raise click.BadParameter('The bounding box must contain numbers.')
+    if len(bbox) != 4:
+        raise click.BadParameter(
+            'The bounding box must be minx,miny,maxx,maxy.'
+        )
+    return bbox
+
+
+@cli.command('seed-tiles')
+@click.argument('url')
+@click.argument('table')
+@click.option('--schema', default='public', show_default=True,
+              help='the schema of the table')
+@click.option('--cache-dir', required=True,
+              type=click.Path(file_okay=False),
+              help='the root directory of the tile cache')
+@click.option('--min-zoom', default=0, show_default=True,
+              help='the minimum zoom level')
+@click.option('--max-zoom', default=10, show_default=True,
+              help='the maximum zoom level')
+@click.option('--bbox', callback=_parse_bbox,
+              help='limit the tiles to this minlon,minlat,maxlon,maxlat box')
+@click.option('--column', '-c', 'columns', multiple=True,
+              help='Include this attribute column.  (May be repeated.)')
+@click.option('--layer', help='the layer name (The default is the table.)')
+@click.option('--workers', '-w', default=4, show_default=True,
+              help='the number of concurrent connections')
+@pass_info
+def seed_tiles(
+        _: Info,
+        url: str,
+        table: str,
+        schema: str,
+        cache_dir: str,
+        min_zoom: int,
+        max_zoom: int,
+        bbox,
+        columns,
+        layer: str,
+        workers: int
+):
+    """
+    Pre-render vector tiles for a range of zoom levels into a tile cache.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .tiles import DiskTileCache, lonlat_bbox_to_mercator, TileSource
+    source = TileSource(
+        url=url,
+        table_name=table,
+        schema_name=schema,
+        columns=columns,
+        layer=layer,
+        cache=DiskTileCache(cache_dir)
+    )
+    count = source.seed(
+        min_zoom=min_zoom,
+        max_zoom=max_zoom,
+        bbox=lonlat_bbox_to_mercator(bbox) if bbox else None,
+        workers=workers
+    )
+    click.echo(f'Rendered {count} tiles for the {source.layer} layer.')
+
+
+@cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--top', '-n', default=10, show_default=True,
+              help='the number of callers to list')
+@click.option('--sort', '-s', 'key', default='peak_bytes',
+              show_default=True, type=click.Choice(MEMORY_SORT_KEYS),
+              help='the statistic by which callers are ranked')
+@click.option('--json', 'as_json', is_flag=True, help='Report as JSON.')
+@pass_info
+def memory(
+        _: Info,
+        path: str,
+        top: int,
+        key: str,
+        as_json: bool
+):
+    """
+    List the callers that use the most memory (from a memory tracking report
+    file).
+    """
+    # pylint: disable=import-outside-toplevel
+    from .memory import rank, read_report
+    results = rank(read_report(path), n=top, key=key)
+    if as_json:
+        click.echo(json.dumps(results, indent=2))
+        return
+    columns = [c for c in MEMORY_SORT_KEYS if c != key]
+    columns = ['caller', key] + columns
+    widths = [
+        max([len(c)] + [len(str(r[c])) for r in results]) for c in columns
+    ]
+    click.echo(
+        click.style(
+            '  '.join(c.ljust(w) for c, w in zip(columns, widths)),
+            bold=True
+        )
+    )
+    for result in results:
+        click.echo(
+            '  '.join(str(result[c]).ljust(w) for c, w in zip(columns, widths))
+        )
@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.constants
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains the constants the command-line interface shares with the
+modules it loads lazily.  (It mustn't import anything, so the CLI can import
+it cheaply.)
+"""
+
+#: the names of the standard benchmark workloads (in the order they run)
+BENCH_WORKLOADS = ('scalar', 'scan', 'write', 'srid')
+DEFAULT_BENCH_SCAN_ROWS: int = 10000  #: the default rows per benchmark scan
+DEFAULT_BENCH_BATCH_SIZE: int = 1000  #: the default rows per benchmark write
+
+#: the statistics by which memory offenders can be ranked
+MEMORY_SORT_KEYS = (
+    'peak_bytes', 'max_rows', 'fetched_bytes', 'max_buffer_rows', 'calls'
+)
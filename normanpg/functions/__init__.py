@@ -7,15 +7,62 @@
 .. moduleauthor:: Pat Daburu <pat@daburu.net>
 
 Within this package are handy functions.
+
+.. note::
+
+    The functions exported here are imported the first time they are
+    accessed.
 """
-from .database import (
-    create_db,
-    create_extension,
-    create_schema,
-    db_exists,
-    parse_dbname,
-    schema_exists,
-    TempSchema,
-    touch_db
-)
-from .tables import geometry_column, srid, table_exists
+from importlib import import_module
+
+_LAZY = {
+    'create_db': 'database',
+    'create_extension': 'database',
+    'create_schema': 'database',
+    'db_exists': 'database',
+    'dbs_exist': 'database',
+    'parse_dbname': 'database',
+    'schema_exists': 'database',
+    'schemas_exist': 'database',
+    'TempSchema': 'database',
+    'touch_db': 'database',
+    'touch_dbs': 'database',
+    'read_features': 'features',
+    'write_features': 'features',
+    'bulk_load': 'loading',
+    'intersecting': 'lookups',
+    'nearest': 'lookups',
+    'provision': 'provisioning',
+    'audit_spatial_indexes': 'tables',
+    'column_types': 'tables',
+    'create_spatial_index': 'tables',
+    'estimated_rows': 'tables',
+    'geometry_column': 'tables',
+    'has_spatial_index': 'tables',
+    'profile_table': 'tables',
+    'sample_rows': 'tables',
+    'spatial_indexes': 'tables',
+    'srid': 'tables',
+    'table_columns': 'tables',
+    'table_exists': 'tables',
+    'tables_exist': 'tables'
+}  #: maps lazily-imported names to the modules that define them
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+    value = getattr(import_module(f'.{module}', __name__), name)
+    # Cache the value so we don't come back here.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
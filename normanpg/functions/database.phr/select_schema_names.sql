@@ -0,0 +1,3 @@
+SELECT schema_name
+FROM information_schema.schemata
+WHERE schema_name = ANY({schemas})
\ No newline at end of file
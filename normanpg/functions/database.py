@@ -10,18 +10,19 @@ This module contains database-level functions.
 """
 import random
 import string
+from typing import Dict, Iterable, List
 from urllib.parse import urlparse, ParseResult
-from phrasebook import SqlPhrasebook
 import psycopg2.extensions
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from psycopg2.sql import Literal, Identifier, SQL
 from ..errors import NormanPgException
+from ..phrasebooks import LazySqlPhrasebook
 from ..pg import (
-    connect, execute, execute_scalar,
+    connect, execute, execute_rows, execute_scalar,
     DEFAULT_ADMIN_DB
 )
 
-_PHRASEBOOK = SqlPhrasebook().load()
+_PHRASEBOOK = LazySqlPhrasebook(__file__)
 
 
 def parse_dbname(url: str) -> str:
@@ -39,7 +40,8 @@ def parse_dbname(url: str) -> str:
 def db_exists(
         url: str,
         dbname: str = None,
-        admindb: str = DEFAULT_ADMIN_DB
+        admindb: str = DEFAULT_ADMIN_DB,
+        timeout: float = None
 ) -> bool:
     """
     Does a given database on a Postgres instance exist?
@@ -47,20 +49,21 @@ def db_exists(
     :param url: the database URL
     :param dbname: the name of the database to test
     :param admindb: the name of an existing (presumably the main) database
+    :param timeout: the number of seconds after which a query is cancelled
     :return: `True` if the database exists, otherwise `False`
     """
     # Figure out what database we're looking for.
     _dbname = dbname if dbname else parse_dbname(url)
 
     # Prepare the query.
-    query = SQL(_PHRASEBOOK.gets('select_db_count')).format(
+    query = _PHRASEBOOK.sql('select_db_count').format(
         dbname=Literal(_dbname)
     )
     # Create a connection to the administrative database.
     with connect(url=url, dbname=admindb) as cnx:
         # The query should return a count of the appearances of the database
         # name in an index table.
-        count = execute_scalar(cnx=cnx, query=query)
+        count = execute_scalar(cnx=cnx, query=query, timeout=timeout)
         try:
             count = int(count)
         except ValueError:
@@ -78,10 +81,88 @@ def db_exists(
         return count == 1
 
 
+def _dbs_exist(
+        cnx: psycopg2.extensions.connection,
+        dbnames: Iterable[str],
+        timeout: float = None
+) -> Dict[str, bool]:
+    """
+    This is a helper function for :py:func:`dbs_exist` that tests for the
+    databases on an open connection.
+
+    :param cnx: an open connection to the administrative database
+    :param dbnames: the names of the databases to test
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a mapping of database names to `True` if the database exists,
+        otherwise `False`
+    """
+    _dbnames = list(dict.fromkeys(dbnames))
+    # If there's nothing to look for, there's no reason to ask.
+    if not _dbnames:
+        return {}
+    # Prepare the query.
+    query = _PHRASEBOOK.sql('select_db_names').format(
+        dbnames=Literal(_dbnames)
+    )
+    # The query returns only the names that appear in the index table.
+    found = {
+        row[0] for row
+        in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    }
+    return {dbname: dbname in found for dbname in _dbnames}
+
+
+def dbs_exist(
+        url: str,
+        dbnames: Iterable[str],
+        admindb: str = DEFAULT_ADMIN_DB,
+        timeout: float = None
+) -> Dict[str, bool]:
+    """
+    Which of a given set of databases on a Postgres instance exist?
+
+    :param url: the database URL
+    :param dbnames: the names of the databases to test
+    :param admindb: the name of an existing (presumably the main) database
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a mapping of database names to `True` if the database exists,
+        otherwise `False`
+
+    .. note::
+
+        All the names are tested with a single query on a single connection.
+    """
+    with connect(url=url, dbname=admindb) as cnx:
+        return _dbs_exist(cnx=cnx, dbnames=dbnames, timeout=timeout)
+
+
+def _create_db(
+        cnx: psycopg2.extensions.connection,
+        dbname: str,
+        timeout: float = None
+):
+    """
+    This is a helper function for :py:func:`create_db` that creates a database
+    using an open connection.
+
+    :param cnx: an open connection to the administrative database
+    :param dbname: the name of the database
+    :param timeout: the number of seconds after which a query is cancelled
+    """
+    # Construct the query.
+    query = _PHRASEBOOK.sql('create_db').format(
+        dbname=Identifier(dbname)
+    )
+    # `CREATE DATABASE` can't run inside a transaction block.
+    cnx.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    execute(cnx=cnx, query=query, timeout=timeout)
+
+
 def create_db(
         url: str,
         dbname: str,
-        admindb: str = DEFAULT_ADMIN_DB
+        admindb: str = DEFAULT_ADMIN_DB,
+        timeout: float = None
 ):
     """
     Create a database on a Postgres instance.
@@ -89,26 +170,20 @@ def create_db(
     :param url: the database URL
     :param dbname: the name of the database
     :param admindb: the name of an existing (presumably the main) database
+    :param timeout: the number of seconds after which a query is cancelled
     """
     # Figure out what database we're looking for.
     _dbname = dbname if dbname else parse_dbname(url)
-    # Construct the query.
-    query = SQL(_PHRASEBOOK.gets('create_db')).format(
-        dbname=Identifier(_dbname)
-    )
     # Let's create the database.
     with connect(url=url, dbname=admindb) as cnx:
-        cnx.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        try:
-            execute(cnx=cnx, query=query)
-        except psycopg2.IntegrityError:
-            raise
+        _create_db(cnx=cnx, dbname=_dbname, timeout=timeout)
 
 
 def create_extension(
         url: str,
         extension: str,
-        dbname: str = None
+        dbname: str = None,
+        timeout: float = None
 ):
     """
     Create (install) an extension in a database.
@@ -116,22 +191,24 @@ def create_extension(
     :param url: the database URL
     :param extension: the name of an existing (presumably the main) database
     :param dbname: the name of the database
+    :param timeout: the number of seconds after which a query is cancelled
     """
     # Figure out what database we're looking for.
     _dbname = dbname if dbname else parse_dbname(url)
     # Construct the query.
-    query = SQL(_PHRASEBOOK.gets('create_extension')).format(
+    query = _PHRASEBOOK.sql('create_extension').format(
         extension=SQL(extension)
     )
     # Create the extension.
     with connect(url=url, dbname=dbname) as cnx:
-        execute(cnx=cnx, query=query)
+        execute(cnx=cnx, query=query, timeout=timeout)
 
 
 def touch_db(
         url: str,
         dbname: str = None,
-        admindb: str = DEFAULT_ADMIN_DB
+        admindb: str = DEFAULT_ADMIN_DB,
+        timeout: float = None
 ):
     """
     Create a database if it does not already exist.
@@ -139,22 +216,53 @@ def touch_db(
     :param url: the database URL
     :param dbname: the name of the database
     :param admindb: the name of an existing (presumably the main) database
+    :param timeout: the number of seconds after which a query is cancelled
     """
-    # If the database already exists, we don't need to do anything further.
-    if db_exists(url=url, dbname=dbname, admindb=admindb):
-        return
-
     # Let's see what we got for the database name.
     _dbname = dbname if dbname else parse_dbname(url)
+    touch_dbs(
+        url=url, dbnames=[_dbname], admindb=admindb, timeout=timeout
+    )
+
+
+def touch_dbs(
+        url: str,
+        dbnames: Iterable[str],
+        admindb: str = DEFAULT_ADMIN_DB,
+        timeout: float = None
+) -> List[str]:
+    """
+    Create any databases in a set that do not already exist.
+
+    :param url: the database URL
+    :param dbnames: the names of the databases
+    :param admindb: the name of an existing (presumably the main) database
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: the names of the databases that were created
+
+    .. note::
 
-    # Now we can create it.
-    create_db(url=url, dbname=_dbname, admindb=admindb)
+        The existence check is a single query and all the databases are
+        created on the same connection to the administrative database.
+    """
+    with connect(url=url, dbname=admindb) as cnx:
+        # Find out which of the databases are missing...
+        missing = [
+            dbname for dbname, exists
+            in _dbs_exist(cnx=cnx, dbnames=dbnames, timeout=timeout).items()
+            if not exists
+        ]
+        # ...and create them.
+        for dbname in missing:
+            _create_db(cnx=cnx, dbname=dbname, timeout=timeout)
+    return missing
 
 
 def create_schema(
         url: str,
         schema: str,
-        dbname: str = None
+        dbname: str = None,
+        timeout: float = None
 ):
     """
     Create a schema in the database.
@@ -162,23 +270,25 @@ def create_schema(
     :param url: the database URL
     :param schema: the name of the schema
     :param dbname: the name of the database
+    :param timeout: the number of seconds after which a query is cancelled
     """
     # Figure out what database we're looking for.
     _dbname = dbname if dbname else parse_dbname(url)
     # Construct the query.
-    query = SQL(_PHRASEBOOK.gets('create_schema')).format(
+    query = _PHRASEBOOK.sql('create_schema').format(
         schema=SQL(schema)
     )
     # Create the schema.
     with connect(url=url, dbname=dbname) as cnx:
-        execute(cnx=cnx, query=query)
+        execute(cnx=cnx, query=query, timeout=timeout)
 
 
 def drop_schema(
         url: str,
         schema: str,
         dbname: str = None,
-        cascade: bool = True
+        cascade: bool = True,
+        timeout: float = None
 ):
     """
     Drop a schema in the database.
@@ -188,23 +298,25 @@ def drop_schema(
     :param dbname: the name of the database
     :param cascade: ``True`` to drop the schema even if it is not empty,
         otherwise the attempt fails
+    :param timeout: the number of seconds after which a query is cancelled
     """
     # Figure out what database we're looking for.
     _dbname = dbname if dbname else parse_dbname(url)
     # Construct the query.
-    query = SQL(_PHRASEBOOK.gets('drop_schema')).format(
+    query = _PHRASEBOOK.sql('drop_schema').format(
         schema=SQL(schema),
         cascade=SQL('CASCADE' if cascade else 'RESTRICT')
     )
     # Create the schema.
     with connect(url=url, dbname=dbname) as cnx:
-        execute(cnx=cnx, query=query)
+        execute(cnx=cnx, query=query, timeout=timeout)
 
 
 def schema_exists(
         url: str,
         schema: str = None,
         dbname: str = None,
+        timeout: float = None
 ) -> bool:
     """
     Does a given schema exist within a database?
@@ -212,20 +324,21 @@ def schema_exists(
     :param url: the database URL
     :param schema: the name of the database to test
     :param dbname: the name of the database
+    :param timeout: the number of seconds after which a query is cancelled
     :return: `True` if the schema exists, otherwise `False`
     """
     # Figure out what database we're looking for.
     _dbname = dbname if dbname else parse_dbname(url)
 
     # Prepare the query.
-    query = SQL(_PHRASEBOOK.gets('schema_exists')).format(
+    query = _PHRASEBOOK.sql('schema_exists').format(
         schema=Literal(schema)
     )
     # Create a connection to the administrative database.
     with connect(url=url, dbname=_dbname) as cnx:
         # The query should return a count of the appearances of the database
         # name in an index table.
-        count = execute_scalar(cnx=cnx, query=query)
+        count = execute_scalar(cnx=cnx, query=query, timeout=timeout)
         try:
             count = int(count)
         except ValueError:
@@ -243,6 +356,63 @@ def schema_exists(
         return count == 1
 
 
+def _schemas_exist(
+        cnx: psycopg2.extensions.connection,
+        schemas: Iterable[str],
+        timeout: float = None
+) -> Dict[str, bool]:
+    """
+    This is a helper function for :py:func:`schemas_exist` that tests for the
+    schemas on an open connection.
+
+    :param cnx: an open connection to the database
+    :param schemas: the names of the schemas to test
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a mapping of schema names to `True` if the schema exists,
+        otherwise `False`
+    """
+    _schemas = list(dict.fromkeys(schemas))
+    # If there's nothing to look for, there's no reason to ask.
+    if not _schemas:
+        return {}
+    # Prepare the query.
+    query = _PHRASEBOOK.sql('select_schema_names').format(
+        schemas=Literal(_schemas)
+    )
+    # The query returns only the names of the schemas that exist.
+    found = {
+        row[0] for row
+        in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    }
+    return {schema: schema in found for schema in _schemas}
+
+
+def schemas_exist(
+        url: str,
+        schemas: Iterable[str],
+        dbname: str = None,
+        timeout: float = None
+) -> Dict[str, bool]:
+    """
+    Which of a given set of schemas exist within a database?
+
+    :param url: the database URL
+    :param schemas: the names of the schemas to test
+    :param dbname: the name of the database
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a mapping of schema names to `True` if the schema exists,
+        otherwise `False`
+    """
+    _schemas = list(dict.fromkeys(schemas))
+    # If there's nothing to look for, there's no reason to connect.
+    if not _schemas:
+        return {}
+    # Figure out what database we're looking for.
+    _dbname = dbname if dbname else parse_dbname(url)
+    with connect(url=url, dbname=_dbname) as cnx:
+        return _schemas_exist(cnx=cnx, schemas=_schemas, timeout=timeout)
+
+
 def temp_name(rand: int = 8, prefix: str = None):
     """
     Generate a randomized of a specified length and an optional prefix.
@@ -0,0 +1,584 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.functions.features
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains functions for reading features (rows with decoded
+geometries) from PostGIS tables.
+"""
+import inspect
+import io
+import json
+from itertools import chain, islice
+import struct
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+)
+import uuid
+import psycopg2.extensions
+from psycopg2.sql import Composed, Identifier, Literal, SQL
+from shapely import wkb
+from shapely.geometry.base import BaseGeometry
+from ..geometry import from_twkb, shape
+from ..pg import connect, value_size, _cursor_execute, _fetched
+from .tables import (
+    column_types, geometry_column, srid, table_columns, NoGeometryColumn
+)
+
+DEFAULT_BATCH_SIZE: int = 1000  #: the default number of features per batch
+DEFAULT_COPY_BATCH_SIZE: int = 10000  #: the default number of rows per write
+
+#: a feature is a dictionary of attributes and a geometry
+Feature = Tuple[Dict[str, Any], BaseGeometry or None]
+
+#: a bounding box: (min x, min y, max x, max y)
+BBox = Tuple[float, float, float, float]
+
+_COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r'
+})  #: the escapes for values in the `COPY` text format
+
+#: the signature, flags, and (empty) header extension of the `COPY` binary
+#: format
+_COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_COPY_BINARY_TRAILER = struct.pack('>h', -1)  #: ends the `COPY` binary data
+_NULL_FIELD = struct.pack('>i', -1)  #: a `NULL` in the `COPY` binary format
+
+
+def compose_bbox_filter(
+        geomcol: str,
+        bbox: BBox,
+        table_srid: int,
+        bbox_srid: int = None
+) -> Composed:
+    """
+    Compose an index-assisted (`&&`) bounding box filter.
+
+    :param geomcol: the name of the geometry column
+    :param bbox: the bounding box
+    :param table_srid: the SRID of the geometries in the table
+    :param bbox_srid: the SRID of the bounding box (if it differs from the
+        table's)
+    :return: the composed filter
+    """
+    envelope = SQL('ST_MakeEnvelope({}, {}, {}, {}, {})').format(
+        *(Literal(float(v)) for v in bbox),
+        Literal(bbox_srid if bbox_srid else table_srid)
+    )
+    # If the box is in another spatial reference system, transform it.  (We
+    # transform the box, rather than the geometries, so the index can help.)
+    if bbox_srid and bbox_srid != table_srid:
+        envelope = SQL('ST_Transform({}, {})').format(
+            envelope, Literal(table_srid)
+        )
+    return SQL('{} && {}').format(Identifier(geomcol), envelope)
+
+
+def compose_geometry_transfer(
+        geomcol: str,
+        twkb_precision: int = None,
+        simplify: float = None
+) -> Composed:
+    """
+    Compose the expression that selects a geometry column for transfer.
+
+    :param geomcol: the name of the geometry column
+    :param twkb_precision: send the geometry as TWKB (`ST_AsTWKB`) with this
+        many decimal places (which may be negative) rather than as WKB
+    :param simplify: simplify the geometry (on the server, preserving its
+        topology) with this tolerance
+    :return: the composed expression
+    """
+    geom = Identifier(geomcol)
+    if simplify:
+        geom = SQL('ST_SimplifyPreserveTopology({}, {})').format(
+            geom, Literal(float(simplify))
+        )
+    if twkb_precision is not None:
+        return SQL('ST_AsTWKB({}, {})').format(
+            geom, Literal(int(twkb_precision))
+        )
+    return SQL('ST_AsBinary({})').format(geom)
+
+
+def read_features(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        columns: Sequence[str] = None,
+        bbox: BBox = None,
+        bbox_srid: int = None,
+        where: str or Composed = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        twkb_precision: int = None,
+        simplify: float = None,
+        caller: str = None
+) -> Iterable[List[Feature]]:
+    """
+    Read the features from a PostGIS table in batches.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param columns: the attribute columns to read (The default is all the
+        columns other than the geometry column.)
+    :param bbox: limit the features to those whose bounding boxes intersect
+        this one
+    :param bbox_srid: the SRID of the bounding box (The default is the SRID
+        of the table.)
+    :param where: an additional SQL filter
+    :param batch_size: the number of features in each batch
+    :param twkb_precision: transfer the geometries as TWKB with this many
+        decimal places (which may be negative) rather than as WKB
+    :param simplify: simplify the geometries on the server with this
+        tolerance before they're sent
+    :param caller: identifies the caller (for diagnostics)
+    :return: an iteration of batches of (attributes, geometry) tuples
+
+    .. note::
+
+        The geometries are selected as binary WKB (rather than the default
+        hex text) and the rows are fetched through a server-side cursor, so
+        only one batch is held in memory at a time.  For display and
+        analysis, TWKB (which rounds the coordinates to the precision and
+        stores each as an offset from the one before it) is typically
+        several times smaller.
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    # If we were passed a string...
+    if isinstance(cnx, str):
+        # ...create a connection and note that we need to close it.
+        _cnx = connect(cnx)
+        close = True
+    else:
+        _cnx = cnx
+        close = False
+    try:
+        geomcol = geometry_column(
+            cnx=_cnx, table_name=table_name, schema_name=schema_name
+        )
+        if not geomcol:
+            raise NoGeometryColumn(
+                'No geometry column is associated with the specified table '
+                'and schema names.'
+            )
+        _columns = list(
+            columns if columns is not None
+            else [
+                c for c in table_columns(
+                    cnx=_cnx, table_name=table_name, schema_name=schema_name
+                )
+                if c != geomcol
+            ]
+        )
+        filters = []
+        if bbox is not None:
+            filters.append(
+                compose_bbox_filter(
+                    geomcol=geomcol,
+                    bbox=bbox,
+                    table_srid=srid(
+                        cnx=_cnx,
+                        table_name=table_name,
+                        schema_name=schema_name
+                    ),
+                    bbox_srid=bbox_srid
+                )
+            )
+        if where is not None:
+            filters.append(
+                SQL('({})').format(
+                    SQL(where) if isinstance(where, str) else where
+                )
+            )
+        query = SQL('SELECT {columns} FROM {table}{where}').format(
+            columns=SQL(', ').join(
+                [Identifier(c) for c in _columns]
+                + [
+                    compose_geometry_transfer(
+                        geomcol=geomcol,
+                        twkb_precision=twkb_precision,
+                        simplify=simplify
+                    )
+                ]
+            ),
+            table=SQL('{}.{}').format(
+                Identifier(schema_name), Identifier(table_name)
+            ),
+            where=(
+                SQL(' WHERE ') + SQL(' AND ').join(filters)
+                if filters else SQL('')
+            )
+        )
+        # A named (server-side) cursor keeps the result set on the server.
+        # (Outside of a transaction, it has to be declared `WITH HOLD`.)
+        decode = from_twkb if twkb_precision is not None else shape
+        with _cnx.cursor(
+                name=f'normanpg_features_{uuid.uuid4().hex}',
+                withhold=_cnx.autocommit
+        ) as crs:
+            crs.itersize = batch_size
+            event = _cursor_execute(crs=crs, query=query, caller=caller)
+            try:
+                while True:
+                    rows = crs.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if event is not None:
+                        event.fetched += len(rows)
+                        if event.measure:
+                            event.fetched_bytes += sum(
+                                value_size(v) for row in rows for v in row
+                            )
+                    yield [
+                        (
+                            dict(zip(_columns, row[:-1])),
+                            decode(row[-1]) if row[-1] is not None else None
+                        )
+                        for row in rows
+                    ]
+            finally:
+                _fetched(event)
+    finally:
+        if close:
+            _cnx.close()
+
+
+def _array_element(value: Any) -> str:
+    """
+    Format a value as an element of a Postgres array literal.
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value)
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (int, float)):
+        return str(value)
+    text = (
+        json.dumps(value) if isinstance(value, dict)
+        else '\\x' + bytes(value).hex()
+        if isinstance(value, (bytes, bytearray, memoryview))
+        else str(value)
+    )
+    # Anything else is quoted (so commas, braces, and spaces survive).
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _array_literal(values: Sequence[Any]) -> str:
+    """
+    Format a sequence as a Postgres array literal.
+    """
+    return '{' + ','.join(_array_element(v) for v in values) + '}'
+
+
+def _text(value: Any) -> str:
+    """
+    Format a (non-null) value as text.  (Lists and tuples are formatted as
+    arrays and dictionaries as JSON.)
+    """
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\x' + bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+
+def copy_text(value: Any) -> str:
+    """
+    Format a value for the `COPY` text format.  (Lists and tuples are
+    formatted as arrays and dictionaries as JSON.)
+
+    :param value: the value
+    :return: the formatted (and escaped) value
+    """
+    if value is None:
+        return '\\N'
+    return _text(value).translate(_COPY_ESCAPES)
+
+
+def ewkb_hex(geometry: BaseGeometry or None, srid_: int) -> str:
+    """
+    Encode a geometry as hex EWKB (WKB with an embedded SRID) for the `COPY`
+    text format.
+
+    :param geometry: the geometry
+    :param srid_: the SRID
+    :return: the encoded geometry
+    """
+    if geometry is None:
+        return '\\N'
+    return wkb.dumps(geometry, hex=True, srid=srid_)
+
+
+def _json_binary(value: Any) -> bytes:
+    """
+    Encode a value for a `json` column in the `COPY` binary format.
+    """
+    return (
+        value if isinstance(value, str) else json.dumps(value)
+    ).encode('utf-8')
+
+
+def _bool_binary(value: Any) -> bytes:
+    """
+    Encode a value for a `bool` column in the `COPY` binary format.
+    """
+    if isinstance(value, str):
+        value = value.strip().lower() in ('t', 'true', 'y', 'yes', 'on', '1')
+    return b'\x01' if value else b'\x00'
+
+
+#: encodes (non-null) values in the `COPY` binary format by type name
+_BINARY_ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    'bool': _bool_binary,
+    'int2': lambda v: struct.pack('>h', int(v)),
+    'int4': lambda v: struct.pack('>i', int(v)),
+    'int8': lambda v: struct.pack('>q', int(v)),
+    'float4': lambda v: struct.pack('>f', float(v)),
+    'float8': lambda v: struct.pack('>d', float(v)),
+    'text': lambda v: _text(v).encode('utf-8'),
+    'varchar': lambda v: _text(v).encode('utf-8'),
+    'bpchar': lambda v: _text(v).encode('utf-8'),
+    'name': lambda v: _text(v).encode('utf-8'),
+    'json': _json_binary,
+    'jsonb': lambda v: b'\x01' + _json_binary(v),  # (version 1)
+    'bytea': lambda v: (
+        v.encode('utf-8') if isinstance(v, str) else bytes(v)
+    ),
+    'uuid': lambda v: uuid.UUID(str(v)).bytes
+}
+
+
+def copy_binary(
+        values: Sequence[Any],
+        encoders: Sequence[Callable[[Any], bytes]]
+) -> bytes:
+    """
+    Encode a row for the `COPY` binary format.
+
+    :param values: the values
+    :param encoders: the functions that encode each (non-null) value
+    :return: the encoded row
+    """
+    fields = [struct.pack('>h', len(values))]
+    for value, encode in zip(values, encoders):
+        if value is None:
+            fields.append(_NULL_FIELD)
+        else:
+            data = encode(value)
+            fields.append(struct.pack('>i', len(data)))
+            fields.append(data)
+    return b''.join(fields)
+
+
+def ewkb(geometry: BaseGeometry, srid_: int) -> bytes:
+    """
+    Encode a geometry as EWKB (WKB with an embedded SRID) for the `COPY`
+    binary format.
+
+    :param geometry: the geometry
+    :param srid_: the SRID
+    :return: the encoded geometry
+    """
+    return wkb.dumps(geometry, srid=srid_)
+
+
+class _CopyStream(io.IOBase):
+    """
+    A read-only file-like object that encodes rows for `COPY ... FROM STDIN`
+    as they are read, a batch at a time.
+    """
+    def __init__(
+            self,
+            lines: Iterator[str or bytes],
+            batch_size: int,
+            binary: bool = False
+    ):
+        """
+
+        :param lines: the encoded lines (or, if `binary`, rows)
+        :param batch_size: the number of lines to encode at a time
+        :param binary: Are the lines encoded in the binary format?
+        """
+        super().__init__()
+        self._lines = lines
+        self._batch_size = batch_size
+        self._buffer = b'' if binary else ''
+        self._newline = b'\n' if binary else '\n'
+        self._offset = 0  # the position of the unread text in the buffer
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str or bytes:
+        # Fill the buffer (a batch at a time) until we can satisfy the
+        # request or there are no more lines.
+        while size < 0 or len(self._buffer) - self._offset < size:
+            batch = self._buffer[:0].join(
+                islice(self._lines, self._batch_size)
+            )
+            if not batch:
+                break
+            # (We only drop the text that's been read when we refill.)
+            self._buffer = self._buffer[self._offset:] + batch
+            self._offset = 0
+        end = len(self._buffer) if size < 0 else self._offset + size
+        chunk = self._buffer[self._offset:end]
+        self._offset += len(chunk)
+        return chunk
+
+    def readline(self, size: int = -1) -> str or bytes:
+        # `copy_expert` only needs `read`, but we'll be thorough.
+        end = self._buffer.find(self._newline, self._offset)
+        if end < 0:
+            # There's no complete line in the buffer, so it's whatever is
+            # left plus the next line.
+            empty = self._buffer[:0]
+            line = self._buffer[self._offset:] + next(self._lines, empty)
+            self._buffer, self._offset = empty, 0
+        else:
+            line = self._buffer[self._offset:end + 1]
+            self._offset = end + 1
+        if 0 <= size < len(line):
+            # Put back what we can't return.
+            self._buffer = line[size:] + self._buffer[self._offset:]
+            self._offset = 0
+            line = line[:size]
+        return line
+
+
+def write_features(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        features: Iterable[Feature],
+        columns: Sequence[str] = None,
+        batch_size: int = DEFAULT_COPY_BATCH_SIZE,
+        caller: str = None,
+        timeout: float = None
+) -> int:
+    """
+    Write features to a PostGIS table with `COPY ... FROM STDIN`.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param features: the (attributes, geometry) tuples to write
+    :param columns: the attribute columns to write (The default is the keys
+        of the first feature's attributes.)
+    :param batch_size: the number of rows to encode at a time
+    :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the `COPY` is
+        cancelled
+    :return: the number of features written
+
+    .. note::
+
+        If every attribute column is a boolean, integer, float, text, JSON,
+        `bytea`, or UUID column, the rows are sent in the `COPY` binary
+        format, with the geometries as raw EWKB (with the table's SRID).
+        Otherwise, they're sent in the text format, with the geometries as
+        hex-encoded EWKB, which is twice the size.  If you pass an open
+        connection, committing the transaction is up to you.
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    _features = iter(features)
+    # If we need to look at the first feature to figure out the columns,
+    # we'll put it back afterward.
+    if columns is None:
+        try:
+            first = next(_features)
+        except StopIteration:
+            return 0
+        _columns = list(first[0].keys())
+        _features = chain([first], _features)
+    else:
+        _columns = list(columns)
+    # If we were passed a string...
+    if isinstance(cnx, str):
+        # ...create a connection and note that we need to close it.
+        _cnx = connect(cnx)
+        close = True
+    else:
+        _cnx = cnx
+        close = False
+    try:
+        geomcol = geometry_column(
+            cnx=_cnx, table_name=table_name, schema_name=schema_name
+        )
+        if not geomcol:
+            raise NoGeometryColumn(
+                'No geometry column is associated with the specified table '
+                'and schema names.'
+            )
+        _srid = srid(cnx=_cnx, table_name=table_name, schema_name=schema_name)
+        types = column_types(
+            cnx=_cnx, table_name=table_name, schema_name=schema_name
+        )
+        binary = all(types.get(c) in _BINARY_ENCODERS for c in _columns)
+        count = 0
+
+        def _lines() -> Iterator[str]:
+            nonlocal count
+            for attributes, geometry in _features:
+                count += 1
+                yield '\t'.join(
+                    [copy_text(attributes.get(c)) for c in _columns]
+                    + [ewkb_hex(geometry, _srid)]
+                ) + '\n'
+
+        def _rows() -> Iterator[bytes]:
+            nonlocal count
+            encoders = [_BINARY_ENCODERS[types[c]] for c in _columns] + [
+                lambda g: ewkb(g, _srid)
+            ]
+            yield _COPY_BINARY_HEADER
+            for attributes, geometry in _features:
+                count += 1
+                yield copy_binary(
+                    [attributes.get(c) for c in _columns] + [geometry],
+                    encoders
+                )
+            yield _COPY_BINARY_TRAILER
+
+        query = SQL('COPY {table} ({columns}) FROM STDIN{options}').format(
+            table=SQL('{}.{}').format(
+                Identifier(schema_name), Identifier(table_name)
+            ),
+            columns=SQL(', ').join(
+                [Identifier(c) for c in _columns] + [Identifier(geomcol)]
+            ),
+            options=SQL(' (FORMAT binary)' if binary else '')
+        )
+        with _cnx.cursor() as crs:
+            _fetched(
+                _cursor_execute(
+                    crs=crs,
+                    query=query,
+                    caller=caller,
+                    timeout=timeout,
+                    stream=_CopyStream(
+                        _rows() if binary else _lines(),
+                        batch_size=batch_size,
+                        binary=binary
+                    )
+                )
+            )
+        if close:
+            _cnx.commit()
+        return count
+    finally:
+        if close:
+            _cnx.close()
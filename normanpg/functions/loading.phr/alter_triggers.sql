@@ -0,0 +1 @@
+ALTER TABLE {table} {action} TRIGGER USER
\ No newline at end of file
@@ -0,0 +1 @@
+ANALYZE {table}
\ No newline at end of file
@@ -0,0 +1,3 @@
+SELECT pid
+FROM unnest({pids}::int[]) AS pid
+WHERE pg_blocking_pids(pid) && {pids}::int[]
\ No newline at end of file
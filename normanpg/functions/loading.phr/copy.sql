@@ -0,0 +1 @@
+COPY {table} ({columns}) FROM STDIN
\ No newline at end of file
@@ -0,0 +1 @@
+DROP INDEX {index}
\ No newline at end of file
@@ -0,0 +1,4 @@
+SELECT i.relname
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+WHERE x.indrelid = {table}::regclass
\ No newline at end of file
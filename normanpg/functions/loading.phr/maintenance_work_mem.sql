@@ -0,0 +1 @@
+SET maintenance_work_mem = {memory}
\ No newline at end of file
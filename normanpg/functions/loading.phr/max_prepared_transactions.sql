@@ -0,0 +1 @@
+SELECT current_setting('max_prepared_transactions')::int
\ No newline at end of file
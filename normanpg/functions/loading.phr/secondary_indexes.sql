@@ -0,0 +1,9 @@
+SELECT i.relname, pg_get_indexdef(x.indexrelid)
+FROM pg_index x
+JOIN pg_class i ON i.oid = x.indexrelid
+WHERE x.indrelid = {table}::regclass
+AND NOT x.indisunique
+AND NOT EXISTS (
+    SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid
+)
+ORDER BY i.relname
@@ -0,0 +1,524 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.functions.loading
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a high-volume load mode that defers index maintenance
+(and, optionally, triggers) until all the rows have been written.
+
+.. code-block:: python
+
+    from normanpg.functions.loading import bulk_load
+
+    result = bulk_load(
+        url, 'parcels', 'public', rows, columns=['id', 'owner', 'geom'],
+        workers=4
+    )
+    print(result['rows'], result['timings'])
+"""
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from itertools import islice
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+import psycopg2.extensions
+from psycopg2.sql import Identifier, Literal, SQL
+from ..errors import NormanPgException
+from ..pg import (
+    compose_table, connect, execute, execute_rows, execute_scalar,
+    _cursor_execute, _fetched
+)
+from ..phrasebooks import LazySqlPhrasebook
+from .features import copy_text, _CopyStream
+
+__logger__ = logging.getLogger(__name__)  #: the module logger
+
+_PHRASEBOOK = LazySqlPhrasebook(__file__)
+
+DEFAULT_WORKERS: int = 4  #: the default number of concurrent writers
+DEFAULT_LOAD_BATCH_SIZE: int = 10000  #: the default rows per hand-off
+#: the number of seconds between checks for writers blocked by each other
+CONFLICT_CHECK_INTERVAL: float = 1.0
+
+
+class WriterConflict(NormanPgException):
+    """
+    Raised when the bulk load's writers try to write rows with the same
+    unique key (so that one is waiting for the other to finish).
+    """
+
+
+def secondary_indexes(
+        cnx: psycopg2.extensions.connection,
+        table_name: str,
+        schema_name: str = None,
+        timeout: float = None
+) -> List[Tuple[str, str]]:
+    """
+    Get the indexes on a table that don't back a constraint or enforce
+    uniqueness (so they can be dropped and rebuilt without letting duplicate
+    rows in).
+
+    :param cnx: an open connection
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: the (name, definition) of each index
+    """
+    table = compose_table(table_name, schema_name)
+    query = _PHRASEBOOK.sql('secondary_indexes').format(
+        table=Literal(table.as_string(cnx))
+    )
+    return [
+        (row[0], row[1])
+        for row in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    ]
+
+
+def _index_names(
+        cnx: psycopg2.extensions.connection,
+        table: SQL,
+        timeout: float = None
+) -> set:
+    """
+    Get the names of all the indexes that exist on a table now.
+    """
+    query = _PHRASEBOOK.sql('index_names').format(
+        table=Literal(table.as_string(cnx))
+    )
+    return {
+        row[0] for row in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    }
+
+
+def _rebuild_indexes(
+        url: str,
+        definitions: Sequence[str],
+        workers: int,
+        maintenance_work_mem: str = None,
+        timeout: float = None
+):
+    """
+    Build indexes concurrently (one connection per index at a time).
+    """
+    local = threading.local()
+    connections = []
+    lock = threading.Lock()
+
+    def _build(definition: str):
+        cnx = getattr(local, 'cnx', None)
+        if cnx is None:
+            cnx = connect(url=url, autocommit=True)
+            local.cnx = cnx
+            with lock:
+                connections.append(cnx)
+            if maintenance_work_mem:
+                execute(
+                    cnx=cnx,
+                    query=_PHRASEBOOK.sql('maintenance_work_mem').format(
+                        memory=Literal(maintenance_work_mem)
+                    ),
+                    caller='bulk_load'
+                )
+        execute(
+            cnx=cnx, query=definition, caller='bulk_load', timeout=timeout
+        )
+
+    try:
+        with ThreadPoolExecutor(
+                max_workers=max(1, min(workers, len(definitions))),
+                thread_name_prefix='normanpg-index'
+        ) as executor:
+            # Wait for all of them (and raise the first error, if any).
+            for future in [executor.submit(_build, d) for d in definitions]:
+                future.result()
+    finally:
+        for cnx in connections:
+            cnx.close()
+
+
+def _restore_indexes(
+        url: str,
+        table: SQL,
+        indexes: Sequence[Tuple[str, str]],
+        workers: int,
+        maintenance_work_mem: str = None
+):
+    """
+    Rebuild whichever of the original indexes are missing.
+    """
+    cnx = connect(url=url, autocommit=True)
+    try:
+        existing = _index_names(cnx=cnx, table=table)
+    finally:
+        cnx.close()
+    missing = [d for name, d in indexes if name not in existing]
+    if missing:
+        _rebuild_indexes(
+            url=url,
+            definitions=missing,
+            workers=workers,
+            maintenance_work_mem=maintenance_work_mem
+        )
+
+
+def _partition_lines(
+        source: Iterator[Sequence[Any]],
+        lock: threading.Lock,
+        batch_size: int,
+        counter: List[int],
+        stop: threading.Event
+) -> Iterator[str]:
+    """
+    Take batches of rows from a shared source and encode them for `COPY`
+    (until the source runs dry or another writer fails).  The counter keeps
+    track of the rows handed to `COPY` (which hasn't necessarily accepted
+    them yet).
+    """
+    while not stop.is_set():
+        with lock:
+            batch = list(islice(source, batch_size))
+        if not batch:
+            return
+        counter[0] += len(batch)
+        for row in batch:
+            yield '\t'.join(copy_text(value) for value in row) + '\n'
+
+
+def bulk_load(
+        url: str,
+        table_name: str,
+        schema_name: str,
+        rows: Iterable[Sequence[Any]],
+        columns: Sequence[str],
+        workers: int = DEFAULT_WORKERS,
+        disable_triggers: bool = False,
+        analyze: bool = True,
+        batch_size: int = DEFAULT_LOAD_BATCH_SIZE,
+        maintenance_work_mem: str = None,
+        timeout: float = None
+) -> Dict[str, Any]:
+    """
+    Load a large number of rows into a table with its secondary indexes
+    dropped, then rebuild the indexes.
+
+    :param url: the database URL
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param rows: the rows (each a sequence of values in the order of the
+        `columns`; geometries should be encoded with
+        :py:func:`normanpg.functions.features.ewkb_hex`)
+    :param columns: the columns
+    :param workers: the number of connections that write (and then rebuild
+        indexes) concurrently
+    :param disable_triggers: Disable the table's user triggers while loading?
+    :param analyze: Update the table's statistics with `ANALYZE` afterward?
+    :param batch_size: the number of rows a writer takes from the input at a
+        time
+    :param maintenance_work_mem: the memory for each index build (for
+        example, ``'1GB'``)
+    :param timeout: the number of seconds after which an index build (or the
+        `ANALYZE`) is cancelled
+    :return: a dictionary with these keys:
+
+        * `rows`: the number of rows written
+        * `indexes`: the names of the indexes that were rebuilt
+        * `timings`: the seconds spent in each phase (`prepare`, `load`,
+          `index`, `analyze`)
+
+    .. note::
+
+        The writers share the input (each takes the next batch when it's
+        ready for more) and none of them commits until all of them have
+        finished, so a failure while loading rolls all of them back.  If
+        the server allows enough prepared transactions
+        (`max_prepared_transactions`), the writers commit with two-phase
+        commit, so the load is atomic.  Otherwise they commit one after
+        another, and if a later commit fails, the rows written by the
+        writers that already committed remain.  Unique indexes, and indexes
+        that back constraints (like primary keys), are left in place, so
+        duplicate rows fail the load before anything is committed.  (If two
+        writers write the same key, a :py:class:`WriterConflict` is
+        raised.)  If anything
+        fails, the original indexes are rebuilt and the triggers are
+        re-enabled before the exception is raised.
+    """
+    table = compose_table(table_name, schema_name)
+    timings = {'prepare': 0.0, 'load': 0.0, 'index': 0.0, 'analyze': 0.0}
+    started = time.perf_counter()
+    control = connect(url=url, autocommit=True)
+    try:
+        indexes = secondary_indexes(
+            cnx=control, table_name=table_name, schema_name=schema_name
+        )
+        triggers_disabled = False
+        try:
+            # Drop the indexes (and disable the triggers) in one transaction.
+            cnx = connect(url=url)
+            try:
+                for name, _ in indexes:
+                    execute(
+                        cnx=cnx,
+                        query=_PHRASEBOOK.sql('drop_index').format(
+                            index=compose_table(
+                                Identifier(name).as_string(cnx), schema_name
+                            )
+                        ),
+                        caller='bulk_load'
+                    )
+                if disable_triggers:
+                    execute(
+                        cnx=cnx,
+                        query=_PHRASEBOOK.sql('alter_triggers').format(
+                            table=table, action=SQL('DISABLE')
+                        ),
+                        caller='bulk_load'
+                    )
+                cnx.commit()
+            finally:
+                # (If we didn't commit, closing the connection rolls back.)
+                cnx.close()
+            triggers_disabled = disable_triggers
+            timings['prepare'] = time.perf_counter() - started
+            # Load the rows.
+            started = time.perf_counter()
+            count = _load(
+                url=url,
+                table=table,
+                rows=rows,
+                columns=columns,
+                workers=workers,
+                batch_size=batch_size
+            )
+            timings['load'] = time.perf_counter() - started
+            # Rebuild the indexes.
+            started = time.perf_counter()
+            _rebuild_indexes(
+                url=url,
+                definitions=[d for _, d in indexes],
+                workers=workers,
+                maintenance_work_mem=maintenance_work_mem,
+                timeout=timeout
+            )
+            timings['index'] = time.perf_counter() - started
+        except BaseException:
+            # Whatever happened, put the indexes back the way they were.
+            __logger__.warning(
+                f'The bulk load into {table.as_string(control)} failed.  '
+                f'Restoring its indexes.'
+            )
+            _restore_indexes(
+                url=url,
+                table=table,
+                indexes=indexes,
+                workers=workers,
+                maintenance_work_mem=maintenance_work_mem
+            )
+            raise
+        finally:
+            if triggers_disabled:
+                execute(
+                    cnx=control,
+                    query=_PHRASEBOOK.sql('alter_triggers').format(
+                        table=table, action=SQL('ENABLE')
+                    ),
+                    caller='bulk_load'
+                )
+        if analyze:
+            started = time.perf_counter()
+            execute(
+                cnx=control,
+                query=_PHRASEBOOK.sql('analyze').format(table=table),
+                caller='bulk_load',
+                timeout=timeout
+            )
+            timings['analyze'] = time.perf_counter() - started
+        return {
+            'rows': count,
+            'indexes': [name for name, _ in indexes],
+            'timings': timings
+        }
+    finally:
+        control.close()
+
+
+def _two_phase(cnx: psycopg2.extensions.connection, workers: int) -> bool:
+    """
+    Does the server allow enough prepared transactions for each writer to
+    commit with two-phase commit?
+    """
+    try:
+        return execute_scalar(
+            cnx=cnx,
+            query=_PHRASEBOOK.sql('max_prepared_transactions'),
+            caller='bulk_load'
+        ) >= workers
+    finally:
+        # `tpc_begin` can't be called in a transaction.
+        cnx.rollback()
+
+
+def _commit(
+        connections: Sequence[psycopg2.extensions.connection],
+        xids: Sequence[Any] or None
+):
+    """
+    Commit the writers' transactions (with two-phase commit if they have
+    transaction IDs).
+    """
+    if xids is None:
+        for cnx in connections:
+            cnx.commit()
+        return
+    prepared = []
+    try:
+        for cnx in connections:
+            cnx.tpc_prepare()
+            prepared.append(cnx)
+    except BaseException:
+        # Prepared transactions outlive their connections, so they have to
+        # be rolled back explicitly.
+        for cnx in prepared:
+            cnx.tpc_rollback()
+        raise
+    for i, cnx in enumerate(connections):
+        try:
+            cnx.tpc_commit()
+        except BaseException:
+            # Every writer has prepared, so the load has succeeded, but the
+            # transactions that remain have to be committed by hand.
+            __logger__.error(
+                'The bulk load could not commit all of its prepared '
+                'transactions.  Finish them with COMMIT PREPARED: '
+                + ', '.join(str(xid) for xid in xids[i:])
+            )
+            raise
+
+
+def _watch_writers(
+        url: str,
+        connections: Sequence[psycopg2.extensions.connection],
+        futures: list,
+        stop: threading.Event
+) -> bool:
+    """
+    Wait for the writers, cancelling them if one is blocked by another.  (A
+    writer that writes a unique key another has already written waits for
+    the other's transaction, which won't end until every writer finishes.)
+
+    :return: `True` if the writers were cancelled
+    """
+    if len(connections) < 2:
+        wait(futures)
+        return False
+    pids = [cnx.get_backend_pid() for cnx in connections]
+    query = _PHRASEBOOK.sql('blocked_writers').format(pids=Literal(pids))
+    monitor = connect(url=url, autocommit=True)
+    try:
+        while True:
+            _, pending = wait(
+                futures,
+                timeout=CONFLICT_CHECK_INTERVAL,
+                return_when=FIRST_EXCEPTION
+            )
+            if not pending or stop.is_set():
+                wait(futures)
+                return False
+            if list(execute_rows(cnx=monitor, query=query)):
+                stop.set()
+                for cnx in connections:
+                    cnx.cancel()
+                wait(futures)
+                return True
+    finally:
+        monitor.close()
+
+
+def _load(
+        url: str,
+        table: SQL,
+        rows: Iterable[Sequence[Any]],
+        columns: Sequence[str],
+        workers: int,
+        batch_size: int
+) -> int:
+    """
+    Write the rows with `COPY` over several connections, committing only if
+    all of them succeed.  (See :py:func:`bulk_load`.)
+
+    :return: the number of rows written
+    """
+    source = iter(rows)
+    lock = threading.Lock()
+    # If one writer fails, the others stop taking rows.
+    stop = threading.Event()
+    connections = [connect(url=url) for _ in range(workers)]
+    # the rows each writer has handed to `COPY`, and the rows it accepted
+    sent = [[0] for _ in connections]
+    written = [0 for _ in connections]
+    try:
+        xids = None
+        if _two_phase(connections[0], workers):
+            gtrid = f'normanpg_bulk_load_{uuid.uuid4().hex}'
+            xids = [
+                cnx.xid(0, gtrid, str(i)) for i, cnx in enumerate(connections)
+            ]
+            for cnx, xid in zip(connections, xids):
+                cnx.tpc_begin(xid)
+        query = _PHRASEBOOK.sql('copy').format(
+            table=table,
+            columns=SQL(', ').join(Identifier(c) for c in columns)
+        )
+
+        def _write(index: int):
+            cnx = connections[index]
+            try:
+                with cnx.cursor() as crs:
+                    _fetched(
+                        _cursor_execute(
+                            crs=crs,
+                            query=query,
+                            caller='bulk_load',
+                            stream=_CopyStream(
+                                _partition_lines(
+                                    source, lock, batch_size, sent[index],
+                                    stop
+                                ),
+                                batch_size=batch_size
+                            )
+                        )
+                    )
+                written[index] = sent[index][0]
+            except BaseException:
+                stop.set()
+                raise
+
+        with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='normanpg-copy'
+        ) as executor:
+            futures = [
+                executor.submit(_write, i) for i in range(len(connections))
+            ]
+            conflict = _watch_writers(url, connections, futures, stop)
+            errors = [f.exception() for f in futures]
+        error = next((e for e in errors if e is not None), None)
+        if conflict:
+            raise WriterConflict(
+                'Two of the bulk load\'s writers wrote rows with the same '
+                'unique key.',
+                inner=error
+            )
+        if error is not None:
+            raise error
+        _commit(connections, xids)
+        return sum(written)
+    finally:
+        for cnx in connections:
+            # Closing a connection with an open (unprepared) transaction
+            # rolls it back.
+            cnx.close()
@@ -0,0 +1,2 @@
+SELECT u.ord, {geom} AS geom
+FROM unnest({wkbs}::bytea[]) WITH ORDINALITY AS u(wkb, ord)
\ No newline at end of file
@@ -0,0 +1,4 @@
+SELECT q.ord{columns}
+FROM ({inputs}) AS q
+JOIN {table} AS t ON ST_Intersects(t.{geomcol}, q.geom)
+ORDER BY q.ord
\ No newline at end of file
@@ -0,0 +1,11 @@
+SELECT q.ord, n.*
+FROM ({inputs}) AS q
+CROSS JOIN LATERAL (
+    SELECT t.{geomcol} <-> q.geom AS distance{columns}
+    FROM {table} AS t
+    WHERE {max_distance}::float8 IS NULL
+    OR ST_DWithin(t.{geomcol}, q.geom, {max_distance}::float8)
+    ORDER BY t.{geomcol} <-> q.geom
+    LIMIT {k}
+) AS n
+ORDER BY q.ord, n.distance
\ No newline at end of file
@@ -0,0 +1,2 @@
+SELECT u.ord, {geom} AS geom
+FROM unnest({xs}::float8[], {ys}::float8[]) WITH ORDINALITY AS u(x, y, ord)
\ No newline at end of file
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.functions.lookups
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains batched spatial lookups that send many input locations
+to the server in a single query (as arrays expanded with `unnest`) rather
+than making a round trip for each one.
+
+.. code-block:: python
+
+    from normanpg.functions.lookups import intersecting, nearest
+
+    addresses = nearest(url, 'addresses', 'public', [(-93.2, 44.9), ...])
+    zones = intersecting(url, 'zones', 'public', [(-93.2, 44.9), ...])
+"""
+import inspect
+from typing import Any, Dict, List, Sequence, Tuple, Union
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from psycopg2.sql import Composed, Identifier, Literal, SQL
+from shapely.geometry import Point
+from shapely.geometry.base import BaseGeometry
+from ..pg import compose_table, connect, execute_rows
+from ..phrasebooks import LazySqlPhrasebook
+from .tables import geometry_column, srid, table_columns, NoGeometryColumn
+
+_PHRASEBOOK = LazySqlPhrasebook(__file__)
+
+DEFAULT_LOOKUP_BATCH_SIZE: int = 5000  #: the default inputs per query
+
+#: an input location is an (x, y) coordinate pair or a `Shapely` geometry
+Location = Union[Tuple[float, float], BaseGeometry]
+
+
+def compose_inputs(
+        locations: Sequence[Location],
+        table_srid: int,
+        input_srid: int = None
+) -> Composed:
+    """
+    Compose a query that expands a batch of input locations into rows of
+    (`ord`, `geom`), where `ord` is the (1-based) position of the input.
+
+    :param locations: the input locations
+    :param table_srid: the SRID of the geometries in the table
+    :param input_srid: the SRID of the input locations (if it differs from
+        the table's)
+    :return: the composed query
+    """
+    _srid = input_srid if input_srid else table_srid
+    # Coordinate pairs travel as two arrays of numbers, which is much more
+    # compact than geometries.
+    if not any(isinstance(loc, BaseGeometry) for loc in locations):
+        query = _PHRASEBOOK.sql('point_inputs')
+        geom = SQL('ST_SetSRID(ST_MakePoint(u.x, u.y), {})').format(
+            Literal(_srid)
+        )
+        params = {
+            'xs': Literal([float(loc[0]) for loc in locations]),
+            'ys': Literal([float(loc[1]) for loc in locations])
+        }
+    else:
+        query = _PHRASEBOOK.sql('geometry_inputs')
+        geom = SQL('ST_SetSRID(ST_GeomFromWKB(u.wkb), {})').format(
+            Literal(_srid)
+        )
+        params = {
+            'wkbs': Literal([
+                psycopg2.Binary(
+                    loc.wkb if isinstance(loc, BaseGeometry)
+                    else Point(loc[0], loc[1]).wkb
+                )
+                for loc in locations
+            ])
+        }
+    # If the inputs are in another spatial reference system, transform them
+    # (rather than the table's geometries, so the index can help).
+    if _srid != table_srid:
+        geom = SQL('ST_Transform({}, {})').format(geom, Literal(table_srid))
+    return query.format(geom=geom, **params)
+
+
+def _batches(
+        locations: Sequence[Location],
+        batch_size: int
+) -> List[Sequence[Location]]:
+    """
+    Split the input locations into batches.
+    """
+    return [
+        locations[i:i + batch_size]
+        for i in range(0, len(locations), batch_size)
+    ]
+
+
+def _lookup(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        locations: Sequence[Location],
+        columns: Sequence[str] or None,
+        phrase: str,
+        params: Dict[str, Any],
+        input_srid: int,
+        batch_size: int,
+        caller: str,
+        timeout: float
+) -> Tuple[List[str], List[List[psycopg2.extras.DictRow]]]:
+    """
+    Run a lookup query over the input locations, a batch at a time.
+
+    :return: the column names and, for each input, the matching rows
+    """
+    _locations = list(locations)
+    results: List[List] = [[] for _ in _locations]
+    # We need to make multiple database calls, so if we were passed a string...
+    if isinstance(cnx, str):
+        # ...create a connection and note that we need to close it.
+        _cnx = connect(cnx)
+        close = True
+    else:
+        _cnx = cnx
+        close = False
+    try:
+        geomcol = geometry_column(
+            cnx=_cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            timeout=timeout
+        )
+        if not geomcol:
+            raise NoGeometryColumn(
+                'No geometry column is associated with the specified table '
+                'and schema names.'
+            )
+        _columns = list(
+            columns if columns is not None
+            else [
+                c for c in table_columns(
+                    cnx=_cnx,
+                    table_name=table_name,
+                    schema_name=schema_name,
+                    timeout=timeout
+                )
+                if c != geomcol
+            ]
+        )
+        if not _locations:
+            return _columns, results
+        table_srid = srid(
+            cnx=_cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            timeout=timeout
+        )
+        offset = 0
+        for batch in _batches(_locations, batch_size):
+            query = _PHRASEBOOK.sql(phrase).format(
+                inputs=compose_inputs(
+                    locations=batch,
+                    table_srid=table_srid,
+                    input_srid=input_srid
+                ),
+                columns=SQL('').join(
+                    SQL(', t.{}').format(Identifier(c)) for c in _columns
+                ),
+                table=compose_table(table_name, schema_name),
+                geomcol=Identifier(geomcol),
+                **params
+            )
+            for row in execute_rows(
+                    cnx=_cnx, query=query, caller=caller, timeout=timeout
+            ):
+                # The ordinality is 1-based.
+                results[offset + row[0] - 1].append(row)
+            offset += len(batch)
+        return _columns, results
+    finally:
+        if close:
+            _cnx.close()
+
+
+def nearest(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        locations: Sequence[Location],
+        columns: Sequence[str] = None,
+        k: int = 1,
+        max_distance: float = None,
+        input_srid: int = None,
+        batch_size: int = DEFAULT_LOOKUP_BATCH_SIZE,
+        caller: str = None,
+        timeout: float = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Find the features nearest to each of a batch of input locations with the
+    index-assisted KNN (`<->`) operator.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param locations: the input locations ((x, y) pairs or `Shapely`
+        geometries)
+    :param columns: the attribute columns to return (The default is all the
+        columns other than the geometry column.)
+    :param k: the number of features to find for each input
+    :param max_distance: ignore features farther than this from the input (in
+        the units of the table's spatial reference system)
+    :param input_srid: the SRID of the input locations (The default is the
+        SRID of the table.)
+    :param batch_size: the number of inputs sent in each query
+    :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: for each input (in order), a list of up to `k` dictionaries of
+        the columns (nearest first), each with the `distance` to the feature
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    _columns, results = _lookup(
+        cnx=cnx,
+        table_name=table_name,
+        schema_name=schema_name,
+        locations=locations,
+        columns=columns,
+        phrase='nearest',
+        params={
+            'k': Literal(int(k)),
+            'max_distance': Literal(
+                float(max_distance) if max_distance is not None else None
+            )
+        },
+        input_srid=input_srid,
+        batch_size=batch_size,
+        caller=caller,
+        timeout=timeout
+    )
+    return [
+        [
+            dict(zip(_columns, row[2:]), distance=row[1])
+            for row in rows
+        ]
+        for rows in results
+    ]
+
+
+def intersecting(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        locations: Sequence[Location],
+        columns: Sequence[str] = None,
+        input_srid: int = None,
+        batch_size: int = DEFAULT_LOOKUP_BATCH_SIZE,
+        caller: str = None,
+        timeout: float = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Find the features that intersect each of a batch of input locations
+    (for example, the polygons that contain each of a batch of points) with
+    the index-assisted `ST_Intersects`.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param locations: the input locations ((x, y) pairs or `Shapely`
+        geometries)
+    :param columns: the attribute columns to return (The default is all the
+        columns other than the geometry column.)
+    :param input_srid: the SRID of the input locations (The default is the
+        SRID of the table.)
+    :param batch_size: the number of inputs sent in each query
+    :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: for each input (in order), a list of dictionaries of the columns
+        of the intersecting features (which is empty if there are none)
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    _columns, results = _lookup(
+        cnx=cnx,
+        table_name=table_name,
+        schema_name=schema_name,
+        locations=locations,
+        columns=columns,
+        phrase='intersecting',
+        params={},
+        input_srid=input_srid,
+        batch_size=batch_size,
+        caller=caller,
+        timeout=timeout
+    )
+    return [
+        [dict(zip(_columns, row[1:])) for row in rows]
+        for rows in results
+    ]
@@ -0,0 +1 @@
+CREATE EXTENSION IF NOT EXISTS {extension}
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE SCHEMA IF NOT EXISTS {schema}
\ No newline at end of file
@@ -0,0 +1 @@
+SELECT extname FROM pg_extension WHERE extname = ANY({extensions})
\ No newline at end of file
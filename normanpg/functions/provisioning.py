@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.functions.provisioning
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a provisioning engine that creates databases, and the
+extensions and schemas within them, from a declarative specification.
+
+.. code-block:: python
+
+    from normanpg.functions.provisioning import provision
+
+    report = provision(
+        url,
+        {
+            'tenant_a': {'extensions': ['postgis'], 'schemas': ['raw', 'app']},
+            'tenant_b': {'extensions': ['postgis'], 'schemas': ['raw', 'app']}
+        },
+        max_workers=8
+    )
+    for step in report.steps:
+        print(step)
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+import psycopg2.extensions
+from psycopg2.sql import Identifier, Literal
+from ..errors import NormanPgException
+from ..phrasebooks import LazySqlPhrasebook
+from ..pg import connect, execute, execute_rows, DEFAULT_ADMIN_DB
+from .database import _create_db, _dbs_exist, _schemas_exist
+
+_PHRASEBOOK = LazySqlPhrasebook(__file__)
+
+DEFAULT_MAX_WORKERS: int = 4  #: the default number of databases at a time
+
+DATABASE = 'database'  #: a step that creates a database
+EXTENSION = 'extension'  #: a step that creates an extension
+SCHEMA = 'schema'  #: a step that creates a schema
+
+#: a provisioning specification maps database names to the names of the
+#: `extensions` and `schemas` they should contain
+ProvisionSpec = Mapping[str, Mapping[str, Sequence[str]]]
+
+_SPEC_KEYS = ('extensions', 'schemas')  #: the keys of a database's spec
+
+
+class ProvisionStep:
+    """
+    A provisioning step records what happened to a single object.
+    """
+    __slots__ = ('dbname', 'kind', 'name', 'created', 'elapsed', 'error')
+
+    def __init__(self, dbname: str, kind: str, name: str):
+        """
+
+        :param dbname: the name of the database
+        :param kind: the kind of object (:py:data:`DATABASE`,
+            :py:data:`EXTENSION` or :py:data:`SCHEMA`)
+        :param name: the name of the object
+        """
+        self.dbname: str = dbname  #: the name of the database
+        self.kind: str = kind  #: the kind of object
+        self.name: str = name  #: the name of the object
+        self.created: bool = False  #: Was the object created?
+        self.elapsed: float = 0.0  #: the time the step took (in seconds)
+        self.error: Exception or None = None  #: the error (if it failed)
+
+    def __repr__(self):
+        outcome = (
+            f'failed: {self.error}' if self.error
+            else 'created' if self.created
+            else 'exists'
+        )
+        return (
+            f'ProvisionStep({self.dbname} {self.kind} {self.name}: {outcome}, '
+            f'{self.elapsed:.3f}s)'
+        )
+
+
+class ProvisionReport:
+    """
+    A provisioning report lists the steps taken by :py:func:`provision`.
+    """
+    def __init__(self):
+        self._steps: List[ProvisionStep] = []
+        self._lock = threading.Lock()
+        self.elapsed: float = 0.0  #: the total time (in seconds)
+
+    def add(self, step: ProvisionStep) -> ProvisionStep:
+        """
+        Add a step to the report.
+
+        :param step: the step
+        :return: the step
+        """
+        with self._lock:
+            self._steps.append(step)
+        return step
+
+    @property
+    def steps(self) -> List[ProvisionStep]:
+        """
+        Get the steps (in the order in which they were taken).
+        """
+        with self._lock:
+            return list(self._steps)
+
+    @property
+    def errors(self) -> List[ProvisionStep]:
+        """
+        Get the steps that failed.
+        """
+        return [step for step in self.steps if step.error is not None]
+
+    @property
+    def created(self) -> List[ProvisionStep]:
+        """
+        Get the steps that created objects.
+        """
+        return [step for step in self.steps if step.created]
+
+    def timings(self) -> Dict[str, float]:
+        """
+        Get the total time spent on each kind of step.
+
+        :return: the seconds spent, indexed by kind
+        """
+        timings = {DATABASE: 0.0, EXTENSION: 0.0, SCHEMA: 0.0}
+        for step in self.steps:
+            timings[step.kind] += step.elapsed
+        return timings
+
+
+class ProvisioningError(NormanPgException):
+    """
+    Raised when one or more provisioning steps fail.
+    """
+    def __init__(self, message: str, report: ProvisionReport):
+        """
+
+        :param message: the exception message
+        :param report: the provisioning report
+        """
+        errors = report.errors
+        super().__init__(
+            message=message, inner=errors[0].error if errors else None
+        )
+        self._report = report
+
+    @property
+    def report(self) -> ProvisionReport:
+        """
+        Get the provisioning report.
+        """
+        return self._report
+
+
+def _names(dbname: str, key: str, names: Any) -> List[str]:
+    """
+    Get a list of names from a database's specification.
+    """
+    if names is None:
+        return []
+    # A lone name is easy to write by mistake (and mustn't be taken apart
+    # into characters).
+    if isinstance(names, str):
+        return [names]
+    try:
+        return list(names)
+    except TypeError:
+        raise ValueError(
+            f'The {key} for the {dbname} database must be a list of names.'
+        )
+
+
+def _plan(spec: ProvisionSpec) -> Dict[str, Tuple[List[str], List[str]]]:
+    """
+    Check a provisioning specification and get the extensions and schemas
+    for each database.
+
+    :param spec: the specification
+    :return: the names of each database's extensions and schemas
+    :raises ValueError: if the specification is malformed
+    """
+    plan = {}
+    for dbname, objects in spec.items():
+        # A database with nothing in it may be given without a mapping.
+        _objects = objects if objects is not None else {}
+        if not isinstance(_objects, Mapping):
+            raise ValueError(
+                f'The specification for the {dbname} database must map '
+                f'{" and ".join(_SPEC_KEYS)} to lists of names.'
+            )
+        unknown = [key for key in _objects if key not in _SPEC_KEYS]
+        if unknown:
+            raise ValueError(
+                f'The specification for the {dbname} database has unknown '
+                f'keys: {", ".join(str(key) for key in unknown)}'
+            )
+        plan[dbname] = (
+            _names(dbname, 'extensions', _objects.get('extensions')),
+            _names(dbname, 'schemas', _objects.get('schemas'))
+        )
+    return plan
+
+
+def _existing_extensions(
+        cnx: psycopg2.extensions.connection,
+        extensions: Iterable[str],
+        timeout: float = None
+) -> set:
+    """
+    Find out which of a set of extensions exist with a single query.
+    """
+    _extensions = list(extensions)
+    if not _extensions:
+        return set()
+    query = _PHRASEBOOK.sql('select_extension_names').format(
+        extensions=Literal(_extensions)
+    )
+    return {
+        row[0] for row in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    }
+
+
+def _provision_db(
+        url: str,
+        db_step: ProvisionStep,
+        extensions: Sequence[str],
+        schemas: Sequence[str],
+        report: ProvisionReport,
+        timeout: float = None
+):
+    """
+    Create the extensions (and then the schemas) in a single database on a
+    single connection.  (If a step fails, the remaining steps are skipped.)
+    """
+    dbname = db_step.dbname
+    try:
+        cnx = connect(url=url, dbname=dbname, autocommit=True)
+    except Exception as ex:  # pylint: disable=broad-except
+        db_step.error = ex
+        return
+    try:
+        try:
+            existing_exts = _existing_extensions(
+                cnx=cnx, extensions=extensions, timeout=timeout
+            )
+            existing_schemas = {
+                schema for schema, exists in _schemas_exist(
+                    cnx=cnx, schemas=schemas, timeout=timeout
+                ).items()
+                if exists
+            }
+        except Exception as ex:  # pylint: disable=broad-except
+            db_step.error = ex
+            return
+        for kind, names, existing, phrase, param in (
+                (
+                    EXTENSION, extensions, existing_exts,
+                    'create_extension', 'extension'
+                ),
+                (
+                    SCHEMA, schemas, existing_schemas,
+                    'create_schema', 'schema'
+                )
+        ):
+            for name in names:
+                step = report.add(
+                    ProvisionStep(dbname=dbname, kind=kind, name=name)
+                )
+                if name in existing:
+                    continue
+                started = time.perf_counter()
+                try:
+                    execute(
+                        cnx=cnx,
+                        query=_PHRASEBOOK.sql(phrase).format(
+                            **{param: Identifier(name)}
+                        ),
+                        caller='provision',
+                        timeout=timeout
+                    )
+                    step.created = True
+                except Exception as ex:  # pylint: disable=broad-except
+                    step.error = ex
+                    return
+                finally:
+                    step.elapsed = time.perf_counter() - started
+    finally:
+        cnx.close()
+
+
+def provision(
+        url: str,
+        spec: ProvisionSpec,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        admindb: str = DEFAULT_ADMIN_DB,
+        raise_on_error: bool = True,
+        timeout: float = None
+) -> ProvisionReport:
+    """
+    Create the databases in a specification (if they don't exist), then the
+    extensions and schemas within each of them.
+
+    :param url: the database URL
+    :param spec: maps the names of the databases to dictionaries with the
+        names of their `extensions` and `schemas` (in the order in which
+        they should be created)
+    :raises ValueError: if the specification is malformed (in which case
+        nothing is done)
+    :param max_workers: the number of databases provisioned at a time
+    :param admindb: the name of an existing (presumably the main) database
+    :param raise_on_error: Raise a :py:class:`ProvisioningError` if any step
+        fails?  (Otherwise, check the report's `errors`.)
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: the report
+
+    .. note::
+
+        The databases are created one at a time on a single connection to
+        the administrative database (since each one is a copy of the same
+        template), but each is handed to the worker pool as soon as it
+        exists.  The workers use a single connection per database and
+        create its extensions before its schemas.  A failure in one database
+        doesn't stop the others.
+    """
+    started = time.perf_counter()
+    plan = _plan(spec)
+    report = ProvisionReport()
+    futures: List[Future] = []
+    with ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='normanpg-provision'
+    ) as executor:
+
+        def _submit(db_step: ProvisionStep):
+            extensions, schemas = plan[db_step.dbname]
+            futures.append(
+                executor.submit(
+                    _provision_db,
+                    url=url,
+                    db_step=db_step,
+                    extensions=extensions,
+                    schemas=schemas,
+                    report=report,
+                    timeout=timeout
+                )
+            )
+
+        # `CREATE DATABASE` can't run inside a transaction block.
+        cnx = connect(url=url, dbname=admindb, autocommit=True)
+        try:
+            existing = {
+                dbname for dbname, exists in _dbs_exist(
+                    cnx=cnx, dbnames=plan, timeout=timeout
+                ).items()
+                if exists
+            }
+            db_steps = [
+                report.add(
+                    ProvisionStep(dbname=dbname, kind=DATABASE, name=dbname)
+                )
+                for dbname in plan
+            ]
+            # The databases that already exist can be started right away.
+            for step in db_steps:
+                if step.dbname in existing:
+                    _submit(step)
+            for step in db_steps:
+                if step.dbname in existing:
+                    continue
+                _started = time.perf_counter()
+                try:
+                    _create_db(cnx=cnx, dbname=step.dbname, timeout=timeout)
+                    step.created = True
+                except Exception as ex:  # pylint: disable=broad-except
+                    step.error = ex
+                    continue
+                finally:
+                    step.elapsed = time.perf_counter() - _started
+                _submit(step)
+        finally:
+            cnx.close()
+        for future in futures:
+            future.result()
+    report.elapsed = time.perf_counter() - started
+    if raise_on_error and report.errors:
+        raise ProvisioningError(
+            f'{len(report.errors)} provisioning step(s) failed.', report
+        )
+    return report
@@ -0,0 +1 @@
+CLUSTER {table} USING {index}
\ No newline at end of file
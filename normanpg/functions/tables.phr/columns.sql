@@ -0,0 +1,4 @@
+SELECT column_name
+FROM information_schema.columns
+WHERE table_schema = {schema} AND table_name = {table}
+ORDER BY ordinal_position
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX {concurrently}{index} ON {table} USING {method} ({geomcol})
\ No newline at end of file
@@ -0,0 +1 @@
+DROP INDEX {concurrently}IF EXISTS {index}
\ No newline at end of file
@@ -0,0 +1,10 @@
+SELECT
+    g.f_geometry_column,
+    ST_XMin(e.extent), ST_YMin(e.extent), ST_XMax(e.extent), ST_YMax(e.extent)
+FROM geometry_columns g
+CROSS JOIN LATERAL (
+    SELECT ST_EstimatedExtent(
+        g.f_table_schema::text, g.f_table_name::text, g.f_geometry_column::text
+    ) AS extent
+) e
+WHERE g.f_table_schema = {schema} AND g.f_table_name = {table}
\ No newline at end of file
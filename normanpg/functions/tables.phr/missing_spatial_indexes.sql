@@ -0,0 +1,46 @@
+SELECT
+    g.f_table_name,
+    g.f_geometry_column,
+    CASE WHEN c.reltuples < 0 THEN NULL ELSE c.reltuples::bigint END,
+    pg_total_relation_size(c.oid),
+    ARRAY(
+        SELECT i.relname::text
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = x.indkey[0]
+        WHERE x.indrelid = c.oid
+        AND a.attname = g.f_geometry_column
+        AND am.amname IN ('gist', 'spgist')
+        AND NOT (x.indisvalid AND x.indisready)
+        ORDER BY i.relname
+    ),
+    ARRAY(
+        SELECT i.relname::text
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_am am ON am.oid = i.relam
+        JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = x.indkey[0]
+        WHERE x.indrelid = c.oid
+        AND a.attname = g.f_geometry_column
+        AND am.amname IN ('gist', 'spgist')
+        AND x.indisvalid AND x.indisready AND x.indpred IS NOT NULL
+        ORDER BY i.relname
+    )
+FROM geometry_columns g
+JOIN pg_namespace n ON n.nspname = g.f_table_schema
+JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = g.f_table_name
+WHERE g.f_table_schema = {schema}
+AND c.relkind IN ('r', 'p', 'm')
+AND NOT EXISTS (
+    SELECT 1
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_am am ON am.oid = i.relam
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = x.indkey[0]
+    WHERE x.indrelid = c.oid
+    AND a.attname = g.f_geometry_column
+    AND am.amname IN ('gist', 'spgist')
+    AND x.indisvalid AND x.indisready AND x.indpred IS NULL
+)
+ORDER BY pg_total_relation_size(c.oid) DESC, g.f_table_name
\ No newline at end of file
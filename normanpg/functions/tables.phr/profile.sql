@@ -0,0 +1,13 @@
+SELECT
+    CASE WHEN c.reltuples < 0 THEN NULL ELSE c.reltuples::bigint END,
+    pg_relation_size(c.oid),
+    pg_indexes_size(c.oid),
+    pg_total_relation_size(c.oid),
+    (
+        SELECT json_object_agg(s.attname, s.null_frac)
+        FROM pg_stats s
+        WHERE s.schemaname = n.nspname AND s.tablename = c.relname
+    )
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = {schema} AND c.relname = {table}
\ No newline at end of file
@@ -0,0 +1 @@
+SELECT {columns} FROM {table} TABLESAMPLE {method} ({percent}){repeatable}{limit}
\ No newline at end of file
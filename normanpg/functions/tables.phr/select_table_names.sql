@@ -0,0 +1,4 @@
+SELECT table_name
+FROM   information_schema.tables
+WHERE  table_schema = {schema}
+AND    table_name = ANY({tables})
\ No newline at end of file
@@ -0,0 +1,17 @@
+SELECT
+    i.relname,
+    am.amname,
+    x.indisvalid AND x.indisready,
+    x.indpred IS NOT NULL,
+    pg_relation_size(i.oid),
+    x.indisclustered
+FROM pg_index x
+JOIN pg_class t ON t.oid = x.indrelid
+JOIN pg_namespace n ON n.oid = t.relnamespace
+JOIN pg_class i ON i.oid = x.indexrelid
+JOIN pg_am am ON am.oid = i.relam
+JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = x.indkey[0]
+WHERE n.nspname = {schema} AND t.relname = {table}
+AND a.attname = {geomcol}
+AND am.amname IN ('gist', 'spgist')
+ORDER BY i.relname
\ No newline at end of file
@@ -8,14 +8,16 @@
 
 This module contains table-level functions.
 """
-from typing import Union
-from phrasebook import SqlPhrasebook
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Sequence, Union
 import psycopg2.extensions
-from psycopg2.sql import SQL, Literal
+import psycopg2.extras
+from psycopg2.sql import Identifier, Literal, SQL
 from ..errors import NormanPgException
-from ..pg import connect, execute_rows, execute_scalar
+from ..phrasebooks import LazySqlPhrasebook
+from ..pg import connect, execute, execute_rows, execute_scalar
 
-_PHRASEBOOK = SqlPhrasebook().load()
+_PHRASEBOOK = LazySqlPhrasebook(__file__)
 
 
 class InvalidSrsException(NormanPgException):
@@ -38,29 +40,133 @@ class NoGeometryColumn(NormanPgException):
     """
 
 
+class NoSuchTable(NormanPgException):
+    """
+    Raised if an attempt is made to access a table that doesn't exist.
+    """
+
+
+class IndexNameTaken(NormanPgException):
+    """
+    Raised if an attempt is made to create an index with the name of a valid
+    index that can't stand in for it.
+    """
+
+
+SAMPLE_METHODS = ('SYSTEM', 'BERNOULLI')  #: the `TABLESAMPLE` methods
+SPATIAL_INDEX_METHODS = ('GIST', 'SPGIST')  #: the spatial index methods
+#: the longest identifier (in bytes) PostgreSQL keeps (`NAMEDATALEN` - 1)
+MAX_IDENTIFIER_BYTES = 63
+
+
 def table_exists(
         cnx: Union[str, psycopg2.extensions.connection],
         table_name: str,
-        schema_name: str
+        schema_name: str,
+        timeout: float = None
 ) -> bool:
     """
 
     :param cnx: an open connection or database connection string
     :param table_name: the name of the table
     :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
     :return: ``True`` if the table exists, otherwise ``False``
     """
-    query = SQL(_PHRASEBOOK.gets('table_exists')).format(
+    query = _PHRASEBOOK.sql('table_exists').format(
+        table=Literal(table_name),
+        schema=Literal(schema_name)
+    )
+    return execute_scalar(cnx=cnx, query=query, timeout=timeout)
+
+
+def tables_exist(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_names: Iterable[str],
+        schema_name: str,
+        timeout: float = None
+) -> Dict[str, bool]:
+    """
+    Which of a given set of tables exist within a schema?
+
+    :param cnx: an open connection or database connection string
+    :param table_names: the names of the tables
+    :param schema_name: the name of the schema in which the tables reside
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a mapping of table names to ``True`` if the table exists,
+        otherwise ``False``
+    """
+    _table_names = list(dict.fromkeys(table_names))
+    # If there's nothing to look for, there's no reason to ask.
+    if not _table_names:
+        return {}
+    query = _PHRASEBOOK.sql('select_table_names').format(
+        tables=Literal(_table_names),
+        schema=Literal(schema_name)
+    )
+    found = {
+        row[0] for row
+        in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    }
+    return {name: name in found for name in _table_names}
+
+
+def table_columns(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        timeout: float = None
+) -> List[str]:
+    """
+    Get the names of the columns in a table.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: the column names (in order)
+    """
+    query = _PHRASEBOOK.sql('columns').format(
+        table=Literal(table_name),
+        schema=Literal(schema_name)
+    )
+    return [
+        row[0] for row
+        in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    ]
+
+
+def column_types(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        timeout: float = None
+) -> Dict[str, str]:
+    """
+    Get the types of the columns in a table.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: the column names (in order) mapped to the names of their types
+        (as in `pg_type`, e.g. `int4`, `varchar`, or `geometry`)
+    """
+    query = _PHRASEBOOK.sql('column_types').format(
         table=Literal(table_name),
         schema=Literal(schema_name)
     )
-    return execute_scalar(cnx=cnx, query=query)
+    return {
+        row[0]: row[1] for row
+        in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    }
 
 
 def geometry_column(
         cnx: Union[str, psycopg2.extensions.connection],
         table_name: str,
-        schema_name: str
+        schema_name: str,
+        timeout: float = None
 ) -> str or None:
     """
     Get the name of the geometry column in a feature table.
@@ -68,13 +174,17 @@ def geometry_column(
     :param cnx: an open connection or database connection string
     :param table_name: the name of the table
     :param schema_name:
+    :param timeout: the number of seconds after which a query is cancelled
     :return: the name of the geometry column
     """
-    query = SQL(_PHRASEBOOK.gets('geometry_column')).format(
+    query = _PHRASEBOOK.sql('geometry_column').format(
         table=Literal(table_name),
         schema=Literal(schema_name)
     )
-    results = list(execute_rows(cnx=cnx, query=query))
+    # We only need to know whether there's more than one.
+    results = list(
+        islice(execute_rows(cnx=cnx, query=query, timeout=timeout), 2)
+    )
     if not results:
         return None
     elif len(results) > 1:
@@ -85,7 +195,8 @@ def geometry_column(
 def srid(
         cnx: Union[str, psycopg2.extensions.connection],
         table_name: str,
-        schema_name: str
+        schema_name: str,
+        timeout: float = None
 ) -> int:
     """
     Get the SRID for geometries in a feature table.
@@ -93,6 +204,7 @@ def srid(
     :param cnx: an open connection or database connection string
     :param table_name: the name of the table
     :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
     :return: the SRID for geometries in the table
     """
     # We need to make multiple database calls, so if we were passed a string...
@@ -111,19 +223,560 @@ def srid(
         _geometry_column = geometry_column(
             cnx=_cnx,
             table_name=table_name,
-            schema_name=schema_name
+            schema_name=schema_name,
+            timeout=timeout
         )
         if not _geometry_column:
             raise NoGeometryColumn(
                 'No geometry column is associated with the specified table '
                 'and schema names.'
             )
-        query = SQL(_PHRASEBOOK.gets('srid')).format(
+        query = _PHRASEBOOK.sql('srid').format(
             table=Literal(table_name),
             schema=Literal(schema_name),
             geomcol=Literal(_geometry_column)
         )
-        return execute_scalar(cnx=cnx, query=query)
+        return execute_scalar(cnx=_cnx, query=query, timeout=timeout)
     finally:
         if close:
             _cnx.close()
+
+
+def estimated_rows(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        timeout: float = None
+) -> int or None:
+    """
+    Get the planner's estimate of the number of rows in a table.  (This is
+    much cheaper than `COUNT(*)` on a large table.)
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: the estimated number of rows, or `None` if the table has never
+        been analyzed
+    """
+    query = _PHRASEBOOK.sql('estimated_rows').format(
+        table=Literal(table_name),
+        schema=Literal(schema_name)
+    )
+    return execute_scalar(cnx=cnx, query=query, timeout=timeout)
+
+
+def profile_table(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        extent: bool = True,
+        timeout: float = None
+) -> Dict[str, Any]:
+    """
+    Get estimated statistics for a table from the catalog (without scanning
+    the table).
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param extent: ``True`` to include the estimated extent of the geometry
+        column (which requires PostGIS)
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a dictionary with these keys:
+
+        * `estimated_rows`: the estimated number of rows (or `None` if the
+          table has never been analyzed)
+        * `table_bytes`: the size of the table on disk
+        * `index_bytes`: the size of the table's indexes on disk
+        * `total_bytes`: the total size on disk (including TOAST data)
+        * `null_fractions`: a mapping of column names to the estimated
+          fractions of their values that are `NULL`
+        * `geometry_column`: the name of the geometry column (if any)
+        * `extent`: the estimated extent of the geometry column as a
+          (min x, min y, max x, max y) tuple (if it's available)
+    """
+    # We need to make multiple database calls, so if we were passed a string...
+    if isinstance(cnx, str):
+        # ...create a connection and note that we need to close it.
+        _cnx = connect(cnx)
+        close = True
+    else:
+        _cnx = cnx
+        close = False
+    try:
+        query = _PHRASEBOOK.sql('profile').format(
+            table=Literal(table_name),
+            schema=Literal(schema_name)
+        )
+        rows = list(execute_rows(cnx=_cnx, query=query, timeout=timeout))
+        if not rows:
+            raise NoSuchTable(
+                f'The table {schema_name}.{table_name} does not exist.'
+            )
+        row = rows[0]
+        profile = {
+            'estimated_rows': row[0],
+            'table_bytes': row[1],
+            'index_bytes': row[2],
+            'total_bytes': row[3],
+            'null_fractions': row[4] if row[4] else {},
+            'geometry_column': None,
+            'extent': None
+        }
+        if extent:
+            query = _PHRASEBOOK.sql('estimated_extent').format(
+                table=Literal(table_name),
+                schema=Literal(schema_name)
+            )
+            extents = list(
+                execute_rows(cnx=_cnx, query=query, timeout=timeout)
+            )
+            if len(extents) > 1:
+                raise TooManyGeometryColumns(
+                    'The table has multiple geometry columns.'
+                )
+            if extents:
+                profile['geometry_column'] = extents[0][0]
+                if extents[0][1] is not None:
+                    profile['extent'] = tuple(extents[0][1:5])
+        return profile
+    finally:
+        if close:
+            _cnx.close()
+
+
+def sample_rows(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        percent: float = None,
+        rows: int = None,
+        method: str = 'SYSTEM',
+        seed: float = None,
+        columns: Sequence[str] = None,
+        timeout: float = None
+) -> Iterable[psycopg2.extras.DictRow]:
+    """
+    Get an approximate sample of the rows in a table with `TABLESAMPLE`.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param percent: the percentage of the table to sample
+    :param rows: the (approximate) number of rows to sample (If you don't
+        supply a `percent`, it's calculated from the estimated number of
+        rows in the table.)
+    :param method: the sampling method: ``SYSTEM`` (which samples whole
+        pages, and is faster) or ``BERNOULLI`` (which samples individual
+        rows, and is more random)
+    :param seed: a seed that makes the sample repeatable
+    :param columns: the columns to select (The default is all of them.)
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: an iteration of `DictRow` instances representing the rows
+    """
+    _method = method.upper()
+    if _method not in SAMPLE_METHODS:
+        raise ValueError(
+            f'The sampling method must be one of {", ".join(SAMPLE_METHODS)}.'
+        )
+    if percent is None and rows is None:
+        raise ValueError('Specify a percentage or a number of rows.')
+    _percent = percent
+    if _percent is None:
+        total = estimated_rows(
+            cnx=cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            timeout=timeout
+        )
+        # If we don't know how big the table is, we have to look at all of
+        # it.  Otherwise, oversample a little (and limit the result) since
+        # the sample size is only approximate.
+        _percent = (
+            100.0 if not total
+            else min(100.0, 100.0 * rows * 1.1 / total)
+        )
+    query = _PHRASEBOOK.sql('sample').format(
+        columns=(
+            SQL(', ').join(Identifier(c) for c in columns)
+            if columns else SQL('*')
+        ),
+        table=SQL('{}.{}').format(
+            Identifier(schema_name), Identifier(table_name)
+        ),
+        method=SQL(_method),
+        percent=Literal(float(_percent)),
+        repeatable=(
+            SQL(' REPEATABLE ({})').format(Literal(seed))
+            if seed is not None else SQL('')
+        ),
+        limit=(
+            SQL(' LIMIT {}').format(Literal(int(rows)))
+            if rows is not None else SQL('')
+        )
+    )
+    return execute_rows(cnx=cnx, query=query, timeout=timeout)
+
+
+def _require_geometry_column(
+        cnx: psycopg2.extensions.connection,
+        table_name: str,
+        schema_name: str,
+        timeout: float = None
+) -> str:
+    """
+    Get the name of a table's geometry column (or raise an exception if it
+    doesn't have one).
+    """
+    geomcol = geometry_column(
+        cnx=cnx,
+        table_name=table_name,
+        schema_name=schema_name,
+        timeout=timeout
+    )
+    if not geomcol:
+        raise NoGeometryColumn(
+            'No geometry column is associated with the specified table '
+            'and schema names.'
+        )
+    return geomcol
+
+
+def _clip(name: str, size: int) -> str:
+    """
+    Clip a name to a number of (UTF-8) bytes without splitting a character.
+    """
+    return name.encode('utf-8')[:size].decode('utf-8', errors='ignore')
+
+
+def _truncate_identifier(name: str) -> str:
+    """
+    Truncate an identifier the way PostgreSQL does when it's too long.
+    """
+    return _clip(name, MAX_IDENTIFIER_BYTES)
+
+
+def _default_index_name(table_name: str, geomcol: str) -> str:
+    """
+    Make the default name of a spatial index (`{table}_{column}_idx`).  Like
+    PostgreSQL's own generated names, the longer of the table and column
+    names is shortened until the whole name fits, so the suffix survives.
+    """
+    label = '_idx'
+    available = MAX_IDENTIFIER_BYTES - len(label) - 1
+    table_bytes = len(table_name.encode('utf-8'))
+    column_bytes = len(geomcol.encode('utf-8'))
+    while table_bytes + column_bytes > available:
+        if table_bytes > column_bytes:
+            table_bytes -= 1
+        else:
+            column_bytes -= 1
+    return (
+        f'{_clip(table_name, table_bytes)}_{_clip(geomcol, column_bytes)}'
+        f'{label}'
+    )
+
+
+def _spatial_indexes(
+        cnx: psycopg2.extensions.connection,
+        table_name: str,
+        schema_name: str,
+        geomcol: str,
+        timeout: float = None
+) -> List[Dict[str, Any]]:
+    """
+    This is a helper function for :py:func:`spatial_indexes` that looks up
+    the indexes on a known geometry column.
+    """
+    query = _PHRASEBOOK.sql('spatial_indexes').format(
+        table=Literal(table_name),
+        schema=Literal(schema_name),
+        geomcol=Literal(geomcol)
+    )
+    return [
+        {
+            'index_name': row[0],
+            'method': row[1].upper(),
+            'usable': row[2] and not row[3],
+            'valid': row[2],
+            'partial': row[3],
+            'index_bytes': row[4],
+            'clustered': row[5]
+        }
+        for row in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    ]
+
+
+def spatial_indexes(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        timeout: float = None
+) -> List[Dict[str, Any]]:
+    """
+    Get the GiST and SP-GiST indexes on a feature table's geometry column.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a dictionary for each index with these keys:
+
+        * `index_name`: the name of the index
+        * `method`: the index method (``GIST`` or ``SPGIST``)
+        * `usable`: whether the planner can use the index (An index left
+          behind by a failed concurrent build, or a partial index, isn't.)
+        * `valid`: whether the index has been built (An index left behind
+          by a failed concurrent build hasn't.)
+        * `partial`: whether the index covers only some of the rows
+        * `index_bytes`: the size of the index on disk
+        * `clustered`: whether the table was last clustered on the index
+    """
+    # We need to make multiple database calls, so if we were passed a string...
+    if isinstance(cnx, str):
+        # ...create a connection and note that we need to close it.
+        _cnx = connect(cnx)
+        close = True
+    else:
+        _cnx = cnx
+        close = False
+    try:
+        geomcol = _require_geometry_column(
+            cnx=_cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            timeout=timeout
+        )
+        return _spatial_indexes(
+            cnx=_cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            geomcol=geomcol,
+            timeout=timeout
+        )
+    finally:
+        if close:
+            _cnx.close()
+
+
+def has_spatial_index(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        timeout: float = None
+) -> bool:
+    """
+    Does a feature table have a usable spatial index on its geometry column?
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: ``True`` if the table has a usable GiST or SP-GiST index,
+        otherwise ``False``
+    """
+    return any(
+        index['usable'] for index in spatial_indexes(
+            cnx=cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            timeout=timeout
+        )
+    )
+
+
+def create_spatial_index(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str,
+        method: str = 'GIST',
+        index_name: str = None,
+        concurrently: bool = True,
+        cluster: bool = False,
+        analyze: bool = True,
+        timeout: float = None
+) -> str:
+    """
+    Make sure a feature table has a usable spatial index on its geometry
+    column, creating one if it doesn't.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param method: the index method (``GIST`` or ``SPGIST``)
+    :param index_name: the name of the index (The default is
+        `{table_name}_{geometry column}_idx`, shortened if it's longer than
+        :py:data:`MAX_IDENTIFIER_BYTES`.)
+    :param concurrently: Build the index with `CREATE INDEX CONCURRENTLY`
+        (so that writes to the table aren't blocked)?
+    :param cluster: Reorder the table on the index with `CLUSTER`?
+    :param analyze: Update the table's statistics with `ANALYZE`?
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: the name of the usable spatial index
+
+    :raises IndexNameTaken: if a valid (but partial) index already has the
+        name
+
+    .. note::
+
+        A concurrent build can't run inside a transaction, so if you pass an
+        open connection it must be in `autocommit` mode.  If the build fails,
+        the invalid index it leaves behind is dropped.  (An invalid index
+        with the name left behind by an earlier build is dropped, too, but a
+        valid index never is.)
+
+    .. warning::
+
+        `CLUSTER` rewrites the table and locks it (against reads as well as
+        writes) while it does.
+    """
+    _method = method.upper()
+    if _method not in SPATIAL_INDEX_METHODS:
+        raise ValueError(
+            f'The index method must be one of '
+            f'{", ".join(SPATIAL_INDEX_METHODS)}.'
+        )
+    # We need to make multiple database calls, so if we were passed a string...
+    if isinstance(cnx, str):
+        # ...create a connection and note that we need to close it.
+        _cnx = connect(cnx, autocommit=True)
+        close = True
+    else:
+        if concurrently and not cnx.autocommit:
+            raise ValueError(
+                'CREATE INDEX CONCURRENTLY requires an autocommit connection.'
+            )
+        _cnx = cnx
+        close = False
+    try:
+        geomcol = _require_geometry_column(
+            cnx=_cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            timeout=timeout
+        )
+        indexes = _spatial_indexes(
+            cnx=_cnx,
+            table_name=table_name,
+            schema_name=schema_name,
+            geomcol=geomcol,
+            timeout=timeout
+        )
+        _index_name = next(
+            (i['index_name'] for i in indexes if i['usable']), None
+        )
+        table = SQL('{}.{}').format(
+            Identifier(schema_name), Identifier(table_name)
+        )
+        _concurrently = SQL('CONCURRENTLY ' if concurrently else '')
+        if _index_name is None:
+            # PostgreSQL truncates long names, so we do the same (or we'd
+            # never find an invalid index left behind under the short one).
+            _index_name = (
+                _truncate_identifier(index_name) if index_name
+                else _default_index_name(table_name, geomcol)
+            )
+            index = SQL('{}.{}').format(
+                Identifier(schema_name), Identifier(_index_name)
+            )
+            existing = next(
+                (i for i in indexes if i['index_name'] == _index_name), None
+            )
+            if existing is not None and existing['valid']:
+                raise IndexNameTaken(
+                    f'The {_index_name} index on {schema_name}.{table_name} '
+                    f'is partial.  Choose another name for the spatial '
+                    f'index.'
+                )
+            # If an earlier build failed, it left an invalid index behind.
+            if existing is not None:
+                execute(
+                    cnx=_cnx,
+                    query=_PHRASEBOOK.sql('drop_index').format(
+                        concurrently=_concurrently, index=index
+                    ),
+                    timeout=timeout
+                )
+            try:
+                execute(
+                    cnx=_cnx,
+                    query=_PHRASEBOOK.sql('create_spatial_index').format(
+                        concurrently=_concurrently,
+                        index=Identifier(_index_name),
+                        table=table,
+                        method=SQL(_method),
+                        geomcol=Identifier(geomcol)
+                    ),
+                    timeout=timeout
+                )
+            except Exception:
+                # A failed concurrent build leaves an invalid index behind.
+                if concurrently:
+                    execute(
+                        cnx=_cnx,
+                        query=_PHRASEBOOK.sql('drop_index').format(
+                            concurrently=_concurrently, index=index
+                        )
+                    )
+                raise
+        if cluster:
+            execute(
+                cnx=_cnx,
+                query=_PHRASEBOOK.sql('cluster').format(
+                    table=table, index=Identifier(_index_name)
+                ),
+                timeout=timeout
+            )
+        if analyze:
+            execute(
+                cnx=_cnx,
+                query=_PHRASEBOOK.sql('analyze').format(table=table),
+                timeout=timeout
+            )
+        return _index_name
+    finally:
+        if close:
+            _cnx.close()
+
+
+def audit_spatial_indexes(
+        cnx: Union[str, psycopg2.extensions.connection],
+        schema_name: str,
+        timeout: float = None
+) -> List[Dict[str, Any]]:
+    """
+    Find the geometry columns in a schema that don't have a usable spatial
+    index (including those whose only spatial indexes are invalid or
+    partial).
+
+    :param cnx: an open connection or database connection string
+    :param schema_name: the name of the schema
+    :param timeout: the number of seconds after which a query is cancelled
+    :return: a dictionary for each unindexed geometry column (largest tables
+        first) with these keys:
+
+        * `table_name`: the name of the table
+        * `geometry_column`: the name of the geometry column
+        * `estimated_rows`: the estimated number of rows (or `None` if the
+          table has never been analyzed)
+        * `total_bytes`: the total size of the table on disk
+        * `invalid_indexes`: the names of the column's invalid spatial
+          indexes (left behind by failed concurrent builds)
+        * `partial_indexes`: the names of the column's partial spatial
+          indexes
+    """
+    query = _PHRASEBOOK.sql('missing_spatial_indexes').format(
+        schema=Literal(schema_name)
+    )
+    return [
+        {
+            'table_name': row[0],
+            'geometry_column': row[1],
+            'estimated_rows': row[2],
+            'total_bytes': row[3],
+            'invalid_indexes': list(row[4]),
+            'partial_indexes': list(row[5])
+        }
+        for row in execute_rows(cnx=cnx, query=query, timeout=timeout)
+    ]
@@ -7,18 +7,579 @@
 .. moduleauthor:: Pat Daburu <pat@daburu.net>
 
 This module contains conveniences for working with geometries.
+
+PostGIS `geometry` and `geography` values normally arrive as hex-encoded WKB
+text.  Register the type casters on a connection (or on every new connection)
+to have them arrive as `Shapely` geometries instead.
+
+.. code-block:: python
+
+    from normanpg.geometry import register_geometry
+
+    register_geometry(cnx)
+    for row in execute_rows(cnx, 'SELECT id, geom FROM parcels'):
+        print(row['geom'].area)
 """
+import threading
+from typing import Dict, List, Tuple
+import numpy as np
+import psycopg2.extensions
+import shapely
+from shapely.geometry import (
+    GeometryCollection, LineString, MultiLineString, MultiPoint,
+    MultiPolygon, Point, Polygon
+)
 from shapely.geometry.base import BaseGeometry
 from shapely import wkb
+from .pg import (
+    add_connect_hook, remove_connect_hook, ForkSafeConnection
+)
 
+#: the PostGIS types that have type casters
+GEOMETRY_TYPES: Tuple[str, ...] = ('geometry', 'geography')
 
-def shape(obj: str) -> BaseGeometry:
+#: the geometry types (indexed by their TWKB type codes)
+TWKB_TYPES: Dict[int, str] = {
+    1: 'POINT',
+    2: 'LINESTRING',
+    3: 'POLYGON',
+    4: 'MULTIPOINT',
+    5: 'MULTILINESTRING',
+    6: 'MULTIPOLYGON',
+    7: 'GEOMETRYCOLLECTION'
+}
+#: TWKB geometries at least this long (in bytes) are decoded with `NumPy`
+TWKB_VECTORIZE_BYTES: int = 64
+
+
+def shape(obj: str or bytes or memoryview) -> BaseGeometry:
     """
     Convert a geometry from Postgres into a
     `Shapely <https://shapely.readthedocs.io/en/stable/manual.html#geometric-objects>`_
     geometry.
 
-    :param obj: the raw geometry retrieved from Postgres (a WKB hex string)
+    :param obj: the raw geometry retrieved from Postgres (a WKB hex string, or
+        binary WKB such as the result of `ST_AsBinary`)
+    :return: the `Shapely` geometry
+    """
+    if isinstance(obj, memoryview):
+        return wkb.loads(obj.tobytes())
+    if isinstance(obj, bytes):
+        return wkb.loads(obj)
+    # Converting the hex ourselves is quicker than letting the WKB reader do
+    # it.
+    return wkb.loads(bytes.fromhex(obj))
+
+
+class LazyGeometry:
+    """
+    A lazy geometry holds the raw value from Postgres and doesn't decode it
+    until the geometry (or one of its attributes) is first needed.
+    """
+    __slots__ = ('_raw', '_geometry')
+
+    def __init__(self, raw: str):
+        """
+
+        :param raw: the raw (hex-encoded WKB) geometry
+        """
+        self._raw = raw
+        self._geometry: BaseGeometry or None = None
+
+    @property
+    def raw(self) -> str:
+        """
+        Get the raw (hex-encoded WKB) geometry.
+        """
+        return self._raw
+
+    @property
+    def decoded(self) -> bool:
+        """
+        Has the geometry been decoded?
+        """
+        return self._geometry is not None
+
+    @property
+    def geometry(self) -> BaseGeometry:
+        """
+        Get the `Shapely` geometry (decoding it, if necessary).
+        """
+        if self._geometry is None:
+            self._geometry = shape(self._raw)
+        return self._geometry
+
+    def __getattr__(self, name: str):
+        # Anything we don't define ourselves comes from the geometry.
+        if name in LazyGeometry.__slots__:
+            raise AttributeError(name)
+        return getattr(self.geometry, name)
+
+    def __repr__(self):
+        return f'LazyGeometry({self.geometry if self.decoded else "..."})'
+
+
+def cast_geometry(
+        value: str or None,
+        _crs: psycopg2.extensions.cursor = None
+) -> BaseGeometry or None:
+    """
+    Cast a raw geometry from Postgres to a `Shapely` geometry.
+
+    :param value: the raw (hex-encoded WKB) geometry
+    :return: the `Shapely` geometry
+    """
+    return wkb.loads(bytes.fromhex(value)) if value is not None else None
+
+
+def cast_lazy_geometry(
+        value: str or None,
+        _crs: psycopg2.extensions.cursor = None
+) -> LazyGeometry or None:
+    """
+    Cast a raw geometry from Postgres to a :py:class:`LazyGeometry`.
+
+    :param value: the raw (hex-encoded WKB) geometry
+    :return: the lazy geometry
+    """
+    return LazyGeometry(value) if value is not None else None
+
+
+#: the (type, array type) OIDs of the geometry types, indexed by database
+_OIDS: Dict[Tuple, Dict[str, Tuple[int, int]]] = {}
+_OIDS_LOCK = threading.Lock()
+
+
+def _unwrap(
+        cnx: psycopg2.extensions.connection or ForkSafeConnection
+) -> psycopg2.extensions.connection:
+    """
+    Get the `psycopg2` connection behind a connection (which may be a
+    :py:class:`normanpg.pg.ForkSafeConnection`).
+    """
+    return cnx.connection if isinstance(cnx, ForkSafeConnection) else cnx
+
+
+def _oids_key(cnx: psycopg2.extensions.connection) -> Tuple:
+    """
+    Get the key under which a connection's database's OIDs are cached.
+    """
+    params = cnx.get_dsn_parameters()
+    return params.get('host'), params.get('port'), params.get('dbname')
+
+
+def geometry_oids(
+        cnx: psycopg2.extensions.connection
+) -> Dict[str, Tuple[int, int]]:
+    """
+    Look up the OIDs of the PostGIS geometry types in a connection's
+    database.  (The OIDs are assigned when the extension is created, so they
+    differ from one database to the next.  They're cached per database, but
+    only once PostGIS is installed.  If the extension is dropped and created
+    again, call :py:func:`invalidate_geometry_oids`.)
+
+    :param cnx: an open connection
+    :return: the (type, array type) OIDs, indexed by type name (The result is
+        empty if PostGIS isn't installed.)
+    """
+    cnx = _unwrap(cnx)
+    key = _oids_key(cnx)
+    try:
+        return _OIDS[key]
+    except KeyError:
+        pass
+    idle = (
+        cnx.get_transaction_status()
+        == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    )
+    with cnx.cursor() as crs:
+        crs.execute(
+            'SELECT typname, oid, typarray FROM pg_type '
+            'WHERE typname IN %s',
+            (GEOMETRY_TYPES,)
+        )
+        oids = {row[0]: (row[1], row[2]) for row in crs.fetchall()}
+    # If we started a transaction just to look, don't leave it open.
+    if idle and not cnx.autocommit:
+        cnx.rollback()
+    # If PostGIS isn't installed (yet), look again next time.
+    if not oids:
+        return oids
+    with _OIDS_LOCK:
+        return _OIDS.setdefault(key, oids)
+
+
+def invalidate_geometry_oids(cnx: psycopg2.extensions.connection = None):
+    """
+    Forget the cached OIDs of the PostGIS geometry types.
+
+    :param cnx: a connection to the database whose OIDs are forgotten (The
+        default is to forget them all.)
+    """
+    with _OIDS_LOCK:
+        if cnx is None:
+            _OIDS.clear()
+        else:
+            _OIDS.pop(_oids_key(_unwrap(cnx)), None)
+
+
+def register_geometry(
+        cnx: psycopg2.extensions.connection or ForkSafeConnection,
+        lazy: bool = False
+) -> Dict[str, Tuple[int, int]]:
+    """
+    Register type casters on a connection so that PostGIS `geometry` and
+    `geography` values (and arrays of them) arrive as `Shapely` geometries.
+
+    :param cnx: an open connection (or a
+        :py:class:`normanpg.pg.ForkSafeConnection`)
+    :param lazy: Cast values to :py:class:`LazyGeometry` proxies (which
+        aren't decoded until they're used) instead?
+    :return: the (type, array type) OIDs of the types that were registered
+    """
+    caster = cast_lazy_geometry if lazy else cast_geometry
+    # The type casters have to be registered on the `psycopg2` connection
+    # itself.
+    cnx = _unwrap(cnx)
+    oids = geometry_oids(cnx)
+    for typname, (oid, array_oid) in oids.items():
+        typ = psycopg2.extensions.new_type((oid,), typname.upper(), caster)
+        psycopg2.extensions.register_type(typ, cnx)
+        if array_oid:
+            psycopg2.extensions.register_type(
+                psycopg2.extensions.new_array_type(
+                    (array_oid,), f'{typname.upper()}[]', typ
+                ),
+                cnx
+            )
+    return oids
+
+
+_CONNECT_HOOK = None  #: the hook that registers new connections
+
+
+def enable_geometry_casts(lazy: bool = False):
+    """
+    Register the geometry type casters on every new connection opened by
+    :py:func:`normanpg.pg.connect`.  (Connections that are already open
+    aren't affected.)
+
+    :param lazy: Cast values to :py:class:`LazyGeometry` proxies instead?
+    """
+    global _CONNECT_HOOK  # pylint: disable=global-statement
+    disable_geometry_casts()
+    _CONNECT_HOOK = add_connect_hook(
+        lambda cnx: register_geometry(cnx, lazy=lazy)
+    )
+
+
+def disable_geometry_casts():
+    """
+    Stop registering the geometry type casters on new connections.
+    """
+    global _CONNECT_HOOK  # pylint: disable=global-statement
+    if _CONNECT_HOOK is not None:
+        remove_connect_hook(_CONNECT_HOOK)
+        _CONNECT_HOOK = None
+
+
+class _TwkbHeader:
+    """
+    A TWKB geometry header.
+    """
+    __slots__ = (
+        'type', 'scales', 'has_z', 'has_bbox', 'has_size', 'has_idlist',
+        'empty'
+    )
+
+    def __init__(self, reader: '_TwkbBytes'):
+        """
+
+        :param reader: a reader positioned at the start of the header
+        """
+        type_precision = reader.byte()
+        metadata = reader.byte()
+        self.type: int = type_precision & 0x0F
+        precision = _unzigzag(type_precision >> 4)
+        self.has_bbox: bool = bool(metadata & 0x01)
+        self.has_size: bool = bool(metadata & 0x02)
+        self.has_idlist: bool = bool(metadata & 0x04)
+        self.empty: bool = bool(metadata & 0x10)
+        self.scales: List[float] = [10.0 ** -precision] * 2
+        self.has_z: bool = False
+        # The extended precision byte describes the Z and M dimensions.
+        if metadata & 0x08:
+            extended = reader.byte()
+            self.has_z = bool(extended & 0x01)
+            if self.has_z:
+                self.scales.append(10.0 ** -((extended >> 2) & 0x07))
+            if extended & 0x02:
+                self.scales.append(10.0 ** -((extended >> 5) & 0x07))
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _unzigzag_array(values: np.ndarray) -> np.ndarray:
+    return (
+        (values >> np.uint64(1)).astype(np.int64)
+        ^ -(values & np.uint64(1)).astype(np.int64)
+    )
+
+
+def _decode_varints(buffer: np.ndarray) -> np.ndarray:
+    """
+    Decode a run of unsigned variable-length integers all at once.
+
+    :param buffer: the encoded bytes
+    :return: the integers
+    """
+    # Each integer ends with a byte that doesn't have its high bit set.
+    ends = np.flatnonzero(buffer < 0x80)
+    if not ends.size:
+        return np.empty(0, dtype=np.uint64)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    used = buffer[:ends[-1] + 1]
+    shifts = (
+        np.arange(used.size) - np.repeat(starts, ends - starts + 1)
+    ) * 7
+    values = (used & 0x7F).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.bitwise_or.reduceat(values, starts)
+
+
+class _TwkbBytes:
+    """
+    Reads a TWKB geometry a byte at a time.
+    """
+    def __init__(self, data: bytes, offset: int = 0):
+        self._data = data
+        self._pos = offset
+        self._scales: List[float] = []
+        self._last: List[int] = []
+
+    @property
+    def position(self) -> int:
+        """
+        Get the reader's position (in bytes).
+        """
+        return self._pos
+
+    def begin(self, scales: List[float]):
+        """
+        Start reading a geometry's coordinates.
+
+        :param scales: the scale of each dimension
+        """
+        self._scales = scales
+        self._last = [0] * len(scales)
+
+    def byte(self) -> int:
+        value = self._data[self._pos]
+        self._pos += 1
+        return value
+
+    def uint(self) -> int:
+        value, shift = 0, 0
+        while True:
+            byte = self._data[self._pos]
+            self._pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def sint(self) -> int:
+        return _unzigzag(self.uint())
+
+    def coords(self, count: int) -> np.ndarray:
+        last, scales = self._last, self._scales
+        dims = len(scales)
+        coords = []
+        for _ in range(count):
+            for i in range(dims):
+                last[i] += self.sint()
+            coords.append([last[i] * scales[i] for i in range(dims)])
+        return np.array(coords, dtype=float).reshape(count, dims)
+
+
+class _TwkbVarints:
+    """
+    Reads the body of a (non-collection) TWKB geometry from its integers,
+    which are decoded all at once.
+    """
+    def __init__(self, values: np.ndarray):
+        self._values = values
+        self._pos = 0
+        self._scales = np.empty(0)
+        self._last = np.empty(0, dtype=np.int64)
+
+    def begin(self, scales: List[float]):
+        self._scales = np.array(scales)
+        self._last = np.zeros(len(scales), dtype=np.int64)
+
+    def uint(self) -> int:
+        value = int(self._values[self._pos])
+        self._pos += 1
+        return value
+
+    def sint(self) -> int:
+        return _unzigzag(self.uint())
+
+    def coords(self, count: int) -> np.ndarray:
+        dims = self._scales.size
+        block = self._values[self._pos:self._pos + count * dims]
+        self._pos += count * dims
+        # Each coordinate is an offset from the one before it.
+        ints = np.cumsum(
+            _unzigzag_array(block).reshape(count, dims), axis=0
+        ) + self._last
+        if count:
+            self._last = ints[-1]
+        return ints * self._scales
+
+
+def _read_twkb(reader, header: _TwkbHeader):
+    """
+    Read a TWKB geometry's body.
+
+    :return: the (type, coordinates, number of dimensions) of the geometry
+        (The coordinates are nested the way the parts of the geometry are.)
+    """
+    reader.begin(header.scales)
+    if header.has_size:
+        reader.uint()
+    if header.has_bbox:
+        for _ in range(2 * len(header.scales)):
+            reader.sint()
+    typ, dims = header.type, 3 if header.has_z else 2
+    if header.empty:
+        return typ, None, dims
+    if typ == 1:
+        return typ, reader.coords(1), dims
+    if typ == 2:
+        return typ, reader.coords(reader.uint()), dims
+    if typ == 3:
+        return typ, [
+            reader.coords(reader.uint()) for _ in range(reader.uint())
+        ], dims
+    count = reader.uint()
+    if header.has_idlist:
+        for _ in range(count):
+            reader.sint()
+    if typ == 4:
+        return typ, [reader.coords(1) for _ in range(count)], dims
+    if typ == 5:
+        return typ, [
+            reader.coords(reader.uint()) for _ in range(count)
+        ], dims
+    if typ == 6:
+        return typ, [
+            [reader.coords(reader.uint()) for _ in range(reader.uint())]
+            for _ in range(count)
+        ], dims
+    if typ == 7:
+        # Each member of a collection has its own header.
+        return typ, [
+            _read_twkb(reader, _TwkbHeader(reader)) for _ in range(count)
+        ], dims
+    raise ValueError(f'{typ} is not a TWKB geometry type.')
+
+
+def _decode_twkb(data: bytes or memoryview, vectorize: bool = None):
+    """
+    Decode a TWKB geometry.
+
+    :param data: the TWKB
+    :param vectorize: Decode the integers with `NumPy`?  (The default
+        depends on the length of the data.)
+    :return: the (type, coordinates, number of dimensions) of the geometry
+    """
+    _data = data.tobytes() if isinstance(data, memoryview) else bytes(data)
+    reader = _TwkbBytes(_data)
+    header = _TwkbHeader(reader)
+    _vectorize = (
+        vectorize if vectorize is not None
+        else len(_data) >= TWKB_VECTORIZE_BYTES
+    )
+    # Apart from its header, a geometry (that isn't a collection) is nothing
+    # but integers, so we can decode them all at once.
+    if _vectorize and header.type != 7:
+        body = np.frombuffer(_data, dtype=np.uint8, offset=reader.position)
+        return _read_twkb(_TwkbVarints(_decode_varints(body)), header)
+    return _read_twkb(reader, header)
+
+
+def _build(typ: int, coords, dims: int) -> BaseGeometry:
+    """
+    Build a `Shapely` geometry from decoded TWKB.  (`Shapely` doesn't keep M
+    values, so they're dropped.)
+    """
+    if coords is None:
+        return shapely.from_wkt(f'{TWKB_TYPES[typ]} EMPTY')
+    if typ == 1:
+        return Point(coords[0, :dims])
+    if typ == 2:
+        return LineString(coords[:, :dims])
+    if typ == 3:
+        return Polygon(
+            coords[0][:, :dims], [ring[:, :dims] for ring in coords[1:]]
+        ) if coords else Polygon()
+    if typ == 4:
+        return MultiPoint([point[0, :dims] for point in coords])
+    if typ == 5:
+        return MultiLineString([line[:, :dims] for line in coords])
+    if typ == 6:
+        return MultiPolygon([_build(3, rings, dims) for rings in coords])
+    return GeometryCollection([_build(*member) for member in coords])
+
+
+def from_twkb(
+        data: bytes or memoryview,
+        vectorize: bool = None
+) -> BaseGeometry:
+    """
+    Decode a TWKB geometry (like the result of `ST_AsTWKB`) into a `Shapely`
+    geometry.
+
+    :param data: the TWKB
+    :param vectorize: Decode the integers with `NumPy`?  (The default is to
+        do so for all but the smallest geometries.)
     :return: the `Shapely` geometry
     """
-    return wkb.loads(obj, hex=True)
+    return _build(*_decode_twkb(data, vectorize=vectorize))
+
+
+def twkb_coordinates(
+        data: bytes or memoryview,
+        vectorize: bool = None
+) -> np.ndarray:
+    """
+    Decode the coordinates of a TWKB geometry (like the result of
+    `ST_AsTWKB`) without building a geometry.
+
+    :param data: the TWKB
+    :param vectorize: Decode the integers with `NumPy`?  (The default is to
+        do so for all but the smallest geometries.)
+    :return: the coordinates of all the geometry's parts, in order, as an
+        array with a row for each coordinate and a column for each dimension
+        (including M values)
+    """
+    _, coords, _ = _decode_twkb(data, vectorize=vectorize)
+    blocks = []
+
+    def _flatten(part):
+        if part is None:
+            return
+        if isinstance(part, np.ndarray):
+            blocks.append(part)
+        elif isinstance(part, tuple):
+            _flatten(part[1])
+        else:
+            for member in part:
+                _flatten(member)
+
+    _flatten(coords)
+    return np.concatenate(blocks) if blocks else np.empty((0, 2))
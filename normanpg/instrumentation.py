@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.instrumentation
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a query statistics collector you can register as an
+execute hook (see :py:func:`normanpg.pg.add_hook`) to find hot or slow call
+sites.
+"""
+from bisect import bisect_left
+import re
+import threading
+from typing import Any, Dict, Iterable, Tuple
+from .pg import ExecuteEvent, ExecuteHook
+
+#: the default upper bounds (in seconds) of the latency histogram buckets
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+_LITERALS = re.compile(
+    r"'(?:[^']|'')*'"  # string literals
+    r"|\b\d+(?:\.\d+)?\b"  # numeric literals
+)  #: matches literal values in rendered SQL
+_IN_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')  #: matches `(?, ?, ?)`
+_ARRAYS = re.compile(r'ARRAY\[[^\]]*\]')  #: matches `ARRAY[...]`
+_WHITESPACE = re.compile(r'\s+')  #: matches runs of whitespace
+
+
+def query_shape(sql: str) -> str:
+    """
+    Get the "shape" of a query: the rendered SQL with its literal values
+    replaced by placeholders so that queries which differ only by their
+    parameters are grouped together.
+
+    :param sql: the rendered SQL
+    :return: the query shape
+    """
+    shape = _LITERALS.sub('?', sql)
+    shape = _ARRAYS.sub('ARRAY[?]', shape)
+    shape = _IN_LISTS.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class LatencyHistogram:
+    """
+    A fixed-bucket latency histogram.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+
+        :param buckets: the (ascending) upper bounds of the buckets, in seconds
+        """
+        self._bounds: Tuple[float, ...] = tuple(sorted(buckets))
+        # The last count is the overflow (`+Inf`) bucket.
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+
+    @property
+    def bounds(self) -> Tuple[float, ...]:
+        """
+        Get the upper bounds of the buckets.
+        """
+        return self._bounds
+
+    @property
+    def count(self) -> int:
+        """
+        Get the number of observations.
+        """
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """
+        Get the sum of the observations.
+        """
+        return self._sum
+
+    def observe(self, value: float):
+        """
+        Record an observation.
+
+        :param value: the observed latency (in seconds)
+        """
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._count += 1
+        self._sum += value
+
+    def cumulative(self) -> Iterable[Tuple[float, int]]:
+        """
+        Get the cumulative bucket counts.
+
+        :return: an iteration of (upper bound, cumulative count) tuples, the
+            last of which has an upper bound of `inf`
+        """
+        total = 0
+        for bound, count in zip(self._bounds + (float('inf'),), self._counts):
+            total += count
+            yield bound, total
+
+    def percentile(self, p: float) -> float or None:
+        """
+        Estimate a percentile by interpolating within the bucket in which it
+        falls.
+
+        :param p: the percentile (between 0 and 100)
+        :return: the estimated latency (in seconds), or `None` if there are no
+            observations
+        """
+        if not self._count:
+            return None
+        rank = self._count * p / 100.0
+        lower = 0.0
+        seen = 0
+        for i, count in enumerate(self._counts):
+            if count and seen + count >= rank:
+                # Observations in the overflow bucket can only be reported as
+                # the largest finite bound.
+                if i == len(self._bounds):
+                    return self._bounds[-1] if self._bounds else None
+                upper = self._bounds[i]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = self._bounds[i] if i < len(self._bounds) else lower
+        return self._bounds[-1] if self._bounds else None
+
+
+class QueryStats:
+    """
+    Statistics for a group of queries.
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        """
+
+        :param buckets: the upper bounds of the latency histogram buckets
+        """
+        self.count: int = 0  #: the number of executions
+        self.errors: int = 0  #: the number of failed executions
+        self.rows: int = 0  #: the total number of rows returned
+        self.latency = LatencyHistogram(buckets)  #: the latency histogram
+
+    def record(self, event: ExecuteEvent):
+        """
+        Record an execute event.
+
+        :param event: the event
+        """
+        self.count += 1
+        if event.error is not None:
+            self.errors += 1
+        if event.rows:
+            self.rows += event.rows
+        if event.elapsed is not None:
+            self.latency.observe(event.elapsed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the statistics as a dictionary.
+        """
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_seconds': self.latency.sum,
+            'p50': self.latency.percentile(50),
+            'p95': self.latency.percentile(95),
+            'p99': self.latency.percentile(99)
+        }
+
+
+def _escape_label(value: str) -> str:
+    """
+    Escape a Prometheus label value.
+
+    :param value: the label value
+    :return: the escaped value
+    """
+    return (
+        value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+    )
+
+
+class QueryCollector(ExecuteHook):
+    """
+    This execute hook keeps counts, rows returned, and latency histograms for
+    each caller and for each query shape.
+
+    .. code-block:: python
+
+        from normanpg.pg import add_hook
+        from normanpg.instrumentation import QueryCollector
+
+        collector = add_hook(QueryCollector())
+        ...
+        print(collector.to_prometheus())
+    """
+    def __init__(
+            self,
+            buckets: Iterable[float] = DEFAULT_BUCKETS,
+            max_shapes: int = 1000
+    ):
+        """
+
+        :param buckets: the upper bounds of the latency histogram buckets
+        :param max_shapes: the maximum number of distinct query shapes to
+            track (Queries with shapes beyond the limit are only counted by
+            caller.)
+        """
+        self._buckets = tuple(buckets)
+        self._max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._by_caller: Dict[str, QueryStats] = {}
+        self._by_shape: Dict[str, QueryStats] = {}
+
+    def after_execute(self, event: ExecuteEvent):
+        """
+        Record the execute event.
+
+        :param event: the execute event
+        """
+        shape = query_shape(event.sql)
+        with self._lock:
+            try:
+                stats = self._by_caller[event.caller]
+            except KeyError:
+                stats = self._by_caller.setdefault(
+                    event.caller, QueryStats(self._buckets)
+                )
+            stats.record(event)
+            try:
+                stats = self._by_shape[shape]
+            except KeyError:
+                if len(self._by_shape) >= self._max_shapes:
+                    return
+                stats = self._by_shape.setdefault(
+                    shape, QueryStats(self._buckets)
+                )
+            stats.record(event)
+
+    def reset(self):
+        """
+        Discard the collected statistics.
+        """
+        with self._lock:
+            self._by_caller = {}
+            self._by_shape = {}
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get a snapshot of the collected statistics.
+
+        :return: a dictionary with `callers` and `shapes` keys, each of which
+            maps a caller (or query shape) to its statistics
+        """
+        with self._lock:
+            return {
+                'callers': {
+                    k: v.to_dict() for k, v in self._by_caller.items()
+                },
+                'shapes': {
+                    k: v.to_dict() for k, v in self._by_shape.items()
+                }
+            }
+
+    def to_prometheus(self, prefix: str = 'normanpg') -> str:
+        """
+        Export the per-caller statistics in the Prometheus text exposition
+        format.
+
+        :param prefix: the metric name prefix
+        :return: the exposition text
+        """
+        lines = [
+            f'# HELP {prefix}_queries_total Queries executed, by caller.',
+            f'# TYPE {prefix}_queries_total counter',
+        ]
+        with self._lock:
+            callers = [
+                (_escape_label(caller), stats)
+                for caller, stats in sorted(self._by_caller.items())
+            ]
+            for caller, stats in callers:
+                lines.append(
+                    f'{prefix}_queries_total{{caller="{caller}"}} '
+                    f'{stats.count}'
+                )
+            lines.extend([
+                f'# HELP {prefix}_query_errors_total Failed queries, '
+                f'by caller.',
+                f'# TYPE {prefix}_query_errors_total counter'
+            ])
+            for caller, stats in callers:
+                lines.append(
+                    f'{prefix}_query_errors_total{{caller="{caller}"}} '
+                    f'{stats.errors}'
+                )
+            lines.extend([
+                f'# HELP {prefix}_query_rows_total Rows returned, by caller.',
+                f'# TYPE {prefix}_query_rows_total counter'
+            ])
+            for caller, stats in callers:
+                lines.append(
+                    f'{prefix}_query_rows_total{{caller="{caller}"}} '
+                    f'{stats.rows}'
+                )
+            lines.extend([
+                f'# HELP {prefix}_query_duration_seconds Query latency, '
+                f'by caller.',
+                f'# TYPE {prefix}_query_duration_seconds histogram'
+            ])
+            for caller, stats in callers:
+                for bound, count in stats.latency.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(
+                        f'{prefix}_query_duration_seconds_bucket'
+                        f'{{caller="{caller}",le="{le}"}} {count}'
+                    )
+                lines.append(
+                    f'{prefix}_query_duration_seconds_sum'
+                    f'{{caller="{caller}"}} {stats.latency.sum}'
+                )
+                lines.append(
+                    f'{prefix}_query_duration_seconds_count'
+                    f'{{caller="{caller}"}} {stats.latency.count}'
+                )
+        return '\n'.join(lines) + '\n'
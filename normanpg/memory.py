@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.memory
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains an opt-in memory tracker.  When it is enabled, each
+query issued through the execute family is charged (by caller) with the peak
+Python allocations made while it ran and its results were fetched, the rows
+and bytes fetched, and the number of rows the cursor held in memory.
+
+.. code-block:: python
+
+    from normanpg.memory import enable_memory_tracking, worst_offenders
+
+    enable_memory_tracking(path='/var/tmp/myapp-memory.json')
+    ...
+    for stats in worst_offenders(5):
+        print(stats['caller'], stats['peak_bytes'], stats['max_rows'])
+
+The report file can also be read with ``normanpg memory <path>``.
+
+.. note::
+
+    Allocations are traced with :py:mod:`tracemalloc`, which slows everything
+    down (not just queries), so this is a diagnostic mode.  (Before Python
+    3.9, `tracemalloc` can't reset its peak, so the memory is sampled when a
+    query starts, when it has executed, and when its results have been
+    fetched, which can miss short-lived allocations in between.)  The peak is
+    process-wide: when queries overlap (on other threads, or because a
+    caller runs queries while it iterates over another's rows), each is
+    charged with everything allocated while it was in flight.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from .constants import MEMORY_SORT_KEYS
+from .pg import add_hook, remove_hook, ExecuteEvent, ExecuteHook
+
+__logger__ = logging.getLogger(__name__)  #: the module logger
+
+SORT_KEYS = MEMORY_SORT_KEYS  #: the statistics by which offenders are ranked
+
+#: Can `tracemalloc` reset its peak?  (It can't before Python 3.9.)
+_CAN_RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+
+class MemoryStats:
+    """
+    Memory statistics for a single caller.
+    """
+    def __init__(self, caller: str):
+        """
+
+        :param caller: identifies the caller
+        """
+        self.caller: str = caller  #: identifies the caller
+        self.calls: int = 0  #: the number of queries
+        self.peak_bytes: int = 0  #: the largest peak allocation of any query
+        self.rows: int = 0  #: the total number of rows fetched
+        self.max_rows: int = 0  #: the most rows fetched by any query
+        self.fetched_bytes: int = 0  #: the total size of the fetched values
+        #: the largest size of the values fetched by any query
+        self.max_fetched_bytes: int = 0
+        #: the most rows held in a cursor's buffer at once
+        self.max_buffer_rows: int = 0
+        self.worst_sql: str or None = None  #: the query with the largest peak
+
+    def record(
+            self,
+            event: ExecuteEvent,
+            peak_bytes: int,
+            buffer_rows: int
+    ):
+        """
+        Record a query.
+
+        :param event: the execute event
+        :param peak_bytes: the peak allocation while the query was in flight
+        :param buffer_rows: the number of rows in the cursor's buffer
+        """
+        self.calls += 1
+        if peak_bytes >= self.peak_bytes:
+            self.peak_bytes = peak_bytes
+            self.worst_sql = event.sql
+        self.rows += event.fetched
+        self.max_rows = max(self.max_rows, event.fetched)
+        self.fetched_bytes += event.fetched_bytes
+        self.max_fetched_bytes = max(
+            self.max_fetched_bytes, event.fetched_bytes
+        )
+        self.max_buffer_rows = max(self.max_buffer_rows, buffer_rows)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the statistics as a dictionary.
+        """
+        return {
+            'caller': self.caller,
+            'calls': self.calls,
+            'peak_bytes': self.peak_bytes,
+            'rows': self.rows,
+            'max_rows': self.max_rows,
+            'fetched_bytes': self.fetched_bytes,
+            'max_fetched_bytes': self.max_fetched_bytes,
+            'max_buffer_rows': self.max_buffer_rows,
+            'worst_sql': self.worst_sql
+        }
+
+
+def rank(
+        stats: List[Dict[str, Any]],
+        n: int = 10,
+        key: str = 'peak_bytes'
+) -> List[Dict[str, Any]]:
+    """
+    Rank per-caller memory statistics.
+
+    :param stats: the statistics (as returned by
+        :py:meth:`MemoryStats.to_dict`)
+    :param n: the number of callers to return
+    :param key: the statistic by which they're ranked (one of
+        :py:data:`SORT_KEYS`)
+    :return: the `n` worst callers, worst first
+    """
+    if key not in SORT_KEYS:
+        raise ValueError(f'Memory statistics cannot be ranked by {key}.')
+    return sorted(stats, key=lambda s: s[key], reverse=True)[:n]
+
+
+def read_report(path: str) -> List[Dict[str, Any]]:
+    """
+    Read the statistics written by a :py:class:`MemoryTracker`.
+
+    :param path: the path to the report file
+    :return: the per-caller statistics
+    """
+    with open(path) as report:
+        return json.load(report)['callers']
+
+
+class MemoryTracker(ExecuteHook):
+    """
+    This execute hook charges each caller with the memory its queries use.
+    (See :py:func:`enable_memory_tracking`.)
+    """
+    def __init__(
+            self,
+            measure_bytes: bool = True,
+            path: str = None,
+            dump_interval: float = 10.0
+    ):
+        """
+
+        :param measure_bytes: Measure the size of the fetched values?  (This
+            costs a little for every row.)
+        :param path: the path to a JSON report file that is rewritten
+            periodically (so it survives a worker that is killed)
+        :param dump_interval: the minimum number of seconds between rewrites
+            of the report file
+        """
+        self._measure_bytes = measure_bytes
+        self._path = path
+        self._dump_interval = dump_interval
+        self._dumped = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, MemoryStats] = {}
+        # the queries in flight, by event: [starting size, peak so far,
+        # buffered rows]
+        self._inflight: Dict[int, List[int]] = {}
+
+    @property
+    def path(self) -> str or None:
+        """
+        Get the path to the report file.
+        """
+        return self._path
+
+    def _sample(self) -> int:
+        """
+        Sample the traced memory and raise the peaks of the queries in flight
+        (while holding the lock).
+
+        :return: the current size of the traced memory
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if _CAN_RESET_PEAK:
+            # Resetting the peak mustn't lose the peaks of the queries that
+            # are in flight.
+            tracemalloc.reset_peak()
+        else:
+            # The peak is the process's all-time peak, so the best we can do
+            # is sample the current size whenever a hook is called.
+            peak = current
+        for measurement in self._inflight.values():
+            measurement[1] = max(measurement[1], peak)
+        return current
+
+    def before_execute(self, event: ExecuteEvent):
+        """
+        Start measuring a query.
+
+        :param event: the execute event
+        """
+        if not tracemalloc.is_tracing():
+            return
+        event.measure = self._measure_bytes
+        with self._lock:
+            current = self._sample()
+            self._inflight[id(event)] = [current, current, 0]
+
+    def after_execute(self, event: ExecuteEvent):
+        """
+        Note how many rows the cursor holds in memory.
+
+        :param event: the execute event
+        """
+        with self._lock:
+            measurement = self._inflight.get(id(event))
+            if measurement is None:
+                return
+            if event.error is not None:
+                del self._inflight[id(event)]
+                return
+            self._sample()
+            crs = event.cursor
+            # A client-side cursor holds the whole result; a named
+            # (server-side) cursor holds a batch at a time.
+            measurement[2] = (
+                (event.rows or 0) if crs.name is None
+                else min(crs.itersize, event.rows or crs.itersize)
+            )
+
+    def after_fetch(self, event: ExecuteEvent):
+        """
+        Charge the caller with the query.
+
+        :param event: the execute event
+        """
+        with self._lock:
+            if id(event) not in self._inflight:
+                return
+            self._sample()
+            start, peak, buffer_rows = self._inflight.pop(id(event))
+            try:
+                stats = self._stats[event.caller]
+            except KeyError:
+                stats = self._stats.setdefault(
+                    event.caller, MemoryStats(event.caller)
+                )
+            stats.record(
+                event=event,
+                peak_bytes=max(peak - start, 0),
+                buffer_rows=buffer_rows
+            )
+            # Claim the dump while we hold the lock so that only one thread
+            # writes it.
+            now = time.monotonic()
+            due = (
+                self._path is not None
+                and now - self._dumped >= self._dump_interval
+            )
+            if due:
+                self._dumped = now
+        if due:
+            # A diagnostic mustn't break the caller's query.
+            try:
+                self._write(self._path)
+            except OSError:
+                __logger__.warning(
+                    f'The memory report could not be written to '
+                    f'{self._path}.',
+                    exc_info=True
+                )
+
+    def reset(self):
+        """
+        Discard the collected statistics.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get a snapshot of the collected statistics.
+
+        :return: the statistics for each caller
+        """
+        with self._lock:
+            return [stats.to_dict() for stats in self._stats.values()]
+
+    def worst(
+            self,
+            n: int = 10,
+            key: str = 'peak_bytes'
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the callers that use the most memory.
+
+        :param n: the number of callers to return
+        :param key: the statistic by which they're ranked (one of
+            :py:data:`SORT_KEYS`)
+        :return: the statistics of the `n` worst callers, worst first
+        """
+        return rank(self.snapshot(), n=n, key=key)
+
+    def dump(self, path: str = None):
+        """
+        Write the statistics to a JSON report file.
+
+        :param path: the path to the file (The default is the tracker's
+            `path`.)
+        """
+        with self._lock:
+            self._dumped = time.monotonic()
+        self._write(path if path else self._path)
+
+    def _write(self, path: str):
+        """
+        Write the statistics to a JSON report file.
+        """
+        # Write a temporary file (of our own) in the same directory and move
+        # it into place so that readers never see half a report.
+        fd, tmp = tempfile.mkstemp(
+            prefix=f'.{os.path.basename(path)}.',
+            suffix='.tmp',
+            dir=os.path.dirname(os.path.abspath(path))
+        )
+        try:
+            with os.fdopen(fd, 'w') as report:
+                json.dump(
+                    {'pid': os.getpid(), 'callers': self.snapshot()}, report
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+
+_TRACKER: MemoryTracker or None = None  #: the enabled tracker
+_STARTED = False  #: Did we start `tracemalloc`?
+
+
+def enable_memory_tracking(
+        measure_bytes: bool = True,
+        path: str = None,
+        dump_interval: float = 10.0,
+        frames: int = 1
+) -> MemoryTracker:
+    """
+    Start tracking the memory used by queries.  (If a tracker is already
+    enabled, it is replaced.)
+
+    :param measure_bytes: Measure the size of the fetched values?
+    :param path: the path to a JSON report file that is rewritten
+        periodically
+    :param dump_interval: the minimum number of seconds between rewrites of
+        the report file
+    :param frames: the number of frames :py:mod:`tracemalloc` keeps for each
+        allocation (if it isn't already tracing)
+    :return: the tracker
+    """
+    global _TRACKER, _STARTED  # pylint: disable=global-statement
+    disable_memory_tracking()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        _STARTED = True
+    _TRACKER = add_hook(
+        MemoryTracker(
+            measure_bytes=measure_bytes,
+            path=path,
+            dump_interval=dump_interval
+        )
+    )
+    return _TRACKER
+
+
+def disable_memory_tracking():
+    """
+    Stop tracking the memory used by queries.  (If there is a report file, it
+    is written one last time.)
+    """
+    global _TRACKER, _STARTED  # pylint: disable=global-statement
+    tracker, _TRACKER = _TRACKER, None
+    try:
+        if tracker is not None:
+            remove_hook(tracker)
+            if tracker.path is not None:
+                tracker.dump()
+    finally:
+        if _STARTED:
+            tracemalloc.stop()
+            _STARTED = False
+
+
+def worst_offenders(
+        n: int = 10,
+        key: str = 'peak_bytes'
+) -> List[Dict[str, Any]]:
+    """
+    Get the callers that use the most memory (according to the enabled
+    tracker).
+
+    :param n: the number of callers to return
+    :param key: the statistic by which they're ranked (one of
+        :py:data:`SORT_KEYS`)
+    :return: the statistics of the `n` worst callers, worst first (which is
+        empty if tracking isn't enabled)
+    """
+    return [] if _TRACKER is None else _TRACKER.worst(n=n, key=key)
@@ -0,0 +1,418 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.notify
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a `LISTEN`/`NOTIFY` subscriber that waits for
+notifications (rather than polling tables) and dispatches them to callbacks,
+an iterator, or an `asyncio` consumer.
+
+.. code-block:: python
+
+    from normanpg.notify import install_notify_trigger, Subscriber
+
+    install_notify_trigger(url, 'parcels', 'public', columns=['id'])
+    with Subscriber(url, ['parcels_changed'], coalesce=0.25) as subscriber:
+        for notification in subscriber:
+            print(notification.payload)
+"""
+import asyncio
+import logging
+import os
+import select
+import threading
+import time
+from typing import (
+    AsyncIterator, Callable, Dict, Iterable, Iterator, List, Sequence, Union
+)
+import psycopg2.extensions
+from psycopg2.extensions import Notify
+from psycopg2.sql import Identifier, Literal, SQL
+from .pg import compose_table, connect, execute
+
+__logger__ = logging.getLogger(__name__)  #: the module logger
+
+#: a notification callback
+NotifyCallback = Callable[[Notify], None]
+
+
+def coalesce_notifications(notifications: Iterable[Notify]) -> List[Notify]:
+    """
+    Collapse a burst of notifications so that each distinct (channel,
+    payload) pair appears only once (in the order in which it first
+    appeared).
+
+    :param notifications: the notifications
+    :return: the coalesced notifications
+    """
+    seen = set()
+    coalesced = []
+    for notification in notifications:
+        key = (notification.channel, notification.payload)
+        if key not in seen:
+            seen.add(key)
+            coalesced.append(notification)
+    return coalesced
+
+
+class Subscriber:
+    """
+    A subscriber listens on one or more channels with its own connection.
+    """
+    def __init__(
+            self,
+            url: str,
+            channels: Sequence[str],
+            coalesce: float = 0.0
+    ):
+        """
+
+        :param url: the database URL
+        :param channels: the channels on which to listen
+        :param coalesce: after a notification arrives, wait this many seconds
+            for more and collapse duplicates in the burst
+        """
+        self._url = url
+        self._channels = list(channels)
+        self._coalesce = coalesce
+        self._cnx: psycopg2.extensions.connection or None = None
+        self._callbacks: Dict[str or None, List[NotifyCallback]] = {}
+        self._thread: threading.Thread or None = None
+        # We use a pipe to wake the dispatcher thread when it's time to stop.
+        self._wake_r, self._wake_w = None, None
+        self._stopping = threading.Event()
+
+    @property
+    def channels(self) -> List[str]:
+        """
+        Get the channels on which the subscriber listens.
+        """
+        return list(self._channels)
+
+    @property
+    def connection(self) -> psycopg2.extensions.connection:
+        """
+        Get the subscriber's connection (opening it, if necessary).
+        """
+        if self._cnx is None:
+            self.open()
+        return self._cnx
+
+    def open(self) -> 'Subscriber':
+        """
+        Open the connection and start listening.
+
+        :return: this instance
+        """
+        if self._cnx is not None:
+            return self
+        self._cnx = connect(url=self._url, autocommit=True)
+        for channel in self._channels:
+            self._listen(channel)
+        return self
+
+    def _listen(self, channel: str):
+        execute(
+            cnx=self._cnx,
+            query=SQL('LISTEN {}').format(Identifier(channel)),
+            caller='Subscriber.listen'
+        )
+
+    def listen(self, channel: str):
+        """
+        Start listening on another channel.
+
+        :param channel: the channel
+        """
+        if channel in self._channels:
+            return
+        self._channels.append(channel)
+        if self._cnx is not None:
+            self._listen(channel)
+
+    def add_callback(self, callback: NotifyCallback, channel: str = None):
+        """
+        Add a callback to be called by :py:func:`dispatch`.
+
+        :param callback: the callback
+        :param channel: the channel (The default is all channels.)
+        """
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    def _drain(self) -> List[Notify]:
+        """
+        Read whatever notifications have arrived.
+        """
+        cnx = self.connection
+        cnx.poll()
+        notifications = list(cnx.notifies)
+        del cnx.notifies[:]
+        return notifications
+
+    def _wait(self, timeout: float or None) -> bool:
+        """
+        Wait for the connection to become readable.
+
+        :param timeout: the number of seconds to wait (`None` waits forever)
+        :return: `True` if the connection is readable
+        """
+        waitables = [self.connection]
+        if self._wake_r is not None:
+            waitables.append(self._wake_r)
+        readable, _, _ = select.select(waitables, [], [], timeout)
+        return self.connection in readable
+
+    def poll(self, timeout: float = None) -> List[Notify]:
+        """
+        Wait for notifications.
+
+        :param timeout: the number of seconds to wait (`None` waits until a
+            notification arrives)
+        :return: the notifications (which may be empty if the timeout
+            expired)
+        """
+        notifications = self._drain()
+        if not notifications and self._wait(timeout):
+            notifications = self._drain()
+        # If we're coalescing bursts, keep collecting until the window closes.
+        if notifications and self._coalesce > 0:
+            deadline = time.monotonic() + self._coalesce
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._wait(remaining):
+                    break
+                notifications.extend(self._drain())
+            notifications = coalesce_notifications(notifications)
+        return notifications
+
+    def dispatch(self, timeout: float = None) -> int:
+        """
+        Wait for notifications and pass them to the callbacks.
+
+        :param timeout: the number of seconds to wait
+        :return: the number of notifications dispatched
+        """
+        notifications = self.poll(timeout)
+        for notification in notifications:
+            for callback in (
+                    self._callbacks.get(notification.channel, [])
+                    + self._callbacks.get(None, [])
+            ):
+                try:
+                    callback(notification)
+                except Exception:  # pylint: disable=broad-except
+                    __logger__.exception(
+                        f'A callback failed for a notification on the '
+                        f'{notification.channel} channel.'
+                    )
+        return len(notifications)
+
+    def start(self) -> 'Subscriber':
+        """
+        Start dispatching notifications to the callbacks on a background
+        thread.
+
+        :return: this instance
+        """
+        if self._thread is not None:
+            return self
+        self.open()
+        self._stopping.clear()
+        self._wake_r, self._wake_w = os.pipe()
+
+        def _run():
+            while not self._stopping.is_set():
+                self.dispatch(timeout=None)
+
+        self._thread = threading.Thread(
+            target=_run, name='normanpg-notify', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the background dispatcher.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        os.write(self._wake_w, b'\0')
+        self._thread.join()
+        self._thread = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self._wake_r, self._wake_w = None, None
+
+    def close(self):
+        """
+        Stop dispatching and close the connection.
+        """
+        self.stop()
+        if self._cnx is not None:
+            self._cnx.close()
+            self._cnx = None
+
+    def __iter__(self) -> Iterator[Notify]:
+        cnx = self.connection
+        # Closing the subscriber (or its connection) ends the iteration.
+        while self._cnx is cnx and not cnx.closed:
+            for notification in self.poll(timeout=None):
+                yield notification
+
+    async def notifications(self) -> AsyncIterator[Notify]:
+        """
+        Get the notifications as they arrive in an `asyncio` event loop.  (The
+        connection is watched with the loop's reader callbacks, so no thread
+        is blocked.)
+
+        :return: an asynchronous iteration of notifications
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cnx = self.connection
+
+        def _ready():
+            for notification in self._drain():
+                queue.put_nowait(notification)
+
+        loop.add_reader(cnx.fileno(), _ready)
+        try:
+            while True:
+                burst = [await queue.get()]
+                if self._coalesce > 0:
+                    await asyncio.sleep(self._coalesce)
+                    while not queue.empty():
+                        burst.append(queue.get_nowait())
+                    burst = coalesce_notifications(burst)
+                for notification in burst:
+                    yield notification
+        finally:
+            loop.remove_reader(cnx.fileno())
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
+
+
+def notify(
+        cnx: Union[str, psycopg2.extensions.connection],
+        channel: str,
+        payload: str = None
+):
+    """
+    Send a notification.
+
+    :param cnx: an open connection or database connection string
+    :param channel: the channel
+    :param payload: the payload
+    """
+    execute(
+        cnx=cnx,
+        query=SQL('SELECT pg_notify({}, {})').format(
+            Literal(channel), Literal(payload)
+        )
+    )
+
+
+def _trigger_names(table_name: str, schema_name: str = None):
+    """
+    Get the composed names of the function and trigger that send
+    notifications for a table.
+    """
+    name = f'{table_name}_notify'
+    return compose_table(name, schema_name), Identifier(name)
+
+
+def install_notify_trigger(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str = None,
+        channel: str = None,
+        columns: Sequence[str] = ()
+) -> str:
+    """
+    Install a trigger that sends a notification whenever a row in a table is
+    inserted, updated, or deleted.  The payload is a JSON object with the
+    `schema`, `table`, and `op` (``INSERT``, ``UPDATE`` or ``DELETE``) and,
+    if you name any `columns`, a `row` object with their values.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    :param channel: the channel (The default is `{table_name}_changed`.)
+    :param columns: the columns (typically the key) to include in the payload
+    :return: the channel
+
+    .. note::
+
+        Notification payloads are limited to 8000 bytes, so name only the
+        columns you need to identify the row.
+    """
+    _channel = channel if channel else f'{table_name}_changed'
+    function, trigger = _trigger_names(table_name, schema_name)
+    row = (
+        SQL(", 'row', json_build_object({})").format(
+            SQL(', ').join(
+                SQL('{}, r.{}').format(Literal(c), Identifier(c))
+                for c in columns
+            )
+        )
+        if columns else SQL('')
+    )
+    # `EXECUTE PROCEDURE` is the older spelling of `EXECUTE FUNCTION`, but
+    # (unlike the newer one) every PostgreSQL version accepts it.
+    query = SQL(
+        'CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$\n'
+        'DECLARE\n'
+        '    r record;\n'
+        'BEGIN\n'
+        "    IF TG_OP = 'DELETE' THEN r := OLD; ELSE r := NEW; END IF;\n"
+        '    PERFORM pg_notify({channel}, json_build_object(\n'
+        "        'schema', TG_TABLE_SCHEMA, 'table', TG_TABLE_NAME, "
+        "'op', TG_OP{row}\n"
+        '    )::text);\n'
+        '    RETURN NULL;\n'
+        'END;\n'
+        '$$ LANGUAGE plpgsql;\n'
+        'DROP TRIGGER IF EXISTS {trigger} ON {table};\n'
+        'CREATE TRIGGER {trigger} AFTER INSERT OR UPDATE OR DELETE ON {table} '
+        'FOR EACH ROW EXECUTE PROCEDURE {function}();'
+    ).format(
+        function=function,
+        trigger=trigger,
+        table=compose_table(table_name, schema_name),
+        channel=Literal(_channel),
+        row=row
+    )
+    execute(cnx=cnx, query=query)
+    return _channel
+
+
+def remove_notify_trigger(
+        cnx: Union[str, psycopg2.extensions.connection],
+        table_name: str,
+        schema_name: str = None
+):
+    """
+    Remove a trigger installed by :py:func:`install_notify_trigger`.
+
+    :param cnx: an open connection or database connection string
+    :param table_name: the name of the table
+    :param schema_name: the name of the schema in which the table resides
+    """
+    function, trigger = _trigger_names(table_name, schema_name)
+    query = SQL(
+        'DROP TRIGGER IF EXISTS {trigger} ON {table};\n'
+        'DROP FUNCTION IF EXISTS {function}();'
+    ).format(
+        function=function,
+        trigger=trigger,
+        table=compose_table(table_name, schema_name)
+    )
+    execute(cnx=cnx, query=query)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.parallel
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a helper that runs a function over partitions of work in
+a pool of worker processes, each with its own (warmed) connection.
+
+.. code-block:: python
+
+    from normanpg.parallel import map_partitions
+
+    def count(cnx, partition):
+        return execute_scalar(cnx, f'SELECT count(*) FROM {partition}')
+
+    counts = map_partitions(count, ['parcels_1', 'parcels_2'], url)
+
+.. note::
+
+    The function (and the partitions) are sent to the workers, so the
+    function must be defined at the top level of a module.
+"""
+import multiprocessing
+from typing import Any, Callable, Iterable, List, TypeVar
+from .pg import ForkSafeConnection
+
+P = TypeVar('P')  #: a partition
+
+_WORKER_CNX: ForkSafeConnection or None = None  #: the worker's connection
+
+
+def worker_connection() -> ForkSafeConnection:
+    """
+    Get the current worker process's connection.
+
+    :return: the connection
+    :raises RuntimeError: if this isn't a worker started by
+        :py:func:`map_partitions`
+    """
+    if _WORKER_CNX is None:
+        raise RuntimeError(
+            'This process was not started by map_partitions.'
+        )
+    return _WORKER_CNX
+
+
+def _init_worker(cnx: ForkSafeConnection, warm: bool):
+    """
+    Set up a worker process's connection.
+    """
+    global _WORKER_CNX  # pylint: disable=global-statement
+    _WORKER_CNX = cnx
+    if warm:
+        with cnx.cursor() as crs:
+            crs.execute('SELECT 1')
+            crs.fetchone()
+
+
+def _run_partition(fn: Callable[[ForkSafeConnection, P], Any], partition: P):
+    """
+    Run the function over a single partition in a worker process.
+    """
+    return fn(worker_connection(), partition)
+
+
+def map_partitions(
+        fn: Callable[[ForkSafeConnection, P], Any],
+        partitions: Iterable[P],
+        url: str,
+        processes: int = None,
+        dbname: str = None,
+        autocommit: bool = False,
+        warm: bool = True,
+        context: str = None
+) -> List[Any]:
+    """
+    Run a function over partitions of work in a pool of worker processes.
+
+    :param fn: the function, which is called with the worker's connection and
+        a partition
+    :param partitions: the partitions
+    :param url: the instance URL
+    :param processes: the number of worker processes (The default is the
+        number of CPUs.)
+    :param dbname: the target database name
+    :param autocommit: Set the `autocommit` flag on the workers' connections?
+    :param warm: Open (and exercise) each worker's connection before it's
+        given any work?
+    :param context: the `multiprocessing` start method (``fork``, ``spawn``
+        or ``forkserver``; the default is the platform's)
+    :return: the function's results, in the order of the partitions
+
+    .. note::
+
+        Nothing is committed for you: if the function writes, it should
+        commit before it returns.
+    """
+    cnx = ForkSafeConnection(url=url, dbname=dbname, autocommit=autocommit)
+    _partitions = list(partitions)
+    with multiprocessing.get_context(context).Pool(
+            processes=processes,
+            initializer=_init_worker,
+            initargs=(cnx, warm)
+    ) as pool:
+        return pool.starmap(
+            _run_partition, [(fn, partition) for partition in _partitions]
+        )
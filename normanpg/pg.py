@@ -10,8 +10,13 @@ This module needs a description.
 """
 import inspect
 import logging
-from typing import Any, Iterable, Union
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Union
 from urllib.parse import urlparse, ParseResult
+import weakref
 import psycopg2.extras
 import psycopg2.sql
 from psycopg2.sql import SQL
@@ -23,6 +28,7 @@ __logger__ = logging.getLogger(__name__)  #: the module logger
 
 DEFAULT_ADMIN_DB = 'postgres'  #: the default administrative database name
 DEFAULT_PG_PORT: int = 5432  #: the default Postgres database port
+COPY_READ_SIZE: int = 1 << 16  #: the size of the reads made by `COPY`
 
 
 class InvalidDbResult(NormanPgException):
@@ -31,6 +37,159 @@ class InvalidDbResult(NormanPgException):
     """
 
 
+class QueryTimeout(NormanPgException):
+    """
+    Raised when a query is cancelled because it ran longer than its timeout.
+    """
+    def __init__(
+            self,
+            message: str,
+            caller: str,
+            elapsed: float,
+            timeout: float,
+            inner: Exception = None
+    ):
+        """
+
+        :param message: the exception message
+        :param caller: identifies the caller
+        :param elapsed: the number of seconds the query ran
+        :param timeout: the timeout (in seconds)
+        :param inner: the exception that caused this exception
+        """
+        super().__init__(message=message, inner=inner)
+        self._caller = caller
+        self._elapsed = elapsed
+        self._timeout = timeout
+
+    @property
+    def caller(self) -> str:
+        """
+        Get the caller that issued the query.
+        """
+        return self._caller
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Get the number of seconds the query ran before it was cancelled.
+        """
+        return self._elapsed
+
+    @property
+    def timeout(self) -> float:
+        """
+        Get the timeout (in seconds).
+        """
+        return self._timeout
+
+
+class ExecuteEvent:
+    """
+    An execute event describes a single query as it passes through the
+    execute family of functions and is handed to each registered
+    :py:class:`ExecuteHook`.
+    """
+    __slots__ = (
+        'caller', 'sql', 'cursor', 'elapsed', 'rows', 'error',
+        'fetched', 'fetched_bytes', 'measure', '_hooks'
+    )
+
+    def __init__(
+            self,
+            caller: str,
+            sql: str,
+            cursor: psycopg2.extensions.cursor
+    ):
+        """
+
+        :param caller: identifies the caller
+        :param sql: the rendered SQL
+        :param cursor: the execution cursor
+        """
+        self.caller: str = caller  #: identifies the caller
+        self.sql: str = sql  #: the rendered SQL
+        #: the execution cursor (only valid while the hooks are running)
+        self.cursor: psycopg2.extensions.cursor = cursor
+        self.elapsed: float or None = None  #: the execution time (seconds)
+        self.rows: int or None = None  #: the number of rows returned
+        self.error: Exception or None = None  #: the error raised (if any)
+        self.fetched: int = 0  #: the number of rows fetched by the caller
+        #: the approximate size of the values fetched (if `measure` is set)
+        self.fetched_bytes: int = 0
+        #: A hook sets this in :py:meth:`ExecuteHook.before_execute` to have
+        #: the size of the fetched values measured.
+        self.measure: bool = False
+        self._hooks: List['ExecuteHook'] = []
+
+
+class ExecuteHook:
+    """
+    Extend this class to observe the queries issued by the execute family of
+    functions, then register an instance with :py:func:`add_hook`.
+    """
+    def before_execute(self, event: ExecuteEvent):
+        """
+        Override this method to act before a query is executed.
+
+        :param event: the execute event
+        """
+
+    def after_execute(self, event: ExecuteEvent):
+        """
+        Override this method to act after a query is executed.  (If the query
+        failed, the event's `error` is set.)
+
+        :param event: the execute event
+        """
+
+    def after_fetch(self, event: ExecuteEvent):
+        """
+        Override this method to act after the caller has finished fetching a
+        query's results (or has stopped early).  The event's `fetched` (and,
+        if it was requested, `fetched_bytes`) are set.  (This isn't called if
+        the query failed.)
+
+        :param event: the execute event
+        """
+
+
+_HOOKS: List[ExecuteHook] = []  #: the registered execute hooks
+
+
+def add_hook(hook: ExecuteHook) -> ExecuteHook:
+    """
+    Register a hook to be called whenever a query is executed.
+
+    :param hook: the hook
+    :return: the hook
+    """
+    # Replace the list rather than modifying it so that iterations already in
+    # progress on other threads aren't disturbed.
+    global _HOOKS  # pylint: disable=global-statement
+    _HOOKS = _HOOKS + [hook]
+    return hook
+
+
+def remove_hook(hook: ExecuteHook):
+    """
+    Unregister a hook.
+
+    :param hook: the hook
+    """
+    global _HOOKS  # pylint: disable=global-statement
+    _HOOKS = [h for h in _HOOKS if h is not hook]
+
+
+def hooks() -> List[ExecuteHook]:
+    """
+    Get the registered execute hooks.
+
+    :return: the hooks
+    """
+    return list(_HOOKS)
+
+
 def log_query(
         crs: psycopg2.extensions.cursor,
         caller: str,
@@ -47,10 +206,322 @@ def log_query(
     __logger__.debug(f'[{caller}] {query_str}')
 
 
+class _StatementTimeout:
+    """
+    This context manager enforces a timeout on the statement executed within
+    it, both on the server (with `statement_timeout`) and on the client (with
+    a watchdog that cancels the query when the deadline passes).
+    """
+    def __init__(
+            self,
+            crs: psycopg2.extensions.cursor,
+            caller: str,
+            timeout: float
+    ):
+        """
+
+        :param crs: the execution cursor
+        :param caller: identifies the call stack location
+        :param timeout: the timeout (in seconds)
+        """
+        self._crs = crs
+        self._caller = caller
+        self._timeout = timeout
+        self._previous = None
+        self._lock = threading.Lock()
+        self._done = False
+        self._fired = False
+        self._watchdog = None
+        self._started = None
+
+    def _cancel(self):
+        """
+        Cancel the statement (unless it has already finished).
+        """
+        with self._lock:
+            if not self._done:
+                __logger__.warning(
+                    f'[{self._caller}] Cancelling the query after '
+                    f'{self._timeout}s.'
+                )
+                self._fired = True
+                self._crs.connection.cancel()
+
+    def __enter__(self):
+        cnx = self._crs.connection
+        # Set the timeout (locally, if we're in a transaction) and remember
+        # the old value so we can put it back.  (We use our own cursor so we
+        # don't disturb the caller's results.)
+        with cnx.cursor() as crs:
+            crs.execute(
+                "SELECT current_setting('statement_timeout'), "
+                "set_config('statement_timeout', %s, %s)",
+                (str(max(int(self._timeout * 1000), 1)), not cnx.autocommit)
+            )
+            self._previous = crs.fetchone()[0]
+        self._watchdog = threading.Timer(self._timeout, self._cancel)
+        self._watchdog.daemon = True
+        self._started = time.perf_counter()
+        self._watchdog.start()
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        with self._lock:
+            self._done = True
+        self._watchdog.cancel()
+        elapsed = time.perf_counter() - self._started
+        cnx = self._crs.connection
+        # Put the old timeout back (unless the transaction failed, in which
+        # case the rollback will take care of it).
+        if (
+                cnx.autocommit
+                or cnx.get_transaction_status()
+                != psycopg2.extensions.TRANSACTION_STATUS_INERROR
+        ):
+            with cnx.cursor() as crs:
+                crs.execute(
+                    "SELECT set_config('statement_timeout', %s, %s)",
+                    (self._previous, not cnx.autocommit)
+                )
+        # The query may also have been cancelled by someone else (with
+        # `pg_cancel_backend`, for example), which isn't a timeout.  It was
+        # ours if the watchdog fired, or if the server's `statement_timeout`
+        # did (in which case the deadline has passed).
+        if (
+                isinstance(value, psycopg2.extensions.QueryCanceledError)
+                and (self._fired or elapsed >= self._timeout)
+        ):
+            raise QueryTimeout(
+                message=f'[{self._caller}] The query was cancelled after '
+                        f'{elapsed:.3f}s (timeout {self._timeout}s).',
+                caller=self._caller,
+                elapsed=elapsed,
+                timeout=self._timeout,
+                inner=value
+            ) from value
+
+
+def _run_query(
+        crs: psycopg2.extensions.cursor,
+        query: Union[str, psycopg2.sql.Composed],
+        caller: str,
+        timeout: float = None,
+        stream: Any = None
+):
+    """
+    Execute a query on an open cursor.
+
+    :param crs: the execution cursor
+    :param query: the query
+    :param caller: identifies the call stack location
+    :param timeout: the number of seconds after which the query is cancelled
+    :param stream: the file-like object from which a `COPY ... FROM STDIN`
+        query reads
+    """
+    if stream is not None:
+        query_str = query if isinstance(query, str) else query.as_string(crs)
+
+        def _run():
+            crs.copy_expert(query_str, stream, size=COPY_READ_SIZE)
+    else:
+        def _run():
+            crs.execute(query)
+    try:
+        if timeout is None:
+            _run()
+        else:
+            with _StatementTimeout(crs=crs, caller=caller, timeout=timeout):
+                _run()
+    except SyntaxError:
+        logging.exception(
+            query if isinstance(query, str) else query.as_string(crs)
+        )
+        raise
+
+
+def _cursor_execute(
+        crs: psycopg2.extensions.cursor,
+        query: Union[str, psycopg2.sql.Composed],
+        caller: str,
+        timeout: float = None,
+        stream: Any = None
+) -> ExecuteEvent or None:
+    """
+    Execute a query on an open cursor, notifying any registered hooks.
+
+    :param crs: the execution cursor
+    :param query: the query
+    :param caller: identifies the call stack location
+    :param timeout: the number of seconds after which the query is cancelled
+    :param stream: the file-like object from which a `COPY ... FROM STDIN`
+        query reads
+    :return: the execute event (or `None` if there are no hooks) which should
+        be passed to :py:func:`_fetched` once the results have been fetched
+    """
+    # Log the query.
+    log_query(crs=crs, caller=caller, query=query)
+    # Take a snapshot of the hooks.  (If there are none, we don't pay for
+    # anything more than the check.)
+    _hooks = _HOOKS
+    if not _hooks:
+        _run_query(
+            crs=crs, query=query, caller=caller, timeout=timeout,
+            stream=stream
+        )
+        return None
+    event = ExecuteEvent(
+        caller=caller,
+        sql=query if isinstance(query, str) else query.as_string(crs),
+        cursor=crs
+    )
+    event._hooks = _hooks  # pylint: disable=protected-access
+    for hook in _hooks:
+        hook.before_execute(event)
+    started = time.perf_counter()
+    try:
+        _run_query(
+            crs=crs, query=query, caller=caller, timeout=timeout,
+            stream=stream
+        )
+        event.elapsed = time.perf_counter() - started
+        event.rows = crs.rowcount if crs.rowcount >= 0 else None
+    except Exception as ex:
+        event.elapsed = time.perf_counter() - started
+        event.error = ex
+        raise
+    finally:
+        for hook in _hooks:
+            hook.after_execute(event)
+    return event
+
+
+def value_size(value: Any) -> int:
+    """
+    Estimate the size of a fetched value: the length of strings and binary
+    values, or eight bytes for anything else.
+
+    :param value: the value
+    :return: the approximate size (in bytes)
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return len(value)
+    return 8
+
+
+def _fetched(event: ExecuteEvent or None):
+    """
+    Notify the hooks that the caller has finished fetching a query's results.
+
+    :param event: the event returned by :py:func:`_cursor_execute`
+    """
+    if event is None:
+        return
+    for hook in event._hooks:  # pylint: disable=protected-access
+        hook.after_fetch(event)
+
+
+#: the connections opened by :py:func:`connect` (so they can be discarded in
+#: a forked child process)
+_CONNECTIONS: 'weakref.WeakSet[psycopg2.extensions.connection]' = (
+    weakref.WeakSet()
+)
+
+#: the connections inherited from a parent process (which are kept so that
+#: they're never closed or deallocated in this one)
+_INHERITED: List[psycopg2.extensions.connection] = []
+
+
+def discard(cnx: psycopg2.extensions.connection):
+    """
+    Disown a connection inherited from a parent process without disturbing
+    the parent's session.  (Don't use the connection afterwards.)
+
+    :param cnx: the inherited connection
+
+    .. note::
+
+        The connection isn't closed.  Closing it would send the server a
+        termination message over the socket the parent is still using and,
+        worse, `psycopg2` holds a connection's lock for as long as a query
+        runs, so if one of the parent's threads was in a query when it
+        forked, the child's copy of the lock is held forever.  Instead, we
+        point this process's copy of the socket at `/dev/null` and keep the
+        connection (so it's never deallocated, which would also close it).
+    """
+    if not cnx.closed:
+        devnull = os.open(os.devnull, os.O_RDWR)
+        try:
+            os.dup2(devnull, cnx.fileno())
+        finally:
+            os.close(devnull)
+    if not any(c is cnx for c in _INHERITED):
+        _INHERITED.append(cnx)
+
+
+#: the fork-safe connections (so their locks can be replaced in a forked
+#: child process)
+_FORK_SAFE: 'weakref.WeakSet[ForkSafeConnection]' = weakref.WeakSet()
+
+
+def _discard_inherited():
+    """
+    Discard the connections inherited from the parent process.  (This is
+    called in a child process after a fork.)
+    """
+    for cnx in list(_CONNECTIONS):
+        try:
+            discard(cnx)
+        except Exception:  # pylint: disable=broad-except
+            # The child has to carry on, whatever happens here.
+            pass
+    _CONNECTIONS.clear()
+    # A lock may have been held by one of the parent's threads when it
+    # forked, and nobody in this process will ever release it.
+    for fork_safe in list(_FORK_SAFE):
+        fork_safe._reset()  # pylint: disable=protected-access
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_discard_inherited)
+
+
+#: a connect hook is called with each new connection
+ConnectHook = Callable[[psycopg2.extensions.connection], None]
+
+_CONNECT_HOOKS: List[ConnectHook] = []  #: the registered connect hooks
+
+
+def add_connect_hook(hook: ConnectHook) -> ConnectHook:
+    """
+    Register a hook to be called with each new connection opened by
+    :py:func:`connect` (for example, to register type casters).
+
+    :param hook: the hook
+    :return: the hook
+    """
+    global _CONNECT_HOOKS  # pylint: disable=global-statement
+    _CONNECT_HOOKS = _CONNECT_HOOKS + [hook]
+    return hook
+
+
+def remove_connect_hook(hook: ConnectHook):
+    """
+    Unregister a connect hook.
+
+    :param hook: the hook
+    """
+    global _CONNECT_HOOKS  # pylint: disable=global-statement
+    _CONNECT_HOOKS = [h for h in _CONNECT_HOOKS if h is not hook]
+
+
 def connect(
         url: str,
         dbname: str = None,
-        autocommit: bool = False
+        autocommit: bool = False,
+        connection_factory: type = None,
+        connect_timeout: float = None
 ) -> psycopg2.extensions.connection:
     """
     Get a connection to a Postgres database instance.
@@ -58,12 +529,23 @@ def connect(
     :param url: the instance URL
     :param dbname: the target database name
     :param autocommit: Set the `autocommit` flag on the connection?
+    :param connection_factory: the connection class (for example,
+        `psycopg2.extras.LogicalReplicationConnection`)
+    :param connect_timeout: the number of seconds to wait for the connection
+        (`libpq` rounds this to whole seconds, and waits at least two)
     :return: a psycopg2 connection
 
     .. note::
 
         If the caller does not provide the `dbname` parameter the function
         creates a connection to the database specified in the URL.
+
+    .. note::
+
+        If the process forks, the child's copy of the connection is closed
+        (without disturbing the parent's).  Use a
+        :py:class:`ForkSafeConnection` to reconnect in the child
+        automatically.
     """
     # Parse the URL.  (We'll need the pieces to construct a connection
     # string.)
@@ -80,18 +562,137 @@ def connect(
             'password': dbp.password
         }.items() if v is not None
     }
+    if connection_factory is not None:
+        cnx_opt['connection_factory'] = connection_factory
+    if connect_timeout is not None:
+        cnx_opt['connect_timeout'] = max(int(math.ceil(connect_timeout)), 1)
     cnx = psycopg2.connect(**cnx_opt)
+    _CONNECTIONS.add(cnx)
     # If the caller requested that the 'autocommit' flag be set...
     if autocommit:
         # ...do that now.
         cnx.autocommit = True
+    # Let the hooks prepare ordinary connections.  (Special-purpose
+    # connections, like replication connections, are left alone.)
+    if connection_factory is None:
+        for hook in _CONNECT_HOOKS:
+            hook(cnx)
     return cnx
 
 
+class ForkSafeConnection:
+    """
+    A fork-safe connection opens its connection when it's first used and
+    opens a new one in each process that uses it, so it can be created before
+    worker processes are forked.  It can be used wherever a connection is
+    expected.
+
+    .. code-block:: python
+
+        cnx = ForkSafeConnection(url)  # in the parent
+        ...
+        execute_rows(cnx, 'SELECT ...')  # in each worker
+    """
+    def __init__(
+            self,
+            url: str,
+            dbname: str = None,
+            autocommit: bool = False
+    ):
+        """
+
+        :param url: the instance URL
+        :param dbname: the target database name
+        :param autocommit: Set the `autocommit` flag on the connection?
+        """
+        self._url = url
+        self._dbname = dbname
+        self._autocommit = autocommit
+        self._cnx: psycopg2.extensions.connection or None = None
+        self._pid: int or None = None
+        self._lock = threading.Lock()
+        _FORK_SAFE.add(self)
+
+    def _reset(self):
+        """
+        Forget the parent's connection (and lock).  (This is called in a
+        child process after a fork.)
+        """
+        self._lock = threading.Lock()
+        if self._cnx is not None and self._pid != os.getpid():
+            self._cnx = None
+
+    @property
+    def url(self) -> str:
+        """
+        Get the instance URL.
+        """
+        return self._url
+
+    @property
+    def connection(self) -> psycopg2.extensions.connection:
+        """
+        Get this process's connection (opening it, if necessary).
+        """
+        cnx = self._cnx
+        if cnx is not None and self._pid == os.getpid() and not cnx.closed:
+            return cnx
+        with self._lock:
+            if self._cnx is not None and self._pid != os.getpid():
+                # The connection belongs to our parent.  (It has probably
+                # been discarded already, but we'll make sure.)
+                discard(self._cnx)
+                self._cnx = None
+            if self._cnx is None or self._cnx.closed:
+                self._cnx = connect(
+                    url=self._url,
+                    dbname=self._dbname,
+                    autocommit=self._autocommit
+                )
+            self._pid = os.getpid()
+            return self._cnx
+
+    def close(self):
+        """
+        Close this process's connection.  (It's reopened if it's used again.)
+        """
+        with self._lock:
+            if self._cnx is not None:
+                if self._pid == os.getpid():
+                    self._cnx.close()
+                else:
+                    discard(self._cnx)
+                self._cnx = None
+
+    def __getattr__(self, name: str):
+        # Anything we don't define ourselves comes from the connection.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.connection, name)
+
+    def __getstate__(self):
+        # Only the connection parameters travel to another process.
+        return {
+            'url': self._url,
+            'dbname': self._dbname,
+            'autocommit': self._autocommit
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __enter__(self):
+        return self.connection.__enter__()
+
+    def __exit__(self, type_, value, traceback):
+        return self.connection.__exit__(type_, value, traceback)
+
+
 def _execute_scalar(
         cnx: psycopg2.extensions.connection,
         query: psycopg2.sql.Composed,
-        caller: str
+        caller: str,
+        timeout: float = None
 ) -> Any:
     """
     This is a helper function for :py:func:`execute_scalar` that executes a
@@ -100,24 +701,28 @@ def _execute_scalar(
     :param cnx: an open connection or database connection string
     :param query: the query
     :param caller: identifies the call stack location
+    :param timeout: the number of seconds after which the query is cancelled
     """
     with cnx.cursor() as crs:
-        # Log the query.
-        log_query(crs=crs, caller=caller, query=query)
         # Execute!
-        try:
-            crs.execute(query)
-        except SyntaxError:
-            logging.exception(query.as_string(crs))
-            raise
+        event = _cursor_execute(
+            crs=crs, query=query, caller=caller, timeout=timeout
+        )
         # Get the first column from the first result.
-        return crs.fetchone()[0]
+        value = crs.fetchone()[0]
+        if event is not None:
+            event.fetched = 1
+            if event.measure:
+                event.fetched_bytes = value_size(value)
+            _fetched(event)
+        return value
 
 
 def execute_scalar(
         cnx: Union[str, psycopg2.extensions.connection],
         query: Union[str, psycopg2.sql.Composed],
-        caller: str = None
+        caller: str = None,
+        timeout: float = None
 ) -> Any or None:
     """
     Execute a query that returns a single, scalar result.
@@ -125,6 +730,8 @@ def execute_scalar(
     :param cnx: an open psycopg2 connection or the database URL
     :param query: the `psycopg2` composed query
     :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the query is cancelled
+        (If the query is cancelled, a :py:class:`QueryTimeout` is raised.)
     :return: the scalar string result (or `None` if the query returns no
         result)
     """
@@ -141,16 +748,21 @@ def execute_scalar(
     if isinstance(cnx, str):
         # ...get a connection and use the helper method to execute the query.
         with connect(url=cnx) as _cnx:
-            return _execute_scalar(cnx=_cnx, query=_query, caller=caller)
+            return _execute_scalar(
+                cnx=_cnx, query=_query, caller=caller, timeout=timeout
+            )
     # It looks as though we were given an open connection, so execute the
     # query on it.
-    return _execute_scalar(cnx=cnx, query=_query, caller=caller)
+    return _execute_scalar(
+        cnx=cnx, query=_query, caller=caller, timeout=timeout
+    )
 
 
 def _execute_rows(
         cnx: psycopg2.extensions.connection,
         query: psycopg2.sql.Composed,
-        caller: str
+        caller: str,
+        timeout: float = None
 ) -> Iterable[psycopg2.extras.DictRow]:
     """
     This is a helper function for :py:func:`execute_rows` that executes a
@@ -159,26 +771,35 @@ def _execute_rows(
     :param cnx: an open connection or database connection string
     :param query: the query
     :param caller: identifies the call stack location
+    :param timeout: the number of seconds after which the query is cancelled
     :return: an iteration of `DictRow` instances representing the rows
     """
     with cnx.cursor(cursor_factory=psycopg2.extras.DictCursor) as crs:
-        # Log the query.
-        log_query(crs=crs, caller=caller, query=query)
         # Execute!
-        try:
-            crs.execute(query)
-        except SyntaxError:
-            logging.exception(query.as_string(crs))
-            raise
+        event = _cursor_execute(
+            crs=crs, query=query, caller=caller, timeout=timeout
+        )
         # Fetch the rows and yield them to the caller.
-        for row in crs:
-            yield row
+        if event is None:
+            for row in crs:
+                yield row
+            return
+        # If there are hooks, keep count as we go.
+        try:
+            for row in crs:
+                event.fetched += 1
+                if event.measure:
+                    event.fetched_bytes += sum(value_size(v) for v in row)
+                yield row
+        finally:
+            _fetched(event)
 
 
 def execute_rows(
         cnx: Union[str, psycopg2.extensions.connection],
         query: Union[str, psycopg2.sql.Composed],
-        caller: str = None
+        caller: str = None,
+        timeout: float = None
 ) -> Iterable[psycopg2.extras.DictRow]:
     """
     Execute a query that returns an iteration of rows.
@@ -186,6 +807,8 @@ def execute_rows(
     :param cnx: an open connection or database connection string
     :param query: the `psycopg2` composed query
     :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the query is cancelled
+        (If the query is cancelled, a :py:class:`QueryTimeout` is raised.)
     :return: an iteration of `DictRow` instances representing the row
     """
     # Get the name of the calling function so we can include it in the logging
@@ -201,18 +824,24 @@ def execute_rows(
     if isinstance(cnx, str):
         # ...get a connection and use the helper method to execute the query.
         with connect(url=cnx) as _cnx:
-            for row in _execute_rows(cnx=_cnx, query=_query, caller=caller):
+            for row in _execute_rows(
+                    cnx=_cnx, query=_query, caller=caller, timeout=timeout
+            ):
                 yield row
+        return
     # It looks as though we were given an open connection, so execute the
     # query on it.
-    for row in _execute_rows(cnx=cnx, query=_query, caller=caller):
+    for row in _execute_rows(
+            cnx=cnx, query=_query, caller=caller, timeout=timeout
+    ):
         yield row
 
 
 def _execute(
         cnx: psycopg2.extensions.connection,
         query: psycopg2.sql.Composed,
-        caller: str
+        caller: str,
+        timeout: float = None
 ):
     """
     This is a helper function for :py:func:`execute` that executes a
@@ -221,22 +850,22 @@ def _execute(
     :param cnx: an open connection or database connection string
     :param query: the query
     :param caller: identifies the call stack location
+    :param timeout: the number of seconds after which the query is cancelled
     """
     with cnx.cursor() as crs:
-        # Log the query.
-        log_query(crs=crs, caller=caller, query=query)
         # Execute!
-        try:
-            crs.execute(query)
-        except SyntaxError:
-            logging.exception(query.as_string(crs))
-            raise
+        _fetched(
+            _cursor_execute(
+                crs=crs, query=query, caller=caller, timeout=timeout
+            )
+        )
 
 
 def execute(
         cnx: Union[str, psycopg2.extensions.connection],
         query: Union[str, psycopg2.sql.Composed],
-        caller: str = None
+        caller: str = None,
+        timeout: float = None
 ):
     """
     Execute a query that returns no result.
@@ -244,6 +873,8 @@ def execute(
     :param cnx: an open connection or database connection string
     :param query: the `psycopg2` composed query
     :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the query is cancelled
+        (If the query is cancelled, a :py:class:`QueryTimeout` is raised.)
 
     .. seealso::
 
@@ -263,10 +894,11 @@ def execute(
     if isinstance(cnx, str):
         # ...get a connection and use the helper method to execute the query.
         with connect(url=cnx) as _cnx:
-            _execute(cnx=_cnx, query=_query, caller=caller)
+            _execute(cnx=_cnx, query=_query, caller=caller, timeout=timeout)
+        return
     # It looks as though we were given an open connection, so execute the
     # query on it.
-    _execute(cnx=cnx, query=_query, caller=caller)
+    _execute(cnx=cnx, query=_query, caller=caller, timeout=timeout)
 
 
 def compose_table(
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.phrasebooks
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a phrasebook that isn't loaded from disk until a phrase
+is first needed, and that hands out its phrases as (cached) SQL objects.
+"""
+from pathlib import Path
+import threading
+from typing import Dict
+from psycopg2.sql import SQL
+
+
+class LazySqlPhrasebook:
+    """
+    A lazily-loaded SQL phrasebook.
+
+    .. code-block:: python
+
+        _PHRASEBOOK = LazySqlPhrasebook(__file__)
+        ...
+        query = _PHRASEBOOK.sql('table_exists').format(...)
+    """
+    def __init__(self, path: str or Path):
+        """
+
+        :param path: the path to the phrases directory, or a module file that
+            has an accompanying phrasebook (`.phr`) directory
+        """
+        self._path = Path(path)
+        self._phrasebook = None
+        self._sql: Dict[str, SQL] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        """
+        Get the path to the phrases.
+        """
+        return self._path
+
+    def _load(self):
+        """
+        Load the phrasebook (if it hasn't been loaded already).
+        """
+        with self._lock:
+            if self._phrasebook is None:
+                # pylint: disable=import-outside-toplevel
+                from phrasebook import SqlPhrasebook
+                self._phrasebook = SqlPhrasebook(
+                    self._path.with_suffix('.phr')
+                ).load()
+        return self._phrasebook
+
+    def gets(self, phrase: str) -> str or None:
+        """
+        Get a phrase template string.
+
+        :param phrase: the name of the phrase
+        :return: the phrase, or `None` if it isn't defined
+        """
+        phrasebook = self._phrasebook
+        if phrasebook is None:
+            phrasebook = self._load()
+        return phrasebook.gets(phrase)
+
+    def sql(self, phrase: str) -> SQL:
+        """
+        Get a phrase as a SQL object.
+
+        :param phrase: the name of the phrase
+        :return: the SQL object
+        :raises KeyError: if the phrase isn't defined
+        """
+        try:
+            return self._sql[phrase]
+        except KeyError:
+            text = self.gets(phrase)
+            if text is None:
+                raise
+            # SQL objects are immutable, so they're safe to share.
+            return self._sql.setdefault(phrase, SQL(text))
+
+    def compile(self) -> 'LazySqlPhrasebook':
+        """
+        Load the phrasebook and build all of its SQL objects now rather than
+        on first use.  (You might do this while warming up a worker.)
+
+        :return: this instance
+        """
+        for phrase, _ in self._load().items():
+            self.sql(phrase)
+        return self
@@ -0,0 +1,508 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.replication
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a logical replication consumer that follows row changes
+(inserts, updates and deletes) through a replication slot.
+
+.. code-block:: python
+
+    from normanpg.replication import ChangeStream
+
+    with ChangeStream(url, 'cache_invalidation') as stream:
+        for batch in stream.batches():
+            handle(batch)
+            stream.ack(batch)
+
+.. note::
+
+    The database must be configured with `wal_level = logical` and the user
+    needs the `REPLICATION` attribute.  The `wal2json` output plugin must be
+    installed to use it; the `test_decoding` plugin ships with PostgreSQL.
+
+    Delivery is at-least-once: if the consumer restarts partway through a
+    transaction, the whole transaction is delivered again.
+"""
+import json
+import logging
+from pathlib import Path
+import re
+import select
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+import psycopg2
+import psycopg2.extras
+from .errors import NormanPgException
+from .pg import connect
+
+__logger__ = logging.getLogger(__name__)  #: the module logger
+
+DEFAULT_PLUGIN = 'wal2json'  #: the default output plugin
+DEFAULT_BATCH_SIZE: int = 1000  #: the default maximum events per batch
+DEFAULT_BATCH_TIMEOUT: float = 1.0  #: the default seconds to fill a batch
+
+_DUPLICATE_OBJECT = '42710'  #: the SQLSTATE for a duplicate object
+
+
+class ReplicationException(NormanPgException):
+    """
+    Raised when the change stream can't be started or decoded.
+    """
+
+
+def lsn_to_str(lsn: int) -> str:
+    """
+    Format a log sequence number (LSN) the way Postgres does (`X/Y`).
+
+    :param lsn: the LSN
+    :return: the formatted LSN
+    """
+    return f'{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}'
+
+
+def str_to_lsn(lsn: str) -> int:
+    """
+    Parse a log sequence number (LSN) formatted the way Postgres does (`X/Y`).
+
+    :param lsn: the formatted LSN
+    :return: the LSN
+    """
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class ChangeEvent:
+    """
+    A row change.
+    """
+    __slots__ = ('lsn', 'op', 'schema', 'table', 'columns', 'old_keys')
+
+    def __init__(
+            self,
+            lsn: int,
+            op: str,
+            schema: str,
+            table: str,
+            columns: Dict[str, Any] = None,
+            old_keys: Dict[str, Any] = None
+    ):
+        """
+
+        :param lsn: the log sequence number of the change
+        :param op: the operation (``INSERT``, ``UPDATE`` or ``DELETE``)
+        :param schema: the schema in which the table resides
+        :param table: the name of the table
+        :param columns: the new column values (for inserts and updates)
+        :param old_keys: the old replica identity (key) values (for updates
+            and deletes)
+        """
+        self.lsn = lsn
+        self.op = op
+        self.schema = schema
+        self.table = table
+        self.columns = columns if columns else {}
+        self.old_keys = old_keys if old_keys else {}
+
+    def __repr__(self):
+        return (
+            f'ChangeEvent({lsn_to_str(self.lsn)}, {self.op}, '
+            f'{self.schema}.{self.table})'
+        )
+
+
+_WAL2JSON_OPS = {'I': 'INSERT', 'U': 'UPDATE', 'D': 'DELETE'}
+
+
+def decode_wal2json(lsn: int, payload: str) -> List[ChangeEvent]:
+    """
+    Decode a `wal2json` (`format-version` 2) message.
+
+    :param lsn: the log sequence number of the message
+    :param payload: the message
+    :return: the changes (Transaction boundaries and other messages produce
+        none.)
+    """
+    message = json.loads(payload)
+    op = _WAL2JSON_OPS.get(message.get('action'))
+    if op is None:
+        return []
+    return [
+        ChangeEvent(
+            lsn=lsn,
+            op=op,
+            schema=message['schema'],
+            table=message['table'],
+            columns={
+                c['name']: c['value'] for c in message.get('columns', [])
+            },
+            old_keys={
+                c['name']: c['value'] for c in message.get('identity', [])
+            }
+        )
+    ]
+
+
+_TEST_DECODING_CHANGE = re.compile(
+    r'^table (?P<schema>"(?:[^"]|"")+"|[^.]+)\.(?P<table>.+?): '
+    r'(?P<op>INSERT|UPDATE|DELETE): (?P<data>.*)$',
+    re.DOTALL
+)  #: matches a `test_decoding` change
+_TEST_DECODING_COLUMN = re.compile(
+    r'(?P<name>"(?:[^"]|"")+"|[^\s\[]+)\[(?P<type>[^\]]+)\]:'
+    r"(?P<value>'(?:[^']|'')*'|\S+)"
+)  #: matches a `test_decoding` column value
+
+
+def _unquote_ident(ident: str) -> str:
+    if ident.startswith('"'):
+        return ident[1:-1].replace('""', '"')
+    return ident
+
+
+def _test_decoding_columns(data: str) -> Dict[str, Any]:
+    columns = {}
+    for match in _TEST_DECODING_COLUMN.finditer(data):
+        value = match.group('value')
+        if value.startswith("'"):
+            _value = value[1:-1].replace("''", "'")
+        elif value == 'null':
+            _value = None
+        else:
+            _value = value
+        columns[_unquote_ident(match.group('name'))] = _value
+    return columns
+
+
+def decode_test_decoding(lsn: int, payload: str) -> List[ChangeEvent]:
+    """
+    Decode a `test_decoding` message.  (Values are returned as the text
+    `test_decoding` reports.)
+
+    :param lsn: the log sequence number of the message
+    :param payload: the message
+    :return: the changes (Transaction boundaries produce none.)
+    """
+    match = _TEST_DECODING_CHANGE.match(payload)
+    if not match:
+        return []
+    op = match.group('op')
+    data = match.group('data')
+    old_keys = {}
+    if data.startswith('old-key: '):
+        old, _, data = data[len('old-key: '):].partition(' new-tuple: ')
+        old_keys = _test_decoding_columns(old)
+    columns = _test_decoding_columns(data)
+    # A delete reports the old key as its data.
+    if op == 'DELETE':
+        columns, old_keys = {}, columns
+    return [
+        ChangeEvent(
+            lsn=lsn,
+            op=op,
+            schema=_unquote_ident(match.group('schema')),
+            table=_unquote_ident(match.group('table')),
+            columns=columns,
+            old_keys=old_keys
+        )
+    ]
+
+
+#: the message decoders, indexed by output plugin
+DECODERS: Dict[str, Callable[[int, str], List[ChangeEvent]]] = {
+    'wal2json': decode_wal2json,
+    'test_decoding': decode_test_decoding
+}
+
+#: the replication options for each output plugin
+PLUGIN_OPTIONS: Dict[str, Dict[str, str]] = {
+    'wal2json': {'format-version': '2', 'include-types': 'false'},
+    'test_decoding': {}
+}
+
+
+#: tell whether a message opens (``B``) or closes (``C``) a transaction, by
+#: output plugin
+BOUNDARIES: Dict[str, Callable[[str], Optional[str]]] = {
+    'wal2json': lambda payload: (
+        'B' if payload.startswith('{"action":"B"')
+        else 'C' if payload.startswith('{"action":"C"')
+        else None
+    ),
+    'test_decoding': lambda payload: (
+        'B' if payload.startswith('BEGIN ')
+        else 'C' if payload.startswith('COMMIT ')
+        else None
+    )
+}
+
+
+class FileLsnStore:
+    """
+    An LSN store keeps the last acknowledged log sequence number in a file so
+    a consumer can resume exactly where it left off.
+    """
+    def __init__(self, path: Union[str, Path]):
+        """
+
+        :param path: the path to the file
+        """
+        self._path = Path(path)
+
+    def load(self) -> Optional[int]:
+        """
+        Get the last acknowledged LSN.
+
+        :return: the LSN, or `None` if none has been stored
+        """
+        try:
+            return str_to_lsn(self._path.read_text().strip())
+        except FileNotFoundError:
+            return None
+
+    def save(self, lsn: int):
+        """
+        Store the last acknowledged LSN.
+
+        :param lsn: the LSN
+        """
+        tmp = self._path.with_name(f'.{self._path.name}.tmp')
+        tmp.write_text(lsn_to_str(lsn))
+        tmp.replace(self._path)
+
+
+class ChangeStream:
+    """
+    A change stream consumes decoded row changes from a logical replication
+    slot.
+    """
+    def __init__(
+            self,
+            url: str,
+            slot_name: str,
+            plugin: str = DEFAULT_PLUGIN,
+            create_slot: bool = True,
+            lsn_store: FileLsnStore = None,
+            options: Dict[str, str] = None
+    ):
+        """
+
+        :param url: the database URL
+        :param slot_name: the name of the replication slot
+        :param plugin: the output plugin (``wal2json`` or ``test_decoding``)
+        :param create_slot: ``True`` to create the slot if it doesn't exist
+        :param lsn_store: a store for the last acknowledged LSN (The slot
+            itself remembers the last flushed LSN, so this is only needed
+            if you want to resume from a position you control.)
+        :param options: additional options for the output plugin
+        """
+        if plugin not in DECODERS:
+            raise ReplicationException(
+                f'The {plugin} output plugin is not supported.  '
+                f'(Use one of {", ".join(DECODERS)}.)'
+            )
+        self._url = url
+        self._slot_name = slot_name
+        self._plugin = plugin
+        self._create_slot = create_slot
+        self._lsn_store = lsn_store
+        self._options = {**PLUGIN_OPTIONS[plugin], **(options or {})}
+        self._decode = DECODERS[plugin]
+        self._boundary = BOUNDARIES[plugin]
+        self._in_transaction = False
+        self._cnx = None
+        self._crs = None
+        self._acked: Optional[int] = None
+        self._delivered: Optional[int] = None
+
+    @property
+    def slot_name(self) -> str:
+        """
+        Get the name of the replication slot.
+        """
+        return self._slot_name
+
+    @property
+    def acked_lsn(self) -> Optional[int]:
+        """
+        Get the last acknowledged LSN.
+        """
+        return self._acked
+
+    def open(self) -> 'ChangeStream':
+        """
+        Connect, create the slot (if necessary), and start replication.
+
+        :return: this instance
+        """
+        if self._cnx is not None:
+            return self
+        self._cnx = connect(
+            url=self._url,
+            connection_factory=psycopg2.extras.LogicalReplicationConnection
+        )
+        self._crs = self._cnx.cursor()
+        if self._create_slot:
+            try:
+                self._crs.create_replication_slot(
+                    self._slot_name, output_plugin=self._plugin
+                )
+                __logger__.info(
+                    f'Created the {self._slot_name} replication slot.'
+                )
+            except psycopg2.ProgrammingError as ex:
+                # If the slot is already there, we'll use it.
+                if ex.pgcode != _DUPLICATE_OBJECT:
+                    raise
+        start_lsn = self._lsn_store.load() if self._lsn_store else None
+        self._acked = start_lsn
+        self._crs.start_replication(
+            slot_name=self._slot_name,
+            decode=True,
+            start_lsn=start_lsn if start_lsn is not None else 0,
+            options=self._options
+        )
+        return self
+
+    def _pending(self) -> bool:
+        """
+        Have changes been delivered that haven't been acknowledged?
+        """
+        return self._delivered is not None and (
+            self._acked is None or self._acked < self._delivered
+        )
+
+    def _advance(self):
+        """
+        If every delivered change has been acknowledged (and we aren't partway
+        through a transaction), confirm everything the server has sent so far
+        so a slot on an idle database doesn't hold on to the WAL the rest of
+        the cluster writes.
+        """
+        wal_end = getattr(self._crs, 'wal_end', 0)
+        if not wal_end or self._in_transaction or self._pending():
+            return
+        if self._acked is not None and wal_end <= self._acked:
+            return
+        self._crs.send_feedback(flush_lsn=wal_end)
+        self._acked = wal_end
+        if self._lsn_store:
+            self._lsn_store.save(wal_end)
+
+    def read_batch(
+            self,
+            max_events: int = DEFAULT_BATCH_SIZE,
+            timeout: float = DEFAULT_BATCH_TIMEOUT
+    ) -> List[ChangeEvent]:
+        """
+        Read the next batch of changes.
+
+        :param max_events: the maximum number of changes in the batch
+        :param timeout: the number of seconds to wait to fill the batch
+        :return: the changes (which may be empty if none arrived in time)
+        """
+        self.open()
+        events: List[ChangeEvent] = []
+        deadline = time.monotonic() + timeout
+        while len(events) < max_events:
+            # `read_message` doesn't block (and takes care of keepalives).
+            message = self._crs.read_message()
+            if message is not None:
+                decoded = self._decode(message.data_start, message.payload)
+                if decoded:
+                    events.extend(decoded)
+                    self._delivered = decoded[-1].lsn
+                    continue
+                boundary = self._boundary(message.payload)
+                if boundary is not None:
+                    self._in_transaction = boundary == 'B'
+            else:
+                # There's nothing waiting, so it's safe to move the slot up
+                # to the server's position.
+                self._advance()
+            # Messages that aren't changes (like transaction boundaries)
+            # mustn't keep us past the deadline.
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if message is None:
+                select.select([self._cnx], [], [], remaining)
+        return events
+
+    def batches(
+            self,
+            max_events: int = DEFAULT_BATCH_SIZE,
+            timeout: float = DEFAULT_BATCH_TIMEOUT,
+            auto_ack: bool = False
+    ) -> Iterator[List[ChangeEvent]]:
+        """
+        Get the changes in batches.  (Empty batches are skipped.)
+
+        :param max_events: the maximum number of changes in each batch
+        :param timeout: the number of seconds to wait to fill each batch
+        :param auto_ack: ``True`` to acknowledge each batch when the next one
+            is requested (Otherwise, call :py:func:`ack` when you have
+            processed a batch.)
+        :return: an iteration of batches
+        """
+        while True:
+            batch = self.read_batch(max_events=max_events, timeout=timeout)
+            if not batch:
+                continue
+            yield batch
+            if auto_ack:
+                self.ack(batch)
+
+    def ack(self, lsn: Union[int, ChangeEvent, List[ChangeEvent]]):
+        """
+        Acknowledge that changes have been processed so the server can
+        discard the write-ahead log (WAL) that contains them.
+
+        :param lsn: the LSN through which changes have been processed (or the
+            last processed change, or a processed batch)
+        """
+        if isinstance(lsn, list):
+            if not lsn:
+                return
+            _lsn = lsn[-1].lsn
+        elif isinstance(lsn, ChangeEvent):
+            _lsn = lsn.lsn
+        else:
+            _lsn = lsn
+        self._crs.send_feedback(flush_lsn=_lsn, reply=True)
+        self._acked = _lsn
+        if self._lsn_store:
+            self._lsn_store.save(_lsn)
+
+    def drop_slot(self):
+        """
+        Drop the replication slot.  (Do this when the consumer is retired, or
+        the server will keep its WAL forever.)
+        """
+        self.close()
+        cnx = connect(
+            url=self._url,
+            connection_factory=psycopg2.extras.LogicalReplicationConnection
+        )
+        try:
+            cnx.cursor().drop_replication_slot(self._slot_name)
+        finally:
+            cnx.close()
+
+    def close(self):
+        """
+        Stop replication and close the connection.
+        """
+        if self._cnx is not None:
+            self._cnx.close()
+            self._cnx = None
+            self._crs = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
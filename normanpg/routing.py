@@ -0,0 +1,606 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.routing
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a router that splits reads and writes between a primary
+database instance and its streaming replicas.
+
+.. code-block:: python
+
+    from normanpg.routing import Router
+
+    router = Router(primary_url, [replica1_url, replica2_url], max_lag=5.0)
+    rows = router.execute_rows('SELECT ...')  # a healthy replica
+    router.execute('UPDATE ...')  # the primary
+
+Reads (:py:meth:`Router.execute_rows` and :py:meth:`Router.execute_scalar`)
+go to a replica whose replay lag is within the threshold, and everything else
+goes to the primary.  If no replica is healthy, reads go to the primary too.
+
+The replicas' lag is measured in the background (on a thread for each
+replica, over a connection kept for the purpose), so reads never wait for a
+measurement.  Until a replica's lag has been measured, it isn't sent reads.
+
+Queries run on connections the router keeps for each database (see
+:py:meth:`Router.connection`), so they don't pay to connect every time.
+Close the router when you're done with it to stop the measurements and close
+the connections.
+"""
+from contextlib import contextmanager
+import inspect
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.sql
+from .pg import connect, execute, execute_rows, execute_scalar
+
+__logger__ = logging.getLogger(__name__)  #: the module logger
+
+ROUND_ROBIN = 'round_robin'  #: send reads to the replicas in turn
+#: send reads to the replica with the fewest queries in flight
+LEAST_OUTSTANDING = 'least_outstanding'
+STRATEGIES = (ROUND_ROBIN, LEAST_OUTSTANDING)  #: the replica strategies
+
+DEFAULT_MAX_LAG: float = 10.0  #: the default maximum replica lag (seconds)
+DEFAULT_LAG_CHECK_INTERVAL: float = 1.0  #: the default lag check interval
+#: the default number of seconds to wait for a connection to a replica
+DEFAULT_CONNECT_TIMEOUT: float = 2.0
+#: the default number of idle connections the router keeps for each database
+DEFAULT_POOL_SIZE: int = 4
+
+#: measures a replica's replay lag (in seconds)
+REPLICA_LAG_QUERY = (
+    'SELECT CASE '
+    'WHEN NOT pg_is_in_recovery() THEN 0 '
+    # A replica that has replayed everything it has received is caught up,
+    # however long ago the last transaction was.
+    'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE('
+    'EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0'
+    ') END'
+)
+
+
+def replica_lag(
+        cnx: Union[str, psycopg2.extensions.connection],
+        timeout: float = None,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+) -> float:
+    """
+    Measure how far (in seconds) a replica is behind its primary.
+
+    :param cnx: an open connection to the replica or its database URL
+    :param timeout: the number of seconds after which the query is cancelled
+    :param connect_timeout: the number of seconds to wait for a connection
+        (if `cnx` is a URL)
+    :return: the replay lag (which is zero for a primary or a caught-up
+        replica)
+    """
+    if isinstance(cnx, str):
+        _cnx = connect(
+            url=cnx, autocommit=True, connect_timeout=connect_timeout
+        )
+        try:
+            return replica_lag(cnx=_cnx, timeout=timeout)
+        finally:
+            _cnx.close()
+    return float(
+        execute_scalar(
+            cnx=cnx,
+            query=REPLICA_LAG_QUERY,
+            caller='replica_lag',
+            timeout=timeout
+        )
+    )
+
+
+class Replica:
+    """
+    The router's view of a replica.
+    """
+    __slots__ = ('url', 'outstanding', 'lag', 'checked')
+
+    def __init__(self, url: str):
+        """
+
+        :param url: the replica's database URL
+        """
+        self.url: str = url  #: the database URL
+        self.outstanding: int = 0  #: the number of queries in flight
+        #: the last measured lag (`None` if it hasn't been measured)
+        self.lag: float or None = None
+        self.checked: float or None = None  #: when the lag was measured
+
+    def __repr__(self):
+        return f'Replica(lag={self.lag}, outstanding={self.outstanding})'
+
+
+class RouterSession:
+    """
+    A router session routes queries on behalf of a single unit of work.  If
+    the router reads its own writes, the session is pinned to the primary
+    after it writes.
+    """
+    def __init__(self, router: 'Router'):
+        """
+
+        :param router: the router
+        """
+        self._router = router
+        self._pinned_until: float or None = None
+
+    @property
+    def pinned(self) -> bool:
+        """
+        Is the session pinned to the primary?
+        """
+        if self._pinned_until is None:
+            return False
+        return time.monotonic() < self._pinned_until
+
+    def pin(self, seconds: float = None):
+        """
+        Pin the session to the primary.
+
+        :param seconds: the number of seconds for which the session is pinned
+            (The default is the router's `pin_seconds`.)
+        """
+        _seconds = seconds if seconds is not None else self._router.pin_seconds
+        self._pinned_until = (
+            float('inf') if _seconds is None
+            else time.monotonic() + _seconds
+        )
+
+    def unpin(self):
+        """
+        Let the session's reads go to the replicas again.
+        """
+        self._pinned_until = None
+
+    def _wrote(self):
+        if self._router.read_your_writes:
+            self.pin()
+
+    def execute_scalar(
+            self,
+            query: Union[str, psycopg2.sql.Composed],
+            caller: str = None,
+            timeout: float = None,
+            write: bool = False
+    ) -> Any or None:
+        """
+        Execute a query that returns a single, scalar result.
+
+        :param query: the `psycopg2` composed query
+        :param caller: identifies the caller (for diagnostics)
+        :param timeout: the number of seconds after which the query is
+            cancelled
+        :param write: Does the query write?  (If so, it goes to the primary.)
+        :return: the scalar result (or `None` if the query returns no result)
+        """
+        caller = caller if caller else inspect.stack()[1][3]
+        if write:
+            with self._router.connection(self._router.primary) as cnx:
+                result = execute_scalar(
+                    cnx=cnx, query=query, caller=caller, timeout=timeout
+                )
+            self._wrote()
+            return result
+        with self._router.read_url(pinned=self.pinned) as url, \
+                self._router.connection(url) as cnx:
+            return execute_scalar(
+                cnx=cnx, query=query, caller=caller, timeout=timeout
+            )
+
+    def execute_rows(
+            self,
+            query: Union[str, psycopg2.sql.Composed],
+            caller: str = None,
+            timeout: float = None,
+            write: bool = False
+    ) -> Iterable[psycopg2.extras.DictRow]:
+        """
+        Execute a query that returns an iteration of rows.
+
+        :param query: the `psycopg2` composed query
+        :param caller: identifies the caller (for diagnostics)
+        :param timeout: the number of seconds after which the query is
+            cancelled
+        :param write: Does the query write?  (If so, it goes to the primary.)
+        :return: an iteration of `DictRow` instances representing the rows
+        """
+        caller = caller if caller else inspect.stack()[1][3]
+        if write:
+            with self._router.connection(self._router.primary) as cnx:
+                for row in execute_rows(
+                        cnx=cnx, query=query, caller=caller, timeout=timeout
+                ):
+                    yield row
+            self._wrote()
+            return
+        with self._router.read_url(pinned=self.pinned) as url, \
+                self._router.connection(url) as cnx:
+            for row in execute_rows(
+                    cnx=cnx, query=query, caller=caller, timeout=timeout
+            ):
+                yield row
+
+    def execute(
+            self,
+            query: Union[str, psycopg2.sql.Composed],
+            caller: str = None,
+            timeout: float = None
+    ):
+        """
+        Execute a query that returns no result on the primary.
+
+        :param query: the `psycopg2` composed query
+        :param caller: identifies the caller (for diagnostics)
+        :param timeout: the number of seconds after which the query is
+            cancelled
+        """
+        caller = caller if caller else inspect.stack()[1][3]
+        with self._router.connection(self._router.primary) as cnx:
+            execute(cnx=cnx, query=query, caller=caller, timeout=timeout)
+        self._wrote()
+
+
+class Router:
+    """
+    A router sends reads to the replicas and writes to the primary.
+    """
+    def __init__(
+            self,
+            primary: str,
+            replicas: Sequence[str] = (),
+            strategy: str = ROUND_ROBIN,
+            max_lag: float = DEFAULT_MAX_LAG,
+            lag_check_interval: float = DEFAULT_LAG_CHECK_INTERVAL,
+            read_your_writes: bool = False,
+            pin_seconds: float = None,
+            connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+            pool_size: int = DEFAULT_POOL_SIZE
+    ):
+        """
+
+        :param primary: the primary's database URL
+        :param replicas: the replicas' database URLs
+        :param strategy: how reads are spread across the replicas
+            (:py:data:`ROUND_ROBIN` or :py:data:`LEAST_OUTSTANDING`)
+        :param max_lag: replicas whose replay lag exceeds this many seconds
+            aren't sent reads
+        :param lag_check_interval: the number of seconds between
+            measurements of each replica's lag
+        :param read_your_writes: Pin a session to the primary after it
+            writes?
+        :param pin_seconds: the number of seconds for which a session stays
+            pinned after a write (The default is for the rest of the
+            session.)
+        :param connect_timeout: the number of seconds to wait for a
+            connection to a replica when its lag is measured
+        :param pool_size: the maximum number of idle connections kept for
+            each database
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f'The strategy must be one of {", ".join(STRATEGIES)}.'
+            )
+        self._primary = primary
+        self._replicas = [Replica(url) for url in replicas]
+        self._strategy = strategy
+        self._max_lag = max_lag
+        self._lag_check_interval = lag_check_interval
+        self._read_your_writes = read_your_writes
+        self._pin_seconds = pin_seconds
+        self._connect_timeout = connect_timeout
+        self._pool_size = pool_size
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # the connections on which the replicas' lag is measured
+        self._probes: Dict[str, psycopg2.extensions.connection] = {}
+        # the idle connections on which queries run (by database URL)
+        self._idle: Dict[str, List[psycopg2.extensions.connection]] = {}
+        self._stop = threading.Event()
+        self._refreshers: List[threading.Thread] = []
+
+    @property
+    def primary(self) -> str:
+        """
+        Get the primary's database URL.
+        """
+        return self._primary
+
+    @property
+    def replicas(self) -> List[Replica]:
+        """
+        Get the replicas.
+        """
+        return list(self._replicas)
+
+    @property
+    def read_your_writes(self) -> bool:
+        """
+        Are sessions pinned to the primary after they write?
+        """
+        return self._read_your_writes
+
+    @property
+    def pin_seconds(self) -> float or None:
+        """
+        Get the number of seconds for which a session stays pinned after a
+        write.  (`None` means for the rest of the session.)
+        """
+        return self._pin_seconds
+
+    def measure_lag(self, url: str) -> float:
+        """
+        Measure a replica's replay lag.  (Override this method to measure lag
+        some other way.)
+
+        :param url: the replica's database URL
+        :return: the lag (in seconds)
+        """
+        # Each replica is measured on its own thread, so its probe connection
+        # is only ever used by one thread at a time.
+        cnx = self._probes.get(url)
+        if cnx is None or cnx.closed:
+            cnx = connect(
+                url=url,
+                autocommit=True,
+                connect_timeout=self._connect_timeout
+            )
+            self._probes[url] = cnx
+        try:
+            return replica_lag(cnx=cnx, timeout=self._lag_check_interval)
+        except Exception:
+            # Start over with a new connection next time.
+            del self._probes[url]
+            cnx.close()
+            raise
+
+    def _measure(self, replica: Replica):
+        """
+        Measure a replica's lag now.
+        """
+        try:
+            replica.lag = self.measure_lag(replica.url)
+        except Exception:  # pylint: disable=broad-except
+            __logger__.warning(
+                'The replica lag could not be measured.', exc_info=True
+            )
+            replica.lag = float('inf')
+        replica.checked = time.monotonic()
+
+    def refresh(self):
+        """
+        Measure every replica's lag now (on the current thread).
+        """
+        for replica in self._replicas:
+            self._measure(replica)
+
+    def _refresh_forever(self, replica: Replica):
+        """
+        Measure a replica's lag periodically until the router is closed.
+        """
+        while not self._stop.is_set():
+            self._measure(replica)
+            self._stop.wait(self._lag_check_interval)
+
+    def _start_refreshers(self):
+        """
+        Start measuring the replicas' lag in the background (unless that's
+        already happening).
+        """
+        if self._refreshers or self._stop.is_set():
+            return
+        with self._lock:
+            if self._refreshers:
+                return
+            self._refreshers = [
+                threading.Thread(
+                    target=self._refresh_forever,
+                    args=(replica,),
+                    name=f'normanpg-replica-lag-{i}',
+                    daemon=True
+                )
+                for i, replica in enumerate(self._replicas)
+            ]
+            for thread in self._refreshers:
+                thread.start()
+
+    def healthy(self) -> List[Replica]:
+        """
+        Get the replicas whose (last measured) replay lag is within the
+        threshold.
+
+        :return: the healthy replicas
+        """
+        self._start_refreshers()
+        return [
+            r for r in self._replicas
+            if r.lag is not None and r.lag <= self._max_lag
+        ]
+
+    @contextmanager
+    def connection(
+            self,
+            url: str
+    ) -> Iterator[psycopg2.extensions.connection]:
+        """
+        Check a connection to a database out of the router's pool for as long
+        as a query is in flight.  (The transaction is committed, or rolled
+        back if there's an error, before the connection goes back.)
+
+        :param url: the database URL
+        :return: the connection
+        """
+        with self._lock:
+            idle = self._idle.setdefault(url, [])
+            cnx = idle.pop() if idle else None
+        if cnx is None:
+            cnx = connect(url=url)
+        try:
+            with cnx:
+                yield cnx
+        finally:
+            # A broken connection (or one that the pool has no room for)
+            # is closed rather than kept.
+            keep = not cnx.closed
+            if keep:
+                with self._lock:
+                    keep = (
+                        not self._stop.is_set()
+                        and len(idle) < self._pool_size
+                    )
+                    if keep:
+                        idle.append(cnx)
+            if not keep and not cnx.closed:
+                cnx.close()
+
+    def close(self):
+        """
+        Stop measuring the replicas' lag and close the connections used to
+        measure it and to run queries.
+        """
+        self._stop.set()
+        for thread in self._refreshers:
+            thread.join()
+        for cnx in self._probes.values():
+            cnx.close()
+        self._probes = {}
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for cnx in itertools.chain.from_iterable(idle.values()):
+            cnx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
+
+    def choose(self) -> Replica or None:
+        """
+        Choose the replica that should handle the next read.
+
+        :return: the replica, or `None` if no replica is healthy
+        """
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        if self._strategy == LEAST_OUTSTANDING:
+            return min(candidates, key=lambda r: r.outstanding)
+        return candidates[next(self._turn) % len(candidates)]
+
+    @contextmanager
+    def read_url(self, pinned: bool = False) -> Iterator[str]:
+        """
+        Get the database URL that should handle a read for as long as the
+        read is in flight.
+
+        :param pinned: Is the session pinned to the primary?
+        :return: the database URL
+        """
+        replica = None if pinned else self.choose()
+        if replica is None:
+            yield self._primary
+            return
+        with self._lock:
+            replica.outstanding += 1
+        try:
+            yield replica.url
+        finally:
+            with self._lock:
+                replica.outstanding -= 1
+
+    def session(self) -> RouterSession:
+        """
+        Start a new session.
+
+        :return: the session
+        """
+        return RouterSession(self)
+
+    @property
+    def current(self) -> RouterSession:
+        """
+        Get the current thread's session.
+        """
+        try:
+            return self._local.session
+        except AttributeError:
+            self._local.session = self.session()
+            return self._local.session
+
+    def execute_scalar(
+            self,
+            query: Union[str, psycopg2.sql.Composed],
+            caller: str = None,
+            timeout: float = None,
+            write: bool = False
+    ) -> Any or None:
+        """
+        Execute a query that returns a single, scalar result in the current
+        thread's session.
+
+        .. seealso::
+
+            :py:meth:`RouterSession.execute_scalar`
+        """
+        return self.current.execute_scalar(
+            query=query,
+            caller=caller if caller else inspect.stack()[1][3],
+            timeout=timeout,
+            write=write
+        )
+
+    def execute_rows(
+            self,
+            query: Union[str, psycopg2.sql.Composed],
+            caller: str = None,
+            timeout: float = None,
+            write: bool = False
+    ) -> Iterable[psycopg2.extras.DictRow]:
+        """
+        Execute a query that returns an iteration of rows in the current
+        thread's session.
+
+        .. seealso::
+
+            :py:meth:`RouterSession.execute_rows`
+        """
+        return self.current.execute_rows(
+            query=query,
+            caller=caller if caller else inspect.stack()[1][3],
+            timeout=timeout,
+            write=write
+        )
+
+    def execute(
+            self,
+            query: Union[str, psycopg2.sql.Composed],
+            caller: str = None,
+            timeout: float = None
+    ):
+        """
+        Execute a query that returns no result on the primary in the current
+        thread's session.
+
+        .. seealso::
+
+            :py:meth:`RouterSession.execute`
+        """
+        self.current.execute(
+            query=query,
+            caller=caller if caller else inspect.stack()[1][3],
+            timeout=timeout
+        )
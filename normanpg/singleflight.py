@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.singleflight
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains a single-flight layer for read queries.  When several
+callers (threads or `asyncio` tasks) issue the same query against the same
+database at the same time, only the first one executes it and the others
+wait for (and share) its result.
+
+.. code-block:: python
+
+    from normanpg.singleflight import coalesce_scalar, single_flight
+
+    # Called from many threads at once, but the database only sees it once.
+    count = coalesce_scalar(url, 'SELECT count(*) FROM parcels')
+
+    # Any function can be coalesced with a key of your choosing.
+    srid_ = single_flight().do(
+        ('srid', url, 'public', 'parcels'),
+        lambda: srid(url, 'parcels', 'public')
+    )
+
+.. note::
+
+    Only coalesce reads.  Callers that pass different connections to the
+    same database share whichever connection executes the query, so
+    coalescing isn't appropriate inside transactions that have written
+    something the others shouldn't see.
+"""
+import asyncio
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple, Union
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.sql
+from .pg import execute_rows, execute_scalar
+
+
+class _Call:
+    """
+    A call in flight.
+    """
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()  #: set when the call finishes
+        self.result: Any = None  #: the result
+        self.error: BaseException or None = None  #: the error (if any)
+        #: the `asyncio` futures waiting for the result (with their loops)
+        self.waiters: List[
+            Tuple[asyncio.AbstractEventLoop, asyncio.Future]
+        ] = []
+
+
+def _settle(future: asyncio.Future, call: _Call):
+    """
+    Give a finished call's outcome to an `asyncio` waiter.
+    """
+    if future.cancelled():
+        return
+    if call.error is not None:
+        future.set_exception(call.error)
+    else:
+        future.set_result(call.result)
+
+
+class SingleFlight:
+    """
+    A single-flight group lets one execution of a function serve every
+    concurrent caller with the same key.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executions: int = 0
+        self._coalesced: int = 0
+
+    @property
+    def executions(self) -> int:
+        """
+        Get the number of times a function was actually called.
+        """
+        return self._executions
+
+    @property
+    def coalesced(self) -> int:
+        """
+        Get the number of calls that were served by another caller's
+        execution.
+        """
+        return self._coalesced
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Get the number of calls in flight.
+        """
+        with self._lock:
+            return len(self._calls)
+
+    def _join(
+            self,
+            key: Hashable,
+            loop: asyncio.AbstractEventLoop = None
+    ) -> Tuple[_Call, asyncio.Future or None, bool]:
+        """
+        Join the call in flight for a key (or start one).
+
+        :param key: identifies the call
+        :param loop: the caller's event loop (if it's an `asyncio` task)
+        :return: the call, the future an `asyncio` waiter should await, and
+            whether this caller should execute the call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                future = None
+                if loop is not None:
+                    future = loop.create_future()
+                    call.waiters.append((loop, future))
+                return call, future, False
+            call = _Call()
+            self._calls[key] = call
+            self._executions += 1
+            return call, None, True
+
+    def _run(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        """
+        Execute a call and hand its outcome to everyone waiting for it.
+        """
+        try:
+            call.result = fn()
+        except BaseException as ex:  # pylint: disable=broad-except
+            call.error = ex
+        finally:
+            # Once the key is gone, nobody else can join the call, so the
+            # list of waiters is complete.
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            for loop, future in call.waiters:
+                try:
+                    loop.call_soon_threadsafe(_settle, future, call)
+                except RuntimeError:
+                    # The waiter's loop has been closed.
+                    pass
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Call a function, unless a call with the same key is already in flight
+        (in which case, wait for it and share its result).
+
+        :param key: identifies the call
+        :param fn: the function
+        :return: the function's result
+        :raises: the exception raised by the function (Every waiter sees the
+            same exception.)
+        """
+        call, _, leader = self._join(key)
+        if leader:
+            return self._run(key, call, fn)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Call a (blocking) function in the event loop's default executor,
+        unless a call with the same key is already in flight (in which case,
+        wait for it and share its result).  Threads and `asyncio` tasks
+        coalesce with each other.
+
+        :param key: identifies the call
+        :param fn: the function
+        :return: the function's result
+        :raises: the exception raised by the function
+        """
+        loop = asyncio.get_running_loop()
+        call, future, leader = self._join(key, loop)
+        if leader:
+            return await loop.run_in_executor(None, self._run, key, call, fn)
+        return await future
+
+
+_DEFAULT = SingleFlight()  #: the default single-flight group
+
+
+def single_flight() -> SingleFlight:
+    """
+    Get the default single-flight group (which is used by the `coalesce_`
+    functions).
+
+    :return: the group
+    """
+    return _DEFAULT
+
+
+def query_key(
+        cnx: Union[str, psycopg2.extensions.connection],
+        query: Union[str, psycopg2.sql.Composed],
+        kind: str
+) -> Tuple[str, str, str]:
+    """
+    Get the single-flight key of a query: the kind of result, the connection
+    target, and the query.
+
+    :param cnx: an open connection or database connection string
+    :param query: the query
+    :param kind: the kind of result (``scalar`` or ``rows``)
+    :return: the key
+    """
+    # (A connection's DSN doesn't include its password.)
+    target = cnx if isinstance(cnx, str) else cnx.dsn
+    # A composed query is rendered from its parts, so its representation
+    # identifies it without a connection to render it.
+    return kind, target, query if isinstance(query, str) else repr(query)
+
+
+def coalesce_scalar(
+        cnx: Union[str, psycopg2.extensions.connection],
+        query: Union[str, psycopg2.sql.Composed],
+        caller: str = None,
+        timeout: float = None
+) -> Any or None:
+    """
+    Execute a query that returns a single, scalar result, sharing the
+    execution with any concurrent callers issuing the same query against the
+    same database.
+
+    :param cnx: an open psycopg2 connection or the database URL
+    :param query: the `psycopg2` composed query
+    :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the query is cancelled
+    :return: the scalar result
+
+    .. seealso::
+
+        :py:func:`normanpg.pg.execute_scalar`
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    return _DEFAULT.do(
+        query_key(cnx, query, 'scalar'),
+        lambda: execute_scalar(
+            cnx=cnx, query=query, caller=caller, timeout=timeout
+        )
+    )
+
+
+def _fetch_rows(
+        cnx: Union[str, psycopg2.extensions.connection],
+        query: Union[str, psycopg2.sql.Composed],
+        caller: str,
+        timeout: float
+) -> List[psycopg2.extras.DictRow]:
+    """
+    Fetch all the rows a query returns.
+    """
+    return list(
+        execute_rows(cnx=cnx, query=query, caller=caller, timeout=timeout)
+    )
+
+
+def coalesce_rows(
+        cnx: Union[str, psycopg2.extensions.connection],
+        query: Union[str, psycopg2.sql.Composed],
+        caller: str = None,
+        timeout: float = None
+) -> List[psycopg2.extras.DictRow]:
+    """
+    Execute a query that returns rows, sharing the execution with any
+    concurrent callers issuing the same query against the same database.
+
+    :param cnx: an open connection or database connection string
+    :param query: the `psycopg2` composed query
+    :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the query is cancelled
+    :return: the rows (Each caller gets its own list, but the rows are
+        shared, so don't modify them.)
+
+    .. seealso::
+
+        :py:func:`normanpg.pg.execute_rows`
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    return list(
+        _DEFAULT.do(
+            query_key(cnx, query, 'rows'),
+            lambda: _fetch_rows(cnx, query, caller, timeout)
+        )
+    )
+
+
+async def coalesce_scalar_async(
+        cnx: Union[str, psycopg2.extensions.connection],
+        query: Union[str, psycopg2.sql.Composed],
+        caller: str = None,
+        timeout: float = None
+) -> Any or None:
+    """
+    This is the `asyncio` version of :py:func:`coalesce_scalar`.  (The query
+    is executed in the event loop's default executor.)
+
+    :param cnx: an open psycopg2 connection or the database URL
+    :param query: the `psycopg2` composed query
+    :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the query is cancelled
+    :return: the scalar result
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    return await _DEFAULT.do_async(
+        query_key(cnx, query, 'scalar'),
+        lambda: execute_scalar(
+            cnx=cnx, query=query, caller=caller, timeout=timeout
+        )
+    )
+
+
+async def coalesce_rows_async(
+        cnx: Union[str, psycopg2.extensions.connection],
+        query: Union[str, psycopg2.sql.Composed],
+        caller: str = None,
+        timeout: float = None
+) -> List[psycopg2.extras.DictRow]:
+    """
+    This is the `asyncio` version of :py:func:`coalesce_rows`.  (The query
+    is executed in the event loop's default executor.)
+
+    :param cnx: an open connection or database connection string
+    :param query: the `psycopg2` composed query
+    :param caller: identifies the caller (for diagnostics)
+    :param timeout: the number of seconds after which the query is cancelled
+    :return: the rows
+    """
+    caller = caller if caller else inspect.stack()[1][3]
+    return list(
+        await _DEFAULT.do_async(
+            query_key(cnx, query, 'rows'),
+            lambda: _fetch_rows(cnx, query, caller, timeout)
+        )
+    )
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.slowlog
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains an opt-in slow query recorder.  When it is enabled,
+queries issued through the execute family that take longer than a threshold
+are appended to a rotating JSONL file along with their query plans.
+
+.. code-block:: python
+
+    from normanpg.slowlog import enable_slow_query_log
+
+    enable_slow_query_log('/var/log/myapp/slow.jsonl', threshold=0.5)
+
+.. note::
+
+    When the recorder isn't enabled it isn't registered as an execute hook, so
+    it costs nothing.
+"""
+from datetime import datetime, timezone
+import json
+import logging
+import logging.handlers
+import random
+import re
+from typing import Any, Dict
+import psycopg2
+import psycopg2.extensions
+from .pg import add_hook, remove_hook, ExecuteEvent, ExecuteHook
+
+__logger__ = logging.getLogger(__name__)  #: the module logger
+
+_READ_ONLY = re.compile(
+    r'^\s*(?:SELECT|WITH|VALUES|TABLE)\b', re.IGNORECASE
+)  #: matches statements that may be read-only
+_WRITES = re.compile(
+    r'\b(?:INSERT|UPDATE|DELETE|MERGE|CREATE|DROP|ALTER|TRUNCATE|COPY|'
+    r'GRANT|REVOKE|LOCK|CALL|NEXTVAL|SETVAL)\b',
+    re.IGNORECASE
+)  #: matches keywords that indicate a statement may write
+
+_SAVEPOINT = 'normanpg_explain'  #: the savepoint that protects the plan query
+
+
+def is_read_only(sql: str) -> bool:
+    """
+    Does a statement appear to be read-only (and therefore safe to run again
+    with `EXPLAIN ANALYZE`)?
+
+    :param sql: the rendered SQL
+    :return: `True` if the statement appears to be read-only
+    """
+    return bool(_READ_ONLY.match(sql)) and not _WRITES.search(sql)
+
+
+def explain(
+        cnx: psycopg2.extensions.connection,
+        sql: str,
+        timeout: float = None
+) -> Any:
+    """
+    Run a query again with `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` to get
+    its plan.
+
+    :param cnx: an open connection
+    :param sql: the rendered SQL
+    :param timeout: the number of seconds after which the plan query is
+        cancelled
+    :return: the plan
+
+    .. note::
+
+        The plan query always runs in a read-only transaction that is rolled
+        back afterward, so a statement that only looked read-only can't
+        change anything.  If the connection is in `autocommit` mode, it's a
+        transaction of its own.  Otherwise it's a savepoint (which is
+        released afterward), so a failure doesn't abort the caller's
+        transaction.
+    """
+    savepoint = not cnx.autocommit
+    with cnx.cursor() as crs:
+        if savepoint:
+            crs.execute(f'SAVEPOINT {_SAVEPOINT}')
+            # (`SET TRANSACTION` isn't allowed in a savepoint, but a
+            # transaction can always be made read-only.)
+            crs.execute('SET LOCAL transaction_read_only = on')
+        else:
+            crs.execute('BEGIN')
+            crs.execute('SET TRANSACTION READ ONLY')
+        try:
+            if timeout is not None:
+                crs.execute(
+                    "SELECT set_config('statement_timeout', %s, true)",
+                    (str(max(int(timeout * 1000), 1)),)
+                )
+            crs.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}')
+            return crs.fetchone()[0]
+        finally:
+            if savepoint:
+                crs.execute(f'ROLLBACK TO SAVEPOINT {_SAVEPOINT}')
+                crs.execute(f'RELEASE SAVEPOINT {_SAVEPOINT}')
+            else:
+                crs.execute('ROLLBACK')
+
+
+class SlowQueryRecorder(ExecuteHook):
+    """
+    This execute hook records queries that take longer than a threshold.
+    """
+    def __init__(
+            self,
+            path: str,
+            threshold: float = 1.0,
+            sample_rate: float = 1.0,
+            max_bytes: int = 10 * 1024 * 1024,
+            backup_count: int = 5,
+            plan_timeout: float = None
+    ):
+        """
+
+        :param path: the path to the JSONL file
+        :param threshold: the number of seconds after which a query is
+            considered slow
+        :param sample_rate: the fraction (between 0 and 1) of slow, read-only
+            queries that are run again to capture their plans
+        :param max_bytes: the size at which the file is rotated
+        :param backup_count: the number of rotated files to keep
+        :param plan_timeout: the number of seconds after which a plan query
+            is cancelled (The default is twice the time the query took.)
+        """
+        self._threshold = threshold
+        self._sample_rate = sample_rate
+        self._plan_timeout = plan_timeout
+        # We use a private logger (outside the logging hierarchy) to take
+        # advantage of the thread-safe rotating file handler.
+        self._handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8'
+        )
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        self._log = logging.Logger(f'{__name__}.{id(self)}')
+        self._log.propagate = False
+        self._log.addHandler(self._handler)
+
+    @property
+    def threshold(self) -> float:
+        """
+        Get the number of seconds after which a query is considered slow.
+        """
+        return self._threshold
+
+    @property
+    def sample_rate(self) -> float:
+        """
+        Get the fraction of slow, read-only queries whose plans are captured.
+        """
+        return self._sample_rate
+
+    def after_execute(self, event: ExecuteEvent):
+        """
+        Record the query if it was slow.
+
+        :param event: the execute event
+        """
+        if (
+                event.error is not None
+                or event.elapsed is None
+                or event.elapsed < self._threshold
+        ):
+            return
+        record: Dict[str, Any] = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'caller': event.caller,
+            'sql': event.sql,
+            'elapsed': event.elapsed,
+            'rows': event.rows,
+            'plan': None
+        }
+        if (
+                event.cursor is not None
+                and random.random() < self._sample_rate
+                and is_read_only(event.sql)
+        ):
+            try:
+                record['plan'] = explain(
+                    cnx=event.cursor.connection,
+                    sql=event.sql,
+                    timeout=(
+                        self._plan_timeout if self._plan_timeout is not None
+                        else 2 * event.elapsed
+                    )
+                )
+            except psycopg2.Error:
+                __logger__.warning(
+                    f'[{event.caller}] The slow query plan could not be '
+                    f'captured.',
+                    exc_info=True
+                )
+        self._log.info(json.dumps(record, default=str))
+
+    def close(self):
+        """
+        Close the JSONL file.
+        """
+        self._handler.close()
+
+
+_RECORDER: SlowQueryRecorder or None = None  #: the enabled recorder
+
+
+def enable_slow_query_log(
+        path: str,
+        threshold: float = 1.0,
+        sample_rate: float = 1.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        plan_timeout: float = None
+) -> SlowQueryRecorder:
+    """
+    Start recording slow queries.  (If a recorder is already enabled, it is
+    replaced.)
+
+    :param path: the path to the JSONL file
+    :param threshold: the number of seconds after which a query is considered
+        slow
+    :param sample_rate: the fraction (between 0 and 1) of slow, read-only
+        queries that are run again to capture their plans
+    :param max_bytes: the size at which the file is rotated
+    :param backup_count: the number of rotated files to keep
+    :param plan_timeout: the number of seconds after which a plan query is
+        cancelled (The default is twice the time the query took.)
+    :return: the recorder
+    """
+    global _RECORDER  # pylint: disable=global-statement
+    disable_slow_query_log()
+    _RECORDER = add_hook(
+        SlowQueryRecorder(
+            path=path,
+            threshold=threshold,
+            sample_rate=sample_rate,
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            plan_timeout=plan_timeout
+        )
+    )
+    return _RECORDER
+
+
+def disable_slow_query_log():
+    """
+    Stop recording slow queries.
+    """
+    global _RECORDER  # pylint: disable=global-statement
+    if _RECORDER is not None:
+        remove_hook(_RECORDER)
+        _RECORDER.close()
+        _RECORDER = None
@@ -0,0 +1,594 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Created on 10/19/26 by pat
+"""
+.. currentmodule:: normanpg.tiles
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This module contains functions for generating
+`Mapbox Vector Tiles <https://github.com/mapbox/vector-tile-spec>`_ from
+PostGIS tables (with a single `ST_AsMVT` query per tile) and for caching
+them.
+
+.. code-block:: python
+
+    from normanpg.tiles import (
+        DiskTileCache, LayeredTileCache, MemoryTileCache, TileSource
+    )
+
+    source = TileSource(
+        url='postgresql://localhost/gis',
+        table_name='parcels',
+        schema_name='public',
+        columns=['id', 'owner'],
+        cache=LayeredTileCache(
+            MemoryTileCache(max_tiles=10000),
+            DiskTileCache('/var/cache/tiles')
+        )
+    )
+    mvt = source.tile(z=14, x=3950, y=5871)
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import math
+import os
+from pathlib import Path
+import threading
+from typing import Iterable, Optional, Sequence, Tuple, Union
+import psycopg2.extensions
+from psycopg2.sql import Identifier, Literal, SQL
+from .pg import connect, execute_scalar
+
+WEB_MERCATOR_SRID: int = 3857  #: the SRID of the tile grid
+ORIGIN_SHIFT: float = 20037508.342789244  #: half the width of the tile grid
+MAX_LATITUDE: float = 85.0511287798066  #: the latitude limit of the grid
+DEFAULT_EXTENT: int = 4096  #: the default tile extent (in tile units)
+DEFAULT_BUFFER: int = 64  #: the default tile buffer (in tile units)
+
+#: a bounding box: (min x, min y, max x, max y)
+BBox = Tuple[float, float, float, float]
+
+#: a tile cache key: (layer, z, x, y)
+TileKey = Tuple[str, int, int, int]
+
+
+def tile_bounds(z: int, x: int, y: int) -> BBox:
+    """
+    Get the bounds of a tile in Web Mercator (EPSG:3857).
+
+    :param z: the zoom level
+    :param x: the tile column
+    :param y: the tile row
+    :return: the bounds
+    """
+    size = 2 * ORIGIN_SHIFT / (1 << z)
+    minx = -ORIGIN_SHIFT + x * size
+    maxy = ORIGIN_SHIFT - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def lonlat_to_mercator(lon: float, lat: float) -> Tuple[float, float]:
+    """
+    Convert a longitude and latitude to Web Mercator (EPSG:3857).
+
+    :param lon: the longitude
+    :param lat: the latitude
+    :return: the Web Mercator coordinates
+    """
+    _lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    return (
+        lon * ORIGIN_SHIFT / 180.0,
+        math.log(math.tan((90.0 + _lat) * math.pi / 360.0))
+        * ORIGIN_SHIFT / math.pi
+    )
+
+
+def lonlat_bbox_to_mercator(bbox: BBox) -> BBox:
+    """
+    Convert a longitude/latitude bounding box to Web Mercator.
+
+    :param bbox: the longitude/latitude bounding box
+    :return: the Web Mercator bounding box
+    """
+    minx, miny = lonlat_to_mercator(bbox[0], bbox[1])
+    maxx, maxy = lonlat_to_mercator(bbox[2], bbox[3])
+    return minx, miny, maxx, maxy
+
+
+def tiles_for_bbox(
+        bbox: BBox,
+        z: int
+) -> Iterable[Tuple[int, int, int]]:
+    """
+    Get the tiles at a zoom level that cover a bounding box.
+
+    :param bbox: the Web Mercator bounding box
+    :param z: the zoom level
+    :return: an iteration of (z, x, y) tuples
+    """
+    count = 1 << z
+    size = 2 * ORIGIN_SHIFT / count
+
+    def _clamp(value: float) -> int:
+        return min(max(int(math.floor(value)), 0), count - 1)
+
+    x0 = _clamp((bbox[0] + ORIGIN_SHIFT) / size)
+    x1 = _clamp((bbox[2] + ORIGIN_SHIFT) / size)
+    y0 = _clamp((ORIGIN_SHIFT - bbox[3]) / size)
+    y1 = _clamp((ORIGIN_SHIFT - bbox[1]) / size)
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            yield z, x, y
+
+
+def _intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class TileCache(ABC):
+    """
+    Extend this class to create a tile cache.
+    """
+    @abstractmethod
+    def get(self, key: TileKey) -> Optional[bytes]:
+        """
+        Get a tile from the cache.
+
+        :param key: the tile key
+        :return: the tile, or `None` if it isn't cached
+        """
+
+    @abstractmethod
+    def put(self, key: TileKey, tile: bytes):
+        """
+        Put a tile into the cache.
+
+        :param key: the tile key
+        :param tile: the tile
+        """
+
+    @abstractmethod
+    def invalidate(self, layer: str, bbox: BBox = None) -> int:
+        """
+        Remove the cached tiles for a layer that intersect a bounding box.
+
+        :param layer: the layer
+        :param bbox: the Web Mercator bounding box (If it isn't supplied, all
+            the layer's tiles are removed.)
+        :return: the number of tiles removed
+        """
+
+
+class MemoryTileCache(TileCache):
+    """
+    A least-recently-used (LRU) in-memory tile cache.
+    """
+    def __init__(self, max_tiles: int = 10000):
+        """
+
+        :param max_tiles: the maximum number of tiles to keep
+        """
+        self._max_tiles = max_tiles
+        self._tiles: 'OrderedDict[TileKey, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        with self._lock:
+            try:
+                self._tiles.move_to_end(key)
+            except KeyError:
+                return None
+            return self._tiles[key]
+
+    def put(self, key: TileKey, tile: bytes):
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self._max_tiles:
+                self._tiles.popitem(last=False)
+
+    def invalidate(self, layer: str, bbox: BBox = None) -> int:
+        with self._lock:
+            doomed = [
+                k for k in self._tiles
+                if k[0] == layer
+                and (bbox is None or _intersects(tile_bounds(*k[1:]), bbox))
+            ]
+            for key in doomed:
+                del self._tiles[key]
+        return len(doomed)
+
+
+class DiskTileCache(TileCache):
+    """
+    A tile cache that keeps tiles in a `{layer}/{z}/{x}/{y}.mvt` directory
+    layout (which a web server can serve directly).
+    """
+    def __init__(self, root: Union[str, Path]):
+        """
+
+        :param root: the root directory
+        """
+        self._root = Path(root)
+
+    @property
+    def root(self) -> Path:
+        """
+        Get the root directory.
+        """
+        return self._root
+
+    def path(self, key: TileKey) -> Path:
+        """
+        Get the path to a tile.
+
+        :param key: the tile key
+        :return: the path
+        """
+        layer, z, x, y = key
+        return self._root / layer / str(z) / str(x) / f'{y}.mvt'
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        try:
+            return self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: TileKey, tile: bytes):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and move it into place so readers never
+        # see a partial tile.
+        tmp = path.with_name(
+            f'.{path.name}.{os.getpid()}.{threading.get_ident()}'
+        )
+        tmp.write_bytes(tile)
+        os.replace(str(tmp), str(path))
+
+    def invalidate(self, layer: str, bbox: BBox = None) -> int:
+        removed = 0
+        layer_dir = self._root / layer
+        if not layer_dir.is_dir():
+            return 0
+        # We walk the tiles that are actually cached rather than the tiles
+        # that cover the box (which, at high zoom levels, could be a great
+        # many more).
+        for zdir in layer_dir.iterdir():
+            if not zdir.name.isdigit():
+                continue
+            for xdir in zdir.iterdir():
+                if not xdir.name.isdigit():
+                    continue
+                for tile in xdir.glob('*.mvt'):
+                    if not tile.stem.isdigit():
+                        continue
+                    if bbox is not None and not _intersects(
+                            tile_bounds(
+                                int(zdir.name), int(xdir.name), int(tile.stem)
+                            ),
+                            bbox
+                    ):
+                        continue
+                    try:
+                        tile.unlink()
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+
+class LayeredTileCache(TileCache):
+    """
+    A tile cache that consults other caches in order (for example, a memory
+    cache in front of a disk cache).  Tiles found in a later cache are copied
+    into the earlier ones.
+    """
+    def __init__(self, *caches: TileCache):
+        """
+
+        :param caches: the caches (fastest first)
+        """
+        self._caches: Tuple[TileCache, ...] = caches
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        for i, cache in enumerate(self._caches):
+            tile = cache.get(key)
+            if tile is not None:
+                for earlier in self._caches[:i]:
+                    earlier.put(key, tile)
+                return tile
+        return None
+
+    def put(self, key: TileKey, tile: bytes):
+        for cache in self._caches:
+            cache.put(key, tile)
+
+    def invalidate(self, layer: str, bbox: BBox = None) -> int:
+        return max(
+            [cache.invalidate(layer, bbox) for cache in self._caches] or [0]
+        )
+
+
+class TileSource:
+    """
+    A tile source produces vector tiles for a single PostGIS table.
+    """
+    def __init__(
+            self,
+            url: str,
+            table_name: str,
+            schema_name: str,
+            columns: Sequence[str] = (),
+            layer: str = None,
+            extent: int = DEFAULT_EXTENT,
+            buffer: int = DEFAULT_BUFFER,
+            cache: TileCache = None
+    ):
+        """
+
+        :param url: the database URL
+        :param table_name: the name of the table
+        :param schema_name: the name of the schema in which the table resides
+        :param columns: the attribute columns to include in the tiles
+        :param layer: the layer name (The default is the table name.)
+        :param extent: the tile extent (in tile units)
+        :param buffer: the tile buffer (in tile units)
+        :param cache: the tile cache
+        """
+        self._url = url
+        self._table_name = table_name
+        self._schema_name = schema_name
+        self._columns = list(columns)
+        self._layer = layer if layer else table_name
+        self._extent = extent
+        self._buffer = buffer
+        self._cache = cache
+        self._layout: Tuple[str, int] or None = None
+        self._lock = threading.Lock()
+
+    @property
+    def layer(self) -> str:
+        """
+        Get the layer name.
+        """
+        return self._layer
+
+    @property
+    def cache(self) -> TileCache or None:
+        """
+        Get the tile cache.
+        """
+        return self._cache
+
+    def _discover(
+            self,
+            cnx: psycopg2.extensions.connection
+    ) -> Tuple[str, int]:
+        """
+        Discover (once) the table's geometry column and SRID.
+
+        :param cnx: an open connection
+        :return: the geometry column and SRID
+        """
+        if self._layout is None:
+            # pylint: disable=import-outside-toplevel
+            from .functions.tables import (
+                geometry_column, srid, NoGeometryColumn
+            )
+            with self._lock:
+                geomcol = geometry_column(
+                    cnx=cnx,
+                    table_name=self._table_name,
+                    schema_name=self._schema_name
+                )
+                if not geomcol:
+                    raise NoGeometryColumn(
+                        'No geometry column is associated with the specified '
+                        'table and schema names.'
+                    )
+                self._layout = (
+                    geomcol,
+                    srid(
+                        cnx=cnx,
+                        table_name=self._table_name,
+                        schema_name=self._schema_name
+                    )
+                )
+        return self._layout
+
+    def query(
+            self,
+            cnx: psycopg2.extensions.connection,
+            z: int,
+            x: int,
+            y: int
+    ):
+        """
+        Compose the query that produces a tile.
+
+        :param cnx: an open connection
+        :param z: the zoom level
+        :param x: the tile column
+        :param y: the tile row
+        :return: the composed query
+        """
+        geomcol, table_srid = self._discover(cnx)
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        envelope = SQL('ST_MakeEnvelope({}, {}, {}, {}, {})').format(
+            Literal(minx), Literal(miny), Literal(maxx), Literal(maxy),
+            Literal(WEB_MERCATOR_SRID)
+        )
+        # The filter box includes the buffer so features that spill over the
+        # edge of the tile are included.
+        margin = (maxx - minx) * self._buffer / self._extent
+        fbox = SQL('ST_MakeEnvelope({}, {}, {}, {}, {})').format(
+            Literal(minx - margin), Literal(miny - margin),
+            Literal(maxx + margin), Literal(maxy + margin),
+            Literal(WEB_MERCATOR_SRID)
+        )
+        geom = Identifier(geomcol)
+        # Transform the filter box (rather than the table's geometries) so
+        # that the spatial index can help.
+        if table_srid != WEB_MERCATOR_SRID:
+            fbox = SQL('ST_Transform({}, {})').format(
+                fbox, Literal(table_srid)
+            )
+            geom = SQL('ST_Transform({}, {})').format(
+                geom, Literal(WEB_MERCATOR_SRID)
+            )
+        return SQL(
+            'SELECT ST_AsMVT(mvt, {layer}, {extent}, {geomalias}) FROM ('
+            'SELECT {columns}ST_AsMVTGeom('
+            '{geom}, {envelope}, {extent}, {buffer}, true) AS {geomalias} '
+            'FROM {table} WHERE {geomcol} && {fbox}'
+            ') AS mvt'
+        ).format(
+            layer=Literal(self._layer),
+            extent=Literal(self._extent),
+            buffer=Literal(self._buffer),
+            geomalias=Identifier('mvt_geom'),
+            columns=SQL('').join(
+                SQL('{}, ').format(Identifier(c)) for c in self._columns
+            ),
+            geom=geom,
+            envelope=envelope,
+            table=SQL('{}.{}').format(
+                Identifier(self._schema_name), Identifier(self._table_name)
+            ),
+            geomcol=Identifier(geomcol),
+            fbox=fbox
+        )
+
+    def render(
+            self,
+            cnx: psycopg2.extensions.connection,
+            z: int,
+            x: int,
+            y: int
+    ) -> bytes:
+        """
+        Render a tile (bypassing the cache).
+
+        :param cnx: an open connection
+        :param z: the zoom level
+        :param x: the tile column
+        :param y: the tile row
+        :return: the tile
+        """
+        tile = execute_scalar(
+            cnx=cnx,
+            query=self.query(cnx, z, x, y),
+            caller=f'tile:{self._layer}'
+        )
+        return bytes(tile) if tile is not None else b''
+
+    def tile(
+            self,
+            z: int,
+            x: int,
+            y: int,
+            cnx: psycopg2.extensions.connection = None
+    ) -> bytes:
+        """
+        Get a tile (from the cache, if possible).
+
+        :param z: the zoom level
+        :param x: the tile column
+        :param y: the tile row
+        :param cnx: an open connection (If you don't supply one, a connection
+            is opened if the tile needs to be rendered.)
+        :return: the tile
+        """
+        key = (self._layer, z, x, y)
+        if self._cache is not None:
+            tile = self._cache.get(key)
+            if tile is not None:
+                return tile
+        if cnx is None:
+            _cnx = connect(self._url)
+            try:
+                tile = self.render(_cnx, z, x, y)
+            finally:
+                _cnx.close()
+        else:
+            tile = self.render(cnx, z, x, y)
+        if self._cache is not None:
+            self._cache.put(key, tile)
+        return tile
+
+    def invalidate(self, bbox: BBox = None) -> int:
+        """
+        Remove the cached tiles that intersect a bounding box.
+
+        :param bbox: the Web Mercator bounding box (If it isn't supplied, all
+            the layer's tiles are removed.)
+        :return: the number of tiles removed
+        """
+        if self._cache is None:
+            return 0
+        return self._cache.invalidate(self._layer, bbox)
+
+    def seed(
+            self,
+            min_zoom: int,
+            max_zoom: int,
+            bbox: BBox = None,
+            workers: int = 4
+    ) -> int:
+        """
+        Render (and cache) all the tiles in a range of zoom levels.
+
+        :param min_zoom: the minimum zoom level
+        :param max_zoom: the maximum zoom level
+        :param bbox: limit the tiles to those that intersect this Web
+            Mercator bounding box (The default is the whole grid.)
+        :param workers: the number of concurrent workers (each of which has
+            its own connection)
+        :return: the number of tiles rendered
+        """
+        _bbox = bbox if bbox else (
+            -ORIGIN_SHIFT, -ORIGIN_SHIFT, ORIGIN_SHIFT, ORIGIN_SHIFT
+        )
+        local = threading.local()
+        connections = []
+        connections_lock = threading.Lock()
+
+        def _render(zxy: Tuple[int, int, int]) -> None:
+            cnx = getattr(local, 'cnx', None)
+            if cnx is None:
+                cnx = local.cnx = connect(self._url, autocommit=True)
+                with connections_lock:
+                    connections.append(cnx)
+            z, x, y = zxy
+            tile = self.render(cnx, z, x, y)
+            if self._cache is not None:
+                self._cache.put((self._layer, z, x, y), tile)
+
+        count = 0
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = set()
+                for z in range(min_zoom, max_zoom + 1):
+                    for zxy in tiles_for_bbox(_bbox, z):
+                        # Don't queue up more work than we need to keep the
+                        # workers busy.  (There may be millions of tiles.)
+                        if len(pending) >= workers * 4:
+                            done, pending = wait(
+                                pending, return_when=FIRST_COMPLETED
+                            )
+                            for future in done:
+                                future.result()
+                                count += 1
+                        pending.add(executor.submit(_render, zxy))
+                for future in wait(pending).done:
+                    future.result()
+                    count += 1
+        finally:
+            for cnx in connections:
+                cnx.close()
+        return count
@@ -60,7 +60,7 @@ setup(
     [console_scripts]
     normanpg=normanpg.cli:cli
     """,
-    python_requires=">=0.0.1",
+    python_requires=">=3.7",
     license='MIT',
     author='Pat Daburu',
     author_email='pat@daburu.net',
@@ -90,7 +90,7 @@ setup(
 
       # Specify the Python versions you support here. In particular, ensure
       # that you indicate whether you support Python 2, Python 3 or both.
-      'Programming Language :: Python :: 3.6',
+      'Programming Language :: Python :: 3.7',
     ],
     include_package_data=True
 )
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: conftest
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+These fixtures prepare the benchmark database in the throwaway PostgreSQL
+cluster (see the ``pg_server`` fixture in ``tests/conftest.py``).  If the
+cluster can't be started, the benchmarks are skipped.
+"""
+import importlib.util
+import psycopg2
+import pytest
+from normanpg.pg import connect
+
+BENCH_DB = 'normanpg_bench'  #: the name of the benchmark database
+FEATURE_COUNT = 10000  #: the number of rows in the benchmark feature table
+
+# If we can't run the benchmarks, don't even collect them.
+if importlib.util.find_spec('pytest_benchmark') is None:
+    collect_ignore_glob = ['test_*.py']  # pylint: disable=invalid-name
+
+
+@pytest.fixture(scope='session')
+def pg_url(pg_server: str) -> str:
+    """
+    Create the benchmark database in the temporary cluster.
+
+    :return: the URL of the benchmark database
+    """
+    cnx = connect(url=pg_server, autocommit=True)
+    try:
+        with cnx.cursor() as crs:
+            crs.execute(f'CREATE DATABASE {BENCH_DB}')
+    finally:
+        cnx.close()
+    return pg_server.rsplit('/', 1)[0] + f'/{BENCH_DB}'
+
+
+@pytest.fixture(scope='session')
+def cnx(pg_url: str):
+    """
+    Get a shared connection to the benchmark database.
+    """
+    _cnx = connect(url=pg_url, autocommit=True)
+    yield _cnx
+    _cnx.close()
+
+
+@pytest.fixture(scope='session')
+def feature_table(cnx) -> str:
+    """
+    Create a PostGIS feature table with some points in it.
+
+    :return: the name of the table (in the ``public`` schema)
+    """
+    try:
+        with cnx.cursor() as crs:
+            crs.execute('CREATE EXTENSION IF NOT EXISTS postgis')
+    except psycopg2.Error:
+        pytest.skip('PostGIS is not available.')
+    with cnx.cursor() as crs:
+        crs.execute(
+            'CREATE TABLE bench_points '
+            '(id serial PRIMARY KEY, name text, geom geometry(Point, 4326))'
+        )
+        crs.execute(
+            f'INSERT INTO bench_points (name, geom) '
+            f'SELECT md5(g::text), '
+            f'ST_SetSRID(ST_MakePoint(g % 360 - 180, g % 180 - 90), 4326) '
+            f'FROM generate_series(1, {FEATURE_COUNT}) AS g'
+        )
+        crs.execute('CREATE INDEX ON bench_points USING GIST (geom)')
+        crs.execute('ANALYZE bench_points')
+    return 'bench_points'
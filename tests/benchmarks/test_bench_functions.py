@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_bench_functions
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+These are the benchmarks for the helpers in :py:mod:`normanpg.functions`.
+"""
+from normanpg.functions import (
+    db_exists, dbs_exist, geometry_column, parse_dbname, schema_exists, srid,
+    table_exists, tables_exist
+)
+
+
+def test_db_exists(benchmark, pg_url: str):
+    """
+    Measure a single database existence check.
+    """
+    assert benchmark(db_exists, url=pg_url)
+
+
+def test_dbs_exist(benchmark, pg_url: str):
+    """
+    Measure a batch database existence check.
+    """
+    dbname = parse_dbname(pg_url)
+    names = [dbname] + [f'missing_{i}' for i in range(99)]
+    assert benchmark(dbs_exist, url=pg_url, dbnames=names)[dbname]
+
+
+def test_schema_exists(benchmark, pg_url: str):
+    """
+    Measure a single schema existence check.
+    """
+    assert benchmark(schema_exists, url=pg_url, schema='public')
+
+
+def test_table_exists(benchmark, cnx, feature_table: str):
+    """
+    Measure a single table existence check.
+    """
+    assert benchmark(
+        table_exists, cnx=cnx, table_name=feature_table, schema_name='public'
+    )
+
+
+def test_tables_exist(benchmark, cnx, feature_table: str):
+    """
+    Measure a batch table existence check.
+    """
+    names = [feature_table] + [f'missing_{i}' for i in range(99)]
+    assert benchmark(
+        tables_exist, cnx=cnx, table_names=names, schema_name='public'
+    )[feature_table]
+
+
+def test_geometry_column(benchmark, cnx, feature_table: str):
+    """
+    Measure looking up the geometry column of a feature table.
+    """
+    assert benchmark(
+        geometry_column,
+        cnx=cnx, table_name=feature_table, schema_name='public'
+    ) == 'geom'
+
+
+def test_srid(benchmark, cnx, feature_table: str):
+    """
+    Measure looking up the SRID of a feature table.
+    """
+    assert benchmark(
+        srid, cnx=cnx, table_name=feature_table, schema_name='public'
+    ) == 4326
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_bench_imports
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+These are the benchmarks for importing the package (which don't need the
+database).
+"""
+import subprocess
+import sys
+import pytest
+
+IMPORT_BUDGET = 0.25  #: the import-time budget (in seconds)
+
+
+def _import_time(module: str) -> float:
+    """
+    Time the import of a module in a fresh interpreter.
+
+    :param module: the name of the module
+    :return: the number of seconds the import took
+    """
+    return float(
+        subprocess.run(
+            [
+                sys.executable, '-c',
+                'import time\n'
+                'started = time.perf_counter()\n'
+                f'import {module}\n'
+                'print(time.perf_counter() - started)'
+            ],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True
+        ).stdout
+    )
+
+
+@pytest.mark.parametrize('module', ['normanpg', 'normanpg.cli'])
+def test_import(benchmark, module: str):
+    """
+    Measure starting an interpreter and importing a module, and hold the
+    import itself (the best of the rounds) to the budget.
+    """
+    timings = []
+    benchmark.pedantic(
+        lambda: timings.append(_import_time(module)), rounds=10
+    )
+    best = min(timings)
+    benchmark.extra_info['import_seconds'] = best
+    assert best < IMPORT_BUDGET, \
+        f'Importing {module} took {best:.3f}s (budget {IMPORT_BUDGET}s).'
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_bench_pg
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+These are the benchmarks for the core database functions.
+"""
+import pytest
+from normanpg.geometry import register_geometry, shape
+from normanpg.pg import connect, execute_rows, execute_scalar
+
+
+def test_connect(benchmark, pg_url: str):
+    """
+    Measure the cost of opening (and closing) a connection.
+    """
+    benchmark(lambda: connect(url=pg_url).close())
+
+
+def test_execute_scalar(benchmark, cnx):
+    """
+    Measure a scalar round trip.
+    """
+    assert benchmark(execute_scalar, cnx=cnx, query='SELECT 1') == 1
+
+
+@pytest.mark.parametrize('size', [1, 100, 10000])
+def test_execute_rows(benchmark, cnx, size: int):
+    """
+    Measure streaming a result set of a given size.
+    """
+    query = f'SELECT g AS id, md5(g::text) AS val ' \
+            f'FROM generate_series(1, {size}) AS g'
+    assert benchmark(
+        lambda: sum(1 for _ in execute_rows(cnx=cnx, query=query))
+    ) == size
+
+
+def test_geometry_shape(benchmark, cnx, feature_table: str):
+    """
+    Measure decoding the geometries in the feature table.
+    """
+    hexes = [
+        row[0] for row in execute_rows(
+            cnx=cnx, query=f'SELECT geom FROM {feature_table}'
+        )
+    ]
+    benchmark(lambda: [shape(h) for h in hexes])
+
+
+DECODE_ROWS = 100000  #: the number of rows in the decoding benchmarks
+
+
+@pytest.mark.parametrize('mode', ['shape', 'cast', 'lazy'])
+def test_geometry_decode(benchmark, pg_url: str, feature_table: str, mode):
+    """
+    Measure fetching and decoding geometries end to end: by calling
+    :py:func:`shape` on each hex value, with the type casters, and with the
+    lazy type casters (without touching the geometries).  Multiply the times
+    by ten for the cost per million rows.
+    """
+    assert feature_table  # PostGIS is installed.
+    cnx = connect(url=pg_url, autocommit=True)
+    try:
+        if mode != 'shape':
+            register_geometry(cnx, lazy=mode == 'lazy')
+        query = (
+            f'SELECT ST_MakePoint(g, g) '
+            f'FROM generate_series(1, {DECODE_ROWS}) AS g'
+        )
+
+        def _decode():
+            with cnx.cursor() as crs:
+                crs.execute(query)
+                if mode == 'shape':
+                    return [shape(row[0]) for row in crs]
+                return [row[0] for row in crs]
+
+        benchmark.extra_info['rows'] = DECODE_ROWS
+        assert len(benchmark(_decode)) == DECODE_ROWS
+    finally:
+        cnx.close()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: conftest
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+These fixtures start a throwaway PostgreSQL cluster (in a temporary directory)
+for the tests that need a real server.  If the PostgreSQL server binaries
+(``initdb`` and ``pg_ctl``) can't be found on the ``PATH`` or through
+``pg_config``, those tests are skipped.
+"""
+import os
+from pathlib import Path
+import shutil
+import socket
+import subprocess
+import tempfile
+from typing import Iterator
+import pytest
+
+
+def _pg_bin(name: str) -> str or None:
+    """
+    Find a PostgreSQL server binary.
+
+    :param name: the name of the binary
+    :return: the path to the binary (or `None` if it can't be found)
+    """
+    found = shutil.which(name)
+    if found:
+        return found
+    pg_config = shutil.which('pg_config')
+    if not pg_config:
+        return None
+    bindir = subprocess.run(
+        [pg_config, '--bindir'],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=False
+    ).stdout.strip()
+    candidate = Path(bindir) / name
+    return str(candidate) if candidate.exists() else None
+
+
+def _free_port() -> int:
+    """
+    Get a free TCP port on the loopback interface.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+INITDB = _pg_bin('initdb')  #: the path to `initdb`
+PG_CTL = _pg_bin('pg_ctl')  #: the path to `pg_ctl`
+
+
+@pytest.fixture(scope='session')
+def pg_server() -> Iterator[str]:
+    """
+    Start a temporary cluster.
+
+    :return: the URL of the cluster's `postgres` database
+    """
+    if not INITDB or not PG_CTL:
+        pytest.skip('The PostgreSQL server binaries are not available.')
+    datadir = tempfile.mkdtemp(prefix='normanpg-test-')
+    port = _free_port()
+    subprocess.run(
+        [INITDB, '-D', datadir, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8'],
+        stdout=subprocess.DEVNULL,
+        check=True
+    )
+    subprocess.run(
+        [
+            PG_CTL, '-D', datadir, '-w', '-l',
+            os.path.join(datadir, 'server.log'),
+            '-o', f"-p {port} -k {datadir} -c listen_addresses=127.0.0.1 "
+                  f"-c fsync=off -c synchronous_commit=off",
+            'start'
+        ],
+        stdout=subprocess.DEVNULL,
+        check=True
+    )
+    try:
+        yield f'postgresql://postgres@127.0.0.1:{port}/postgres'
+    finally:
+        subprocess.run(
+            [PG_CTL, '-D', datadir, '-m', 'immediate', 'stop'],
+            stdout=subprocess.DEVNULL,
+            check=False
+        )
+        shutil.rmtree(datadir, ignore_errors=True)
@@ -47,3 +47,29 @@ def test_hello_displays_expected_message():
     result: Result = runner.invoke(cli.cli, ['hello'])
     assert 'normanpg' in result.output.strip(), \
         "'Hello' messages should contain the CLI name."
+
+
+def test_bench_help_lists_workloads():
+    """
+    Arrange/Act: Run the `bench` subcommand with the '--help' flag.
+    Assert: The output lists the standard workloads.
+    """
+    runner: CliRunner = CliRunner()
+    result: Result = runner.invoke(cli.cli, ['bench', '--help'])
+    assert result.exit_code == 0
+    for workload in ('scalar', 'scan', 'write', 'srid'):
+        assert workload in result.output, \
+            'The standard workloads should be listed.'
+
+
+def test_bench_workloads_match_library():
+    """
+    Arrange/Act: Import the benchmark workloads.
+    Assert: The CLI offers the same workloads (and defaults) the library
+        defines.
+    """
+    from normanpg.bench import BenchParams, WORKLOADS
+    assert cli.BENCH_WORKLOADS == tuple(WORKLOADS.keys())
+    params = {p.name: p.default for p in cli.bench.params}
+    assert params['scan_rows'] == BenchParams().scan_rows
+    assert params['batch_size'] == BenchParams().batch_size
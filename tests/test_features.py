@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_features
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the feature reading and writing functions.
+"""
+import struct
+import uuid
+import psycopg2
+import pytest
+from psycopg2.sql import Composable, Composed, Identifier, Literal, SQL
+from shapely import wkb
+from shapely.geometry import Point
+import normanpg.functions.features as features
+from normanpg.functions.features import (
+    compose_bbox_filter, copy_binary, copy_text, ewkb, ewkb_hex,
+    read_features, write_features, _BINARY_ENCODERS, _CopyStream
+)
+from normanpg.pg import (
+    add_hook, connect, remove_hook, ExecuteHook, _cursor_execute
+)
+
+
+@pytest.mark.parametrize(
+    'value,expected',
+    [
+        (None, '\\N'),
+        (True, 't'),
+        (42, '42'),
+        ('a\tb\nc\\d', 'a\\tb\\nc\\\\d'),
+        (b'\x01\xff', '\\\\x01ff'),
+        ([1, 2], '{1,2}'),
+        (('a b', None, [True]), '{"a b",NULL,{t}}'),
+        (['say "hi"', 'c\\d'], '{"say \\\\"hi\\\\"","c\\\\\\\\d"}'),
+        ({'a': [1, 'x\ty']}, '{"a": [1, "x\\\\ty"]}')
+    ]
+)
+def test_copy_text_escapes_values(value, expected):
+    """
+    Arrange/Act: Format a value for the `COPY` text format.
+    Assert: The value is formatted and escaped.
+    """
+    assert copy_text(value) == expected
+
+
+def test_ewkb_hex_embeds_srid():
+    """
+    Arrange/Act: Encode a point as hex EWKB.
+    Assert: The SRID is embedded and the coordinates survive the round trip.
+    """
+    point = Point(-93.2650108, 44.977753)
+    encoded = ewkb_hex(point, 4326)
+    assert wkb.loads(encoded, hex=True).equals(point)
+    assert ewkb_hex(None, 4326) == '\\N'
+
+
+def _rows(data: bytes) -> list:
+    """
+    Split rows in the `COPY` binary format into their fields.
+    """
+    offset, rows = 0, []
+    while offset < len(data):
+        count, = struct.unpack_from('>h', data, offset)
+        offset += 2
+        fields = []
+        for _ in range(count):
+            size, = struct.unpack_from('>i', data, offset)
+            offset += 4
+            if size < 0:
+                fields.append(None)
+            else:
+                fields.append(data[offset:offset + size])
+                offset += size
+        rows.append(fields)
+    assert offset == len(data)
+    return rows
+
+
+def test_copy_binary_encodes_fields():
+    """
+    Arrange/Act: Encode a row for the `COPY` binary format.
+    Assert: Each field is encoded in its type's binary format, and nulls
+        are marked.
+    """
+    key = uuid.uuid4()
+    point = Point(-93.2650108, 44.977753)
+    types = ['bool', 'int2', 'int8', 'float8', 'text', 'jsonb', 'uuid', 'int4']
+    encoders = [_BINARY_ENCODERS[t] for t in types] + [
+        lambda g: ewkb(g, 4326)
+    ]
+    fields, = _rows(
+        copy_binary(
+            ['f', 7, 2 ** 40, 0.5, 'a\tb', {'a': [1]}, str(key), None, point],
+            encoders
+        )
+    )
+    assert fields[:8] == [
+        b'\x00',
+        b'\x00\x07',
+        struct.pack('>q', 2 ** 40),
+        struct.pack('>d', 0.5),
+        b'a\tb',
+        b'\x01{"a": [1]}',
+        key.bytes,
+        None
+    ]
+    # The geometry is raw EWKB (half the size of the hex).
+    assert wkb.loads(fields[8]).equals(point)
+    assert len(fields[8]) * 2 == len(ewkb_hex(point, 4326))
+
+
+def test_copy_stream_reads_in_chunks():
+    """
+    Arrange: Create a stream over some lines.
+    Act: Read it in small chunks.
+    Assert: The chunks reassemble into the original lines.
+    """
+    lines = [f'{i}\tvalue {i}\n' for i in range(100)]
+    stream = _CopyStream(iter(lines), batch_size=7)
+    chunks = []
+    while True:
+        chunk = stream.read(13)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    assert ''.join(chunks) == ''.join(lines)
+
+
+def test_copy_stream_reads_lines_after_chunks():
+    """
+    Arrange: Create a stream over some lines.
+    Act: Read a partial chunk, then lines.
+    Assert: Nothing is skipped or repeated.
+    """
+    stream = _CopyStream(iter(['a\n', 'bb\n', 'ccc\n']), batch_size=2)
+    assert stream.read(3) == 'a\nb'
+    assert stream.readline() == 'b\n'
+    assert stream.readline(2) == 'cc'
+    assert stream.read() == 'c\n'
+    assert stream.readline() == ''
+
+
+class _CopyCursor:
+    """
+    A stand-in for a cursor that runs `COPY ... FROM STDIN`.
+    """
+    rowcount = -1
+
+    def copy_expert(self, sql, file, size=8192):
+        self.sql = sql
+        self.copied = file.read()
+        self.rowcount = self.copied.count('\n')
+
+
+class _Connection:
+    """
+    A stand-in for an open connection (whose cursors are never used).
+    """
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        pass
+
+
+class _Recorder(ExecuteHook):
+    """
+    A hook that records the events it sees.
+    """
+    def __init__(self):
+        self.events = []
+
+    def after_execute(self, event):
+        self.events.append(event)
+
+
+def test_copy_passes_through_the_hooks():
+    """
+    Arrange: Register a hook.
+    Act: Run a `COPY` through the execute machinery.
+    Assert: The hook sees the `COPY` and the rows it wrote.
+    """
+    recorder = add_hook(_Recorder())
+    try:
+        crs = _CopyCursor()
+        _cursor_execute(
+            crs=crs,
+            query='COPY t (a) FROM STDIN',
+            caller='write_features',
+            stream=_CopyStream(iter(['1\n', '2\n']), batch_size=10)
+        )
+    finally:
+        remove_hook(recorder)
+    assert crs.copied == '1\n2\n'
+    event, = recorder.events
+    assert (event.caller, event.sql, event.rows) == (
+        'write_features', 'COPY t (a) FROM STDIN', 2
+    )
+
+
+@pytest.mark.parametrize(
+    'types,binary',
+    [
+        ({'name': 'varchar', 'n': 'int4', 'geom': 'geometry'}, True),
+        ({'name': 'varchar', 'n': 'numeric', 'geom': 'geometry'}, False)
+    ]
+)
+def test_write_features_prefers_binary(monkeypatch, types, binary):
+    """
+    Arrange: Stand in for a table with the given column types.
+    Act: Write some features.
+    Assert: The rows are sent in the binary format if every column's type
+        can be encoded (and in the text format otherwise).
+    """
+    copied = {}
+
+    def _execute(crs, query, caller, timeout=None, stream=None):
+        copied['query'] = query
+        copied['data'] = stream.read()
+
+    monkeypatch.setattr(features, 'geometry_column', lambda **_: 'geom')
+    monkeypatch.setattr(features, 'srid', lambda **_: 4326)
+    monkeypatch.setattr(features, 'column_types', lambda **_: types)
+    monkeypatch.setattr(features, '_cursor_execute', _execute)
+    monkeypatch.setattr(features, '_fetched', lambda _: None)
+    point = Point(1, 2)
+    count = write_features(
+        _Connection(), 'places', 'public',
+        [({'name': 'a', 'n': 1}, point), ({'name': 'b', 'n': None}, None)]
+    )
+    assert count == 2
+    assert (SQL(' (FORMAT binary)') in _parts(copied['query'])) == binary
+    data = copied['data']
+    if binary:
+        header = b'PGCOPY\n\xff\r\n\x00' + bytes(8)
+        assert data.startswith(header) and data.endswith(b'\xff\xff')
+        assert _rows(data[len(header):-2]) == [
+            [b'a', b'\x00\x00\x00\x01', ewkb(point, 4326)],
+            [b'b', None, None]
+        ]
+    else:
+        assert data == (
+            f'a\t1\t{ewkb_hex(point, 4326)}\n' + 'b\t\\N\t\\N\n'
+        )
+
+
+def test_write_features_round_trip(pg_server: str):
+    """
+    Arrange: Create a PostGIS table.
+    Act: Write features (in the binary format) and read them back.
+    Assert: The attributes and geometries survive the round trip.
+    """
+    cnx = connect(pg_server, autocommit=True)
+    try:
+        with cnx.cursor() as crs:
+            try:
+                crs.execute('CREATE EXTENSION IF NOT EXISTS postgis')
+            except psycopg2.Error:
+                pytest.skip('PostGIS is not available.')
+            crs.execute(
+                'CREATE TABLE places '
+                '(name text, n int4, geom geometry(Point, 4326))'
+            )
+        try:
+            expected = [
+                ({'name': f'p{i}', 'n': i}, Point(i, -i)) for i in range(10)
+            ]
+            assert write_features(cnx, 'places', 'public', expected) == 10
+            actual = [
+                feature
+                for batch in read_features(cnx, 'places', 'public')
+                for feature in batch
+            ]
+            assert [a for a, _ in actual] == [a for a, _ in expected]
+            assert all(a[1].equals(e[1]) for a, e in zip(actual, expected))
+        finally:
+            with cnx.cursor() as crs:
+                crs.execute('DROP TABLE places')
+    finally:
+        cnx.close()
+
+
+def _parts(composable: Composable) -> list:
+    """
+    Flatten a composed query into its parts.
+    """
+    if isinstance(composable, Composed):
+        return [p for c in composable.seq for p in _parts(c)]
+    return [composable]
+
+
+@pytest.mark.parametrize(
+    'bbox_srid,transformed',
+    [
+        (None, False),
+        (3857, False),
+        (4326, True)
+    ]
+)
+def test_compose_bbox_filter(bbox_srid, transformed):
+    """
+    Arrange/Act: Compose bounding box filters for a Web Mercator table with
+        boxes in the table's spatial reference system and in another.
+    Assert: Only a box in another spatial reference system is transformed
+        (into the table's), and the geometries never are.
+    """
+    parts = _parts(
+        compose_bbox_filter(
+            geomcol='geom',
+            bbox=(-93, 44, -92, 45),
+            table_srid=3857,
+            bbox_srid=bbox_srid
+        )
+    )
+    sql = ''.join(p.string for p in parts if isinstance(p, SQL))
+    literals = [p.wrapped for p in parts if isinstance(p, Literal)]
+    assert isinstance(parts[0], Identifier) and parts[0].strings == ('geom',)
+    assert sql.startswith(' && ')
+    assert ('ST_Transform(ST_MakeEnvelope(' in sql) == transformed
+    assert literals == (
+        [-93.0, 44.0, -92.0, 45.0, bbox_srid or 3857]
+        + ([3857] if transformed else [])
+    )
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_geometry
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the geometry conveniences.
+"""
+import os
+import psycopg2.extensions
+import pytest
+from shapely import get_srid, wkb
+from shapely.geometry import (
+    LineString, MultiLineString, MultiPoint, MultiPolygon, Point, Polygon
+)
+from normanpg.geometry import (
+    cast_geometry, cast_lazy_geometry, from_twkb, geometry_oids,
+    invalidate_geometry_oids, shape, twkb_coordinates
+)
+from normanpg.pg import ForkSafeConnection
+
+
+@pytest.mark.parametrize(
+    'convert',
+    [
+        lambda g: g.wkb_hex,
+        lambda g: g.wkb,
+        lambda g: memoryview(g.wkb)
+    ]
+)
+def test_shape_decodes_hex_and_binary_wkb(convert):
+    """
+    Arrange: Encode a point as WKB (hex text, bytes, or a buffer).
+    Act: Decode it.
+    Assert: The decoded geometry equals the original.
+    """
+    point = Point(1.5, -2.25)
+    assert shape(convert(point)).equals(point)
+
+
+def test_cast_geometry_decodes_ewkb():
+    """
+    Arrange: Encode a point as hex EWKB (as PostGIS returns it).
+    Act: Cast it.
+    Assert: The geometry and its SRID are decoded, and nulls stay null.
+    """
+    point = Point(1.5, -2.25)
+    geometry = cast_geometry(wkb.dumps(point, hex=True, srid=4326))
+    assert geometry.equals(point)
+    assert get_srid(geometry) == 4326
+    assert cast_geometry(None) is None
+
+
+def test_lazy_geometry_decodes_on_first_use():
+    """
+    Arrange: Cast a hex-encoded point to a lazy geometry.
+    Act: Use one of the geometry's attributes.
+    Assert: The geometry isn't decoded until it's used.
+    """
+    point = Point(3, 4)
+    lazy = cast_lazy_geometry(point.wkb_hex)
+    assert not lazy.decoded
+    assert lazy.raw == point.wkb_hex
+    assert lazy.x == 3
+    assert lazy.decoded
+    assert lazy.geometry.equals(point)
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> bytes:
+    return _varint((value << 1) ^ (value >> 63))
+
+
+def _twkb(typ: int, parts, precision: int = 0, size: bool = False) -> bytes:
+    """
+    Encode a (two-dimensional) TWKB geometry.  (`parts` are nested the way
+    the decoder's are: points for a point or line, rings for a polygon, and
+    so on.)
+    """
+    last = [0, 0]
+
+    def _coords(coords):
+        out = b''
+        for coord in coords:
+            for i, value in enumerate(coord):
+                scaled = int(round(value * 10 ** precision))
+                out += _zigzag(scaled - last[i])
+                last[i] = scaled
+        return out
+
+    def _line(coords):
+        return _varint(len(coords)) + _coords(coords)
+
+    def _polygon(rings):
+        return _varint(len(rings)) + b''.join(_line(r) for r in rings)
+
+    body = {
+        1: lambda: _coords(parts),
+        2: lambda: _line(parts),
+        3: lambda: _polygon(parts),
+        4: lambda: _varint(len(parts)) + b''.join(_coords([p]) for p in parts),
+        5: lambda: _varint(len(parts)) + b''.join(_line(p) for p in parts),
+        6: lambda: _varint(len(parts)) + b''.join(_polygon(p) for p in parts)
+    }[typ]()
+    header = bytes([typ | (((precision << 1) ^ (precision >> 63)) << 4)])
+    if size:
+        return header + b'\x02' + _varint(len(body)) + body
+    return header + b'\x00' + body
+
+
+def test_from_twkb_decodes_the_spec_example():
+    """
+    Arrange: Take the point example from the TWKB specification.
+    Act: Decode it.
+    Assert: The point is decoded.
+    """
+    assert from_twkb(bytes.fromhex('01000204')).equals(Point(1, 2))
+
+
+_SQUARE = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+_HOLE = [(2, 2), (2, 4), (4, 4), (4, 2), (2, 2)]
+
+
+@pytest.mark.parametrize('vectorize', [False, True])
+@pytest.mark.parametrize(
+    'typ,parts,expected',
+    [
+        (1, [(1.25, -2.5)], Point(1.25, -2.5)),
+        (2, [(0, 0), (1.5, 2), (-3, 4.25)],
+         LineString([(0, 0), (1.5, 2), (-3, 4.25)])),
+        (3, [_SQUARE, _HOLE], Polygon(_SQUARE, [_HOLE])),
+        (4, [(1, 1), (2, 2)], MultiPoint([(1, 1), (2, 2)])),
+        (5, [[(0, 0), (1, 1)], [(2, 2), (3, 5)]],
+         MultiLineString([[(0, 0), (1, 1)], [(2, 2), (3, 5)]])),
+        (6, [[_SQUARE, _HOLE], [[(20, 20), (21, 20), (21, 21), (20, 20)]]],
+         MultiPolygon([
+             Polygon(_SQUARE, [_HOLE]),
+             Polygon([(20, 20), (21, 20), (21, 21), (20, 20)])
+         ]))
+    ]
+)
+def test_from_twkb_decodes_geometries(typ, parts, expected, vectorize):
+    """
+    Arrange: Encode a geometry as TWKB (with two decimal places).
+    Act: Decode it (byte by byte, or with `NumPy`).
+    Assert: The decoded geometry equals the original.
+    """
+    data = _twkb(typ, parts, precision=2, size=True)
+    assert from_twkb(data, vectorize=vectorize).equals(expected)
+
+
+def test_twkb_coordinates():
+    """
+    Arrange: Encode a multi-line as TWKB with a negative precision.
+    Act: Decode its coordinates.
+    Assert: The coordinates of all the parts come back in order (rounded to
+        the precision).
+    """
+    data = _twkb(5, [[(120, 230), (340, 470)], [(1000, -1000)]], precision=-1)
+    coords = twkb_coordinates(memoryview(data))
+    assert coords.tolist() == [[120, 230], [340, 470], [1000, -1000]]
+
+
+class _TypeCursor:
+    """
+    A stand-in for a cursor that looks up types.
+    """
+    def __init__(self, cnx: '_TypeConnection'):
+        self._cnx = cnx
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        pass
+
+    def execute(self, *_):
+        self._cnx.lookups += 1
+
+    def fetchall(self):
+        return list(self._cnx.types)
+
+
+class _TypeConnection:
+    """
+    A stand-in for a connection to a database with (or without) PostGIS.
+    """
+    autocommit = True
+    closed = 0
+
+    def __init__(self):
+        self.types = []
+        self.lookups = 0
+
+    def get_dsn_parameters(self):
+        return {'host': 'localhost', 'port': '5432', 'dbname': 'oids_test'}
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return _TypeCursor(self)
+
+
+def test_geometry_oids_are_cached_once_postgis_exists():
+    """
+    Arrange: Wrap a connection to a database without PostGIS in a fork-safe
+        connection.
+    Act: Look up the geometry OIDs before and after PostGIS is "installed",
+        and after the cache is invalidated.
+    Assert: Empty results aren't cached, the OIDs are, and invalidating the
+        cache makes them look again.
+    """
+    cnx = _TypeConnection()
+    wrapper = ForkSafeConnection('postgresql://localhost/oids_test')
+    wrapper._cnx, wrapper._pid = cnx, os.getpid()  # pylint: disable=W0212
+    invalidate_geometry_oids()
+    assert geometry_oids(wrapper) == {}
+    cnx.types = [('geometry', 1001, 1002)]
+    assert geometry_oids(wrapper) == {'geometry': (1001, 1002)}
+    cnx.types = [('geometry', 2001, 2002)]
+    assert geometry_oids(cnx) == {'geometry': (1001, 1002)}
+    assert cnx.lookups == 2
+    invalidate_geometry_oids(wrapper)
+    assert geometry_oids(cnx) == {'geometry': (2001, 2002)}
+    invalidate_geometry_oids()
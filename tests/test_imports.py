@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_imports
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+These tests keep an eye on what importing the package loads.
+"""
+import subprocess
+import sys
+
+_HEAVY = ('psycopg2', 'phrasebook', 'shapely')  #: modules loaded lazily
+
+#: the only parts of the package the CLI may load before a command runs
+_CLI_MODULES = (
+    'normanpg', 'normanpg.cli', 'normanpg.constants', 'normanpg.version'
+)
+
+
+def _run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, '-c', code],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    ).stdout.strip()
+
+
+def test_import_does_not_load_heavy_modules():
+    """
+    Arrange/Act: Import the package, the CLI, and the functions package in a
+        fresh interpreter.
+    Assert: None of the heavy dependencies has been imported.
+    """
+    loaded = _run(
+        'import sys\n'
+        'import normanpg, normanpg.cli, normanpg.functions\n'
+        f'print(",".join(m for m in {_HEAVY!r} if m in sys.modules))'
+    )
+    assert not loaded, f'These modules should not be loaded: {loaded}'
+
+
+def test_cli_import_loads_only_the_cli():
+    """
+    Arrange/Act: Import the CLI in a fresh interpreter.
+    Assert: The only parts of the package it loads are the CLI and the
+        (dependency-free) modules it needs to describe its commands.
+    """
+    loaded = _run(
+        'import sys\n'
+        'import normanpg.cli\n'
+        'print(",".join(sorted(m for m in sys.modules '
+        'if m.split(".")[0] == "normanpg")))'
+    ).split(',')
+    assert tuple(loaded) == _CLI_MODULES
+
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_instrumentation
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the query instrumentation module.
+"""
+from normanpg.instrumentation import (
+    LatencyHistogram, QueryCollector, query_shape
+)
+from normanpg.pg import ExecuteEvent
+
+
+def _event(caller: str, sql: str, elapsed: float, rows: int = 1):
+    event = ExecuteEvent(caller=caller, sql=sql, cursor=None)
+    event.elapsed = elapsed
+    event.rows = rows
+    return event
+
+
+def test_query_shape_replaces_literals():
+    """
+    Arrange/Act: Get the shapes of two queries that differ only by literals.
+    Assert: The shapes are the same.
+    """
+    assert query_shape(
+        "SELECT * FROM t WHERE a = 'x' AND b IN (1, 2)"
+    ) == query_shape(
+        "SELECT *  FROM t WHERE a = 'y''z' AND b IN (3, 4, 5)"
+    ) == 'SELECT * FROM t WHERE a = ? AND b IN (?)'
+
+
+def test_histogram_percentiles():
+    """
+    Arrange: Create a histogram.
+    Act: Observe a spread of latencies.
+    Assert: The percentiles fall within the expected buckets.
+    """
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for _ in range(90):
+        histogram.observe(0.005)
+    for _ in range(10):
+        histogram.observe(0.5)
+    assert histogram.count == 100
+    assert 0 < histogram.percentile(50) <= 0.01
+    assert 0.1 < histogram.percentile(95) <= 1.0
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_collector_snapshot_and_prometheus():
+    """
+    Arrange: Create a collector.
+    Act: Record events from two callers.
+    Assert: The snapshot and the exposition text reflect the events.
+    """
+    collector = QueryCollector()
+    collector.after_execute(_event('srid', 'SELECT FIND_SRID(1)', 0.002))
+    collector.after_execute(_event('srid', 'SELECT FIND_SRID(2)', 0.004))
+    collector.after_execute(_event('scan', 'SELECT * FROM t', 0.2, rows=10))
+    snapshot = collector.snapshot()
+    assert snapshot['callers']['srid']['count'] == 2
+    assert snapshot['callers']['scan']['rows'] == 10
+    assert snapshot['shapes']['SELECT FIND_SRID(?)']['count'] == 2
+    text = collector.to_prometheus()
+    assert 'normanpg_queries_total{caller="srid"} 2' in text
+    assert (
+        'normanpg_query_duration_seconds_bucket{caller="scan",le="+Inf"} 1'
+        in text
+    )
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_loading
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the bulk load mode.
+"""
+import threading
+import psycopg2
+import pytest
+from normanpg.functions.loading import (
+    bulk_load, WriterConflict, _commit, _partition_lines
+)
+from normanpg.pg import connect
+
+
+def test_writers_share_the_input():
+    """
+    Arrange: Create two writers' partitions over a shared input.
+    Act: Drain them alternately.
+    Assert: Every row is encoded exactly once and each writer counts its own.
+    """
+    source = iter([(i, f'name {i}', None) for i in range(10)])
+    lock, stop = threading.Lock(), threading.Event()
+    counters = [[0], [0]]
+    partitions = [
+        _partition_lines(source, lock, 3, counter, stop)
+        for counter in counters
+    ]
+    lines = []
+    while partitions:
+        for partition in list(partitions):
+            line = next(partition, None)
+            if line is None:
+                partitions.remove(partition)
+            else:
+                lines.append(line)
+    assert sorted(lines) == sorted(
+        f'{i}\tname {i}\t\\N\n' for i in range(10)
+    )
+    assert sum(c[0] for c in counters) == 10
+
+
+def test_writers_stop_when_one_fails():
+    """
+    Arrange: Create a writer's partition and signal that another has failed.
+    Act: Read from the partition.
+    Assert: It takes no more rows.
+    """
+    source = iter([(1,), (2,)])
+    stop = threading.Event()
+    stop.set()
+    assert list(
+        _partition_lines(source, threading.Lock(), 1, [0], stop)
+    ) == []
+    assert next(source) == (1,)
+
+
+class _Writer:
+    """
+    A stand-in for a writer's connection that records what happens to its
+    transaction.
+    """
+    def __init__(self, log: list, name: str, fail_prepare: bool = False):
+        self._log = log
+        self._name = name
+        self._fail_prepare = fail_prepare
+
+    def commit(self):
+        self._log.append(f'{self._name} commit')
+
+    def tpc_prepare(self):
+        if self._fail_prepare:
+            raise RuntimeError('out of prepared transaction slots')
+        self._log.append(f'{self._name} prepare')
+
+    def tpc_commit(self):
+        self._log.append(f'{self._name} commit prepared')
+
+    def tpc_rollback(self):
+        self._log.append(f'{self._name} rollback prepared')
+
+
+def test_two_phase_commit_is_all_or_nothing():
+    """
+    Arrange: Create writers, one of which can't prepare its transaction.
+    Act: Commit them with and without transaction IDs.
+    Assert: With two-phase commit, nothing is committed when a writer fails
+        to prepare, and every writer commits once all have prepared.
+    """
+    log = []
+    writers = [_Writer(log, 'a'), _Writer(log, 'b', fail_prepare=True)]
+    with pytest.raises(RuntimeError):
+        _commit(writers, xids=['a', 'b'])
+    assert log == ['a prepare', 'a rollback prepared']
+    log.clear()
+    _commit([_Writer(log, 'a'), _Writer(log, 'b')], xids=['a', 'b'])
+    assert log == [
+        'a prepare', 'b prepare', 'a commit prepared', 'b commit prepared'
+    ]
+    log.clear()
+    _commit([_Writer(log, 'a')], xids=None)
+    assert log == ['a commit']
+
+
+@pytest.fixture
+def load_table(pg_server: str):
+    """
+    Create a table with a standalone unique index and an ordinary index.
+
+    :return: an autocommit connection to the table's database
+    """
+    cnx = connect(pg_server, autocommit=True)
+    try:
+        with cnx.cursor() as crs:
+            crs.execute('CREATE TABLE load_test (code text, name text)')
+            crs.execute(
+                'CREATE UNIQUE INDEX load_test_code_idx ON load_test (code)'
+            )
+            crs.execute('CREATE INDEX load_test_name_idx ON load_test (name)')
+        yield cnx
+        with cnx.cursor() as crs:
+            crs.execute('DROP TABLE load_test')
+    finally:
+        cnx.close()
+
+
+def _indexes(cnx) -> list:
+    with cnx.cursor() as crs:
+        crs.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'load_test' "
+            "ORDER BY indexname"
+        )
+        return [row[0] for row in crs.fetchall()]
+
+
+def test_bulk_load_keeps_unique_indexes(pg_server: str, load_table):
+    """
+    Arrange: Create a table with a standalone unique index and an ordinary
+        index.
+    Act: Load some distinct rows.
+    Assert: Only the ordinary index is dropped and rebuilt.
+    """
+    result = bulk_load(
+        pg_server, 'load_test', 'public',
+        [(f'c{i}', f'n{i}') for i in range(100)],
+        columns=['code', 'name'], workers=2, batch_size=10
+    )
+    assert result['rows'] == 100
+    assert result['indexes'] == ['load_test_name_idx']
+    assert _indexes(load_table) == ['load_test_code_idx', 'load_test_name_idx']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bulk_load_rejects_duplicates(pg_server: str, load_table, workers):
+    """
+    Arrange: Create a table with a standalone unique index.
+    Act: Load rows with duplicate keys (written by one writer, or by two).
+    Assert: The load fails, nothing is committed, and both indexes remain.
+    """
+    rows = [(f'c{i % 50}', f'n{i}') for i in range(100)]
+    with pytest.raises((psycopg2.IntegrityError, WriterConflict)):
+        bulk_load(
+            pg_server, 'load_test', 'public', rows,
+            columns=['code', 'name'], workers=workers, batch_size=10
+        )
+    with load_table.cursor() as crs:
+        crs.execute('SELECT count(*) FROM load_test')
+        assert crs.fetchone()[0] == 0
+    assert _indexes(load_table) == ['load_test_code_idx', 'load_test_name_idx']
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_lookups
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the batched spatial lookups.
+"""
+from pathlib import Path
+import pytest
+from psycopg2.sql import Composable, Composed, Literal, SQL
+from shapely.geometry import Point
+import normanpg.functions.lookups as lookups
+from normanpg.functions.lookups import _batches, compose_inputs
+
+
+class _Phrasebook:
+    """
+    A stand-in for the module's phrasebook that reads the phrase files
+    directly.
+    """
+    def sql(self, phrase: str) -> SQL:
+        path = Path(lookups.__file__).with_suffix('.phr') / f'{phrase}.sql'
+        return SQL(path.read_text())
+
+
+def _parts(composable: Composable) -> list:
+    """
+    Flatten a composed query into its parts.
+    """
+    if isinstance(composable, Composed):
+        return [p for c in composable.seq for p in _parts(c)]
+    return [composable]
+
+
+def _sql(composed: Composed) -> str:
+    """
+    Get the SQL text of a composed query (without its literals).
+    """
+    return ''.join(
+        p.string for p in _parts(composed) if isinstance(p, SQL)
+    )
+
+
+def _literals(composed: Composed) -> list:
+    """
+    Get the values of a composed query's literals.
+    """
+    return [p.wrapped for p in _parts(composed) if isinstance(p, Literal)]
+
+
+@pytest.fixture
+def phrasebook(monkeypatch):
+    """
+    Replace the module's phrasebook with one that reads the phrase files.
+    """
+    monkeypatch.setattr(lookups, '_PHRASEBOOK', _Phrasebook())
+
+
+def test_batches_preserve_input_order():
+    """
+    Arrange: Create more input locations than fit in one batch.
+    Act: Split them into batches.
+    Assert: The batches are full (but for the last) and, taken together, are
+        the inputs in their original order.
+    """
+    locations = [(float(i), float(-i)) for i in range(7)]
+    batches = _batches(locations, 3)
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [loc for b in batches for loc in b] == locations
+
+
+@pytest.mark.usefixtures('phrasebook')
+def test_compose_inputs_sends_points_as_arrays():
+    """
+    Arrange: Create coordinate pairs in the table's spatial reference system.
+    Act: Compose the inputs.
+    Assert: The coordinates travel as arrays of numbers and are not
+        transformed.
+    """
+    query = compose_inputs([(1, 2), (3.5, -4)], table_srid=4326)
+    sql = _sql(query)
+    assert 'unnest(' in sql and 'ST_MakePoint' in sql
+    assert 'ST_Transform' not in sql
+    assert _literals(query) == [4326, [1.0, 3.5], [2.0, -4.0]]
+
+
+@pytest.mark.usefixtures('phrasebook')
+def test_compose_inputs_sends_geometries_as_wkb():
+    """
+    Arrange: Create inputs that mix geometries and coordinate pairs.
+    Act: Compose the inputs.
+    Assert: Every input travels as WKB.
+    """
+    query = compose_inputs([Point(1, 2), (3, 4)], table_srid=4326)
+    assert 'ST_GeomFromWKB' in _sql(query)
+    srid_, wkbs = _literals(query)
+    assert srid_ == 4326
+    assert [bytes(w.adapted) for w in wkbs] == [
+        Point(1, 2).wkb, Point(3, 4).wkb
+    ]
+
+
+@pytest.mark.usefixtures('phrasebook')
+def test_compose_inputs_transforms_other_srids():
+    """
+    Arrange: Create coordinate pairs in another spatial reference system.
+    Act: Compose the inputs.
+    Assert: The inputs (not the table) are transformed into the table's
+        spatial reference system.
+    """
+    query = compose_inputs([(1, 2)], table_srid=3857, input_srid=4326)
+    sql = _sql(query)
+    assert 'ST_Transform(ST_SetSRID(ST_MakePoint' in sql
+    assert _literals(query) == [4326, 3857, [1.0], [2.0]]
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_memory
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the memory tracking module.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import tracemalloc
+import pytest
+from click.testing import CliRunner, Result
+import normanpg.cli as cli
+import normanpg.memory as memory
+from normanpg.memory import (
+    disable_memory_tracking, enable_memory_tracking, rank, read_report,
+    worst_offenders, SORT_KEYS
+)
+from normanpg.pg import execute_rows, execute_scalar
+
+
+class _Cursor:
+    """
+    A stand-in for a client-side cursor that "returns" some rows.
+    """
+    name = None
+    itersize = 2000
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        pass
+
+    def execute(self, _):
+        # A client-side cursor materializes the whole result.
+        self._rows = [list(row) for row in self._rows]
+        self.rowcount = len(self._rows)
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _Connection:
+    """
+    A stand-in for a connection whose cursors return the same rows.
+    """
+    def __init__(self, rows):
+        self._rows = rows
+
+    def cursor(self, cursor_factory=None):  # pylint: disable=unused-argument
+        return _Cursor(self._rows)
+
+
+@pytest.mark.parametrize('can_reset_peak', [True, False])
+def test_tracker_charges_callers(monkeypatch, can_reset_peak):
+    """
+    Arrange: Enable memory tracking (with and without
+        `tracemalloc.reset_peak`, which is missing before Python 3.9).
+    Act: Materialize a large result and fetch a scalar.
+    Assert: The large result's caller is the worst offender, with the rows
+        and bytes it fetched.
+    """
+    monkeypatch.setattr(memory, '_CAN_RESET_PEAK', can_reset_peak)
+    if not can_reset_peak:
+        monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+    tracker = enable_memory_tracking()
+    try:
+        big = _Connection([('x' * 100, i) for i in range(1000)])
+        rows = list(execute_rows(big, 'SELECT', caller='big'))
+        assert len(rows) == 1000
+        assert execute_scalar(_Connection([(1,)]), 'SELECT', 'small') == 1
+        worst = worst_offenders(2)
+        assert [w['caller'] for w in worst] == ['big', 'small']
+        assert worst[0]['max_rows'] == 1000
+        assert worst[0]['max_buffer_rows'] == 1000
+        assert worst[0]['fetched_bytes'] == 1000 * (100 + 8)
+        assert worst[0]['peak_bytes'] > worst[1]['peak_bytes']
+        assert worst[1]['rows'] == 1
+        # Stopping early still charges the caller.
+        next(iter(execute_rows(big, 'SELECT', caller='early')))
+        assert tracker.worst(1, key='calls')[0]['calls'] == 1
+    finally:
+        disable_memory_tracking()
+    assert worst_offenders() == []
+
+
+def test_report_file_and_cli(tmp_path):
+    """
+    Arrange: Enable memory tracking with a report file.
+    Act: Fetch some rows, disable tracking, and run the `memory` subcommand.
+    Assert: The report lists the caller.
+    """
+    path = str(tmp_path / 'memory.json')
+    enable_memory_tracking(path=path)
+    try:
+        list(execute_rows(_Connection([(1,), (2,)]), 'SELECT', 'scan'))
+    finally:
+        disable_memory_tracking()
+    stats = read_report(path)
+    assert rank(stats, key='max_rows')[0]['caller'] == 'scan'
+    assert cli.MEMORY_SORT_KEYS == SORT_KEYS
+    runner: CliRunner = CliRunner()
+    result: Result = runner.invoke(
+        cli.cli, ['memory', path, '--sort', 'max_rows', '--json']
+    )
+    assert result.exit_code == 0
+    assert json.loads(result.output)[0]['max_rows'] == 2
+
+
+def test_periodic_dumps_never_break_queries(tmp_path):
+    """
+    Arrange: Enable memory tracking with a report rewritten on every query,
+        and another with a report that can't be written.
+    Act: Run queries from several threads at once.
+    Assert: The queries succeed, the report is complete, and no temporary
+        files are left behind.
+    """
+    path = tmp_path / 'memory.json'
+    enable_memory_tracking(path=str(path), dump_interval=0)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for future in [
+                    executor.submit(
+                        lambda: list(
+                            execute_rows(_Connection([(1,)]), 'SELECT', 'x')
+                        )
+                    )
+                    for _ in range(200)
+            ]:
+                assert future.result() == [[1]]
+    finally:
+        disable_memory_tracking()
+    assert read_report(str(path))[0]['calls'] == 200
+    assert [p.name for p in tmp_path.iterdir()] == ['memory.json']
+    enable_memory_tracking(
+        path=str(tmp_path / 'missing' / 'memory.json'), dump_interval=0
+    )
+    try:
+        assert execute_scalar(_Connection([(1,)]), 'SELECT', 'y') == 1
+    finally:
+        with pytest.raises(OSError):
+            disable_memory_tracking()
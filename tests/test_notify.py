@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_notify
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the `LISTEN`/`NOTIFY` subscriber.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import List
+import pytest
+from psycopg2.extensions import Notify
+from psycopg2.sql import Composable, Composed, Identifier
+import normanpg.notify as notify
+from normanpg.notify import (
+    coalesce_notifications, install_notify_trigger, remove_notify_trigger,
+    Subscriber
+)
+from normanpg.pg import connect, execute
+
+
+def test_coalesce_notifications_collapses_duplicates():
+    """
+    Arrange: Create a burst of notifications with duplicates.
+    Act: Coalesce them.
+    Assert: Each distinct (channel, payload) pair appears once, in order.
+    """
+    burst = [
+        Notify(1, 'a', '1'),
+        Notify(1, 'a', '1'),
+        Notify(2, 'b', '1'),
+        Notify(1, 'a', '2'),
+        Notify(3, 'b', '1')
+    ]
+    assert [
+        (n.channel, n.payload) for n in coalesce_notifications(burst)
+    ] == [('a', '1'), ('b', '1'), ('a', '2')]
+
+
+class _Connection:
+    """
+    A stand-in for a connection whose notifications arrive over a pipe (so
+    it can be waited on like a socket).
+    """
+    def __init__(self):
+        self._r, self._w = os.pipe()
+        os.set_blocking(self._r, False)
+        self._lock = threading.Lock()
+        self._pending: List[Notify] = []
+        self.notifies: List[Notify] = []
+        self.closed = 0
+
+    def fileno(self) -> int:
+        return self._r
+
+    def send(self, channel: str, payload: str = ''):
+        """
+        Send a notification (as the server would).
+        """
+        with self._lock:
+            self._pending.append(Notify(1, channel, payload))
+        os.write(self._w, b'\0')
+
+    def poll(self):
+        try:
+            os.read(self._r, 1024)
+        except BlockingIOError:
+            pass
+        with self._lock:
+            self.notifies.extend(self._pending)
+            self._pending.clear()
+
+    def close(self):
+        self.closed = 1
+        os.close(self._r)
+        os.close(self._w)
+
+
+def _parts(composable: Composable) -> list:
+    """
+    Flatten a composed query into its parts.
+    """
+    if isinstance(composable, Composed):
+        return [p for c in composable.seq for p in _parts(c)]
+    return [composable]
+
+
+@pytest.fixture
+def connections(monkeypatch) -> List[_Connection]:
+    """
+    Replace the subscriber's connections with stand-ins.
+
+    :return: the connections opened, in order (each with the channels it
+        listens on)
+    """
+    opened = []
+
+    def _connect(url, autocommit=False):
+        assert autocommit
+        opened.append(_Connection())
+        opened[-1].channels = []
+        return opened[-1]
+
+    def _execute(cnx, query, caller=None):
+        (identifier,) = [p for p in _parts(query) if isinstance(p, Identifier)]
+        cnx.channels.extend(identifier.strings)
+
+    monkeypatch.setattr(notify, 'connect', _connect)
+    monkeypatch.setattr(notify, 'execute', _execute)
+    return opened
+
+
+def _later(seconds: float, fn, *args):
+    """
+    Call a function on another thread after a delay.
+    """
+    timer = threading.Timer(seconds, fn, args)
+    timer.start()
+    return timer
+
+
+def test_poll_waits_for_notifications(connections):
+    """
+    Arrange: Open a subscriber on two channels (and add a third).
+    Act: Poll with nothing to read, then poll while a notification is sent.
+    Assert: The first poll times out, and the second returns the
+        notification as soon as it arrives.
+    """
+    with Subscriber('postgresql://', ['a', 'b']) as subscriber:
+        subscriber.listen('c')
+        subscriber.listen('a')
+        cnx, = connections
+        assert cnx.channels == subscriber.channels == ['a', 'b', 'c']
+        assert subscriber.poll(timeout=0.05) == []
+        _later(0.05, cnx.send, 'c', 'x')
+        started = time.monotonic()
+        (notification,) = subscriber.poll(timeout=5)
+        assert (notification.channel, notification.payload) == ('c', 'x')
+        assert time.monotonic() - started < 2.5
+    assert cnx.closed
+
+
+def test_poll_coalesces_bursts(connections):
+    """
+    Arrange: Open a subscriber that coalesces bursts.
+    Act: Send duplicate notifications, and more while the window is open.
+    Assert: The burst is collected and its duplicates are collapsed.
+    """
+    with Subscriber('postgresql://', ['a'], coalesce=0.3) as subscriber:
+        cnx, = connections
+        cnx.send('a', '1')
+        cnx.send('a', '1')
+        _later(0.05, cnx.send, 'a', '2')
+        _later(0.1, cnx.send, 'a', '1')
+        assert [n.payload for n in subscriber.poll(timeout=1)] == ['1', '2']
+
+
+def test_dispatcher_wakes_when_stopped(connections):
+    """
+    Arrange: Start a subscriber with callbacks for one channel and for all.
+    Act: Send notifications, then stop the dispatcher while it's waiting.
+    Assert: The callbacks see their notifications (despite a failing one),
+        and stopping wakes the dispatcher right away.
+    """
+    seen = []
+    done = threading.Event()
+
+    def _fail(_):
+        raise RuntimeError('The callback failed.')
+
+    def _any(notification):
+        seen.append(('any', notification.payload))
+        if len(seen) == 3:
+            done.set()
+
+    subscriber = Subscriber('postgresql://', ['a', 'b'])
+    subscriber.add_callback(_fail, channel='a')
+    subscriber.add_callback(lambda n: seen.append(('a', n.payload)), 'a')
+    subscriber.add_callback(_any)
+    subscriber.start()
+    try:
+        cnx, = connections
+        cnx.send('a', '1')
+        cnx.send('b', '2')
+        assert done.wait(5)
+        assert sorted(seen) == [('a', '1'), ('any', '1'), ('any', '2')]
+        time.sleep(0.05)  # (The dispatcher is waiting again.)
+        started = time.monotonic()
+        subscriber.stop()
+        assert time.monotonic() - started < 2.5
+        assert subscriber._wake_r is None
+        assert not cnx.closed
+    finally:
+        subscriber.close()
+    assert cnx.closed
+
+
+def test_iteration_ends_when_closed(connections):
+    """
+    Arrange: Open a subscriber and send two notifications.
+    Act: Iterate over the subscriber, closing it after the first.
+    Assert: The iteration ends without reopening the connection.
+    """
+    subscriber = Subscriber('postgresql://', ['a'])
+    iterator = iter(subscriber)
+    _later(0.05, lambda: connections[0].send('a', '1'))
+    assert next(iterator).payload == '1'
+    subscriber.close()
+    assert list(iterator) == []
+    assert len(connections) == 1
+
+
+def test_notifications_arrive_in_the_event_loop(connections):
+    """
+    Arrange: Open a subscriber that coalesces bursts.
+    Act: Consume its notifications in an event loop while a burst is sent.
+    Assert: The burst arrives coalesced, and the connection is no longer
+        watched once the consumer is done.
+    """
+    async def _consume() -> list:
+        with Subscriber('postgresql://', ['a'], coalesce=0.1) as subscriber:
+            cnx, = connections
+            loop = asyncio.get_running_loop()
+            for payload in ('1', '1', '2'):
+                loop.call_later(0.05, cnx.send, 'a', payload)
+            received = []
+            agen = subscriber.notifications()
+            async for notification in agen:
+                received.append(notification.payload)
+                if len(received) == 2:
+                    break
+            await agen.aclose()
+            # The reader was removed, so it can be added again.
+            loop.add_reader(cnx.fileno(), lambda: None)
+            assert loop.remove_reader(cnx.fileno())
+            return received
+
+    assert asyncio.run(asyncio.wait_for(_consume(), 5)) == ['1', '2']
+
+
+def test_notify_trigger(pg_server: str):
+    """
+    Arrange: Create a table and install a notification trigger on it.
+    Act: Change the table, then remove the trigger and change it again.
+    Assert: Each change is announced on the channel with the row's key, and
+        nothing is announced once the trigger is removed.
+    """
+    cnx = connect(pg_server, autocommit=True)
+    try:
+        execute(cnx, 'CREATE TABLE notify_test (id int, name text)')
+        try:
+            channel = install_notify_trigger(
+                cnx, 'notify_test', 'public', columns=['id']
+            )
+            assert channel == 'notify_test_changed'
+            with Subscriber(pg_server, [channel]) as subscriber:
+                execute(cnx, "INSERT INTO notify_test VALUES (1, 'a')")
+                execute(cnx, 'DELETE FROM notify_test')
+                payloads = []
+                while len(payloads) < 2:
+                    payloads.extend(
+                        json.loads(n.payload)
+                        for n in subscriber.poll(timeout=5)
+                    )
+                assert payloads == [
+                    {
+                        'schema': 'public', 'table': 'notify_test',
+                        'op': op, 'row': {'id': 1}
+                    }
+                    for op in ('INSERT', 'DELETE')
+                ]
+                remove_notify_trigger(cnx, 'notify_test', 'public')
+                execute(cnx, "INSERT INTO notify_test VALUES (2, 'b')")
+                assert subscriber.poll(timeout=0.2) == []
+        finally:
+            execute(cnx, 'DROP TABLE notify_test')
+    finally:
+        cnx.close()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_parallel
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for fork-safe connections and the process pool.
+"""
+import gc
+import os
+import pickle
+import signal
+import threading
+import time
+import pytest
+import normanpg.pg
+from normanpg.parallel import map_partitions
+from normanpg.pg import ForkSafeConnection
+
+
+def _square(cnx, partition):
+    return os.getpid(), cnx.url, partition * partition
+
+
+def test_map_partitions_preserves_order():
+    """
+    Arrange: Create some partitions.
+    Act: Map a function over them in worker processes.
+    Assert: The results are in the order of the partitions and were computed
+        by other processes, each with the connection's parameters.
+    """
+    results = map_partitions(
+        _square, range(6), 'postgresql://localhost/db', processes=2,
+        warm=False
+    )
+    assert [r[2] for r in results] == [0, 1, 4, 9, 16, 25]
+    assert all(r[0] != os.getpid() for r in results)
+    assert {r[1] for r in results} == {'postgresql://localhost/db'}
+
+
+class _FakeConnection:
+    closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+def test_fork_safe_connection_reconnects_in_a_new_process(monkeypatch):
+    """
+    Arrange: Create a fork-safe connection and open it.
+    Act: Pretend the connection was opened by another process.
+    Assert: A new connection is opened for this process.
+    """
+    opened = []
+
+    def _connect(**_):
+        opened.append(_FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(normanpg.pg, 'connect', _connect)
+    monkeypatch.setattr(normanpg.pg, 'discard', lambda cnx: cnx.close())
+    cnx = ForkSafeConnection('postgresql://localhost/db')
+    assert cnx.connection is cnx.connection
+    cnx._pid = -1  # pylint: disable=protected-access
+    assert cnx.connection is opened[1]
+    assert opened[0].closed
+
+
+def test_fork_safe_connection_pickles_its_parameters():
+    """
+    Arrange: Create a fork-safe connection.
+    Act: Pickle and unpickle it.
+    Assert: The copy has the same parameters and no open connection.
+    """
+    cnx = pickle.loads(
+        pickle.dumps(ForkSafeConnection('postgresql://localhost/db'))
+    )
+    assert cnx.url == 'postgresql://localhost/db'
+    assert cnx._cnx is None  # pylint: disable=protected-access
+
+
+def _wait_for_child(pid: int, timeout: float) -> int or None:
+    """
+    Wait for a child process to exit (killing it if it takes too long).
+
+    :return: the child's exit code, or `None` if it had to be killed
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return os.WEXITSTATUS(status)
+        time.sleep(0.05)
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+    return None
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork()')
+def test_fork_while_a_query_runs(pg_server: str):
+    """
+    Arrange: Start a thread that's blocked in a query (so `psycopg2` holds
+        its connection's lock), and another that holds a fork-safe
+        connection's lock.
+    Act: Fork, and (in the child) drop the inherited connection and use the
+        fork-safe connection.
+    Assert: The child doesn't hang, and the parent's query isn't disturbed.
+    """
+    busy = normanpg.pg.connect(pg_server)
+    proxy = ForkSafeConnection(pg_server)
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def _sleep():
+        with busy.cursor() as crs:
+            started.set()
+            crs.execute('SELECT pg_sleep(1), 42')
+            results.append(crs.fetchone()[1])
+
+    def _hold():
+        with proxy._lock:  # pylint: disable=protected-access
+            release.wait(5)
+
+    sleeper = threading.Thread(target=_sleep)
+    holder = threading.Thread(target=_hold)
+    sleeper.start()
+    holder.start()
+    started.wait(5)
+    time.sleep(0.2)  # (Give the query time to reach the server.)
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover (This is the child.)
+        code = 1
+        try:
+            del busy
+            gc.collect()
+            with proxy.cursor() as crs:
+                crs.execute('SELECT 1')
+                code = 0 if crs.fetchone()[0] == 1 else 1
+        finally:
+            os._exit(code)  # pylint: disable=protected-access
+    release.set()
+    assert _wait_for_child(pid, 10) == 0
+    sleeper.join()
+    holder.join()
+    assert results == [42]
+    busy.close()
+    proxy.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork()')
+def test_fork_replaces_held_locks():
+    """
+    Arrange: Hold a fork-safe connection's lock in another thread.
+    Act: Fork, and (in the child) take the lock.
+    Assert: The child gets the lock.
+    """
+    proxy = ForkSafeConnection('postgresql://localhost/db')
+    held, release = threading.Event(), threading.Event()
+
+    def _hold():
+        with proxy._lock:  # pylint: disable=protected-access
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=_hold)
+    holder.start()
+    held.wait(5)
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover (This is the child.)
+        os._exit(  # pylint: disable=protected-access
+            0 if proxy._lock.acquire(timeout=2) else 1
+        )
+    release.set()
+    holder.join()
+    assert _wait_for_child(pid, 10) == 0
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_pg
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the core database functions.
+"""
+import threading
+import pytest
+from psycopg2.extensions import QueryCanceledError
+from normanpg.errors import NormanPgException
+from normanpg.pg import QueryTimeout, _StatementTimeout
+
+
+def test_query_timeout_reports_caller_and_elapsed():
+    """
+    Arrange/Act: Create a query timeout exception.
+    Assert: It is a library exception that reports the caller and timings.
+    """
+    ex = QueryTimeout(
+        message='The query was cancelled.',
+        caller='srid',
+        elapsed=2.5,
+        timeout=2.0
+    )
+    assert isinstance(ex, NormanPgException)
+    assert (ex.caller, ex.elapsed, ex.timeout) == ('srid', 2.5, 2.0)
+
+
+class _Cursor:
+    """
+    A stand-in for the cursor the timeout uses to set `statement_timeout`.
+    """
+    def __init__(self, cnx: '_Connection'):
+        self._cnx = cnx
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        pass
+
+    def execute(self, query, params):
+        self._cnx.settings.append(params[0])
+
+    def fetchone(self):
+        return '0', self._cnx.settings[-1]
+
+
+class _Connection:
+    """
+    A stand-in for a connection that records how it's used.
+    """
+    autocommit = True
+
+    def __init__(self):
+        self.settings = []
+        self.cancelled = threading.Event()
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class _ExecutionCursor:
+    """
+    A stand-in for the cursor that executes the statement.
+    """
+    def __init__(self):
+        self.connection = _Connection()
+
+
+def test_statement_timeout_cancels_and_raises_query_timeout():
+    """
+    Arrange: Enforce a short timeout on a statement that runs until it's
+        cancelled.
+    Act: Run the statement.
+    Assert: The watchdog cancels it, a `QueryTimeout` is raised, and the
+        previous `statement_timeout` is put back.
+    """
+    crs = _ExecutionCursor()
+    cnx = crs.connection
+    with pytest.raises(QueryTimeout) as info:
+        with _StatementTimeout(crs=crs, caller='slow', timeout=0.05):
+            assert cnx.cancelled.wait(5)
+            raise QueryCanceledError('canceling statement due to user request')
+    assert isinstance(info.value.inner, QueryCanceledError)
+    assert info.value.caller == 'slow'
+    assert info.value.elapsed >= 0.05
+    assert cnx.settings == ['50', '0']
+
+
+def test_statement_timeout_ignores_other_cancellations():
+    """
+    Arrange: Enforce a long timeout on a statement.
+    Act: Cancel the statement (as another session might) before the
+        deadline.
+    Assert: The cancellation isn't reported as a timeout, and the watchdog
+        never fires.
+    """
+    crs = _ExecutionCursor()
+    with pytest.raises(QueryCanceledError):
+        with _StatementTimeout(crs=crs, caller='busy', timeout=60):
+            raise QueryCanceledError('canceling statement due to user request')
+    assert not crs.connection.cancelled.is_set()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_provisioning
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the provisioning engine.
+"""
+import threading
+from typing import Any, Dict, List, Tuple
+import pytest
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.sql import Literal
+import normanpg.functions.database as database
+import normanpg.functions.provisioning as provisioning
+from normanpg.functions.provisioning import (
+    provision, DATABASE, EXTENSION, SCHEMA, ProvisioningError,
+    ProvisionReport, ProvisionStep
+)
+
+
+def test_report_summarizes_steps():
+    """
+    Arrange: Create a report with a created database, an existing extension
+        and a failed schema.
+    Act: Summarize the report.
+    Assert: The created and failed steps, and the timings, are reported.
+    """
+    report = ProvisionReport()
+    database = report.add(ProvisionStep('tenant', DATABASE, 'tenant'))
+    database.created, database.elapsed = True, 0.5
+    report.add(ProvisionStep('tenant', EXTENSION, 'postgis'))
+    schema = report.add(ProvisionStep('tenant', SCHEMA, 'raw'))
+    schema.error, schema.elapsed = RuntimeError('denied'), 0.25
+    assert report.created == [database]
+    assert report.errors == [schema]
+    assert report.timings() == {DATABASE: 0.5, EXTENSION: 0.0, SCHEMA: 0.25}
+    assert 'failed: denied' in repr(schema)
+
+
+class _Phrase:
+    """
+    A stand-in for a phrase that "formats" into its name and parameters.
+    """
+    def __init__(self, phrase: str):
+        self._phrase = phrase
+
+    def format(self, **params) -> Tuple[str, Dict[str, Any]]:
+        return self._phrase, {
+            key: value.wrapped if isinstance(value, Literal)
+            else value.strings[0]
+            for key, value in params.items()
+        }
+
+
+class _Phrasebook:
+    """
+    A stand-in for the module's phrasebook.
+    """
+    def sql(self, phrase: str) -> _Phrase:
+        return _Phrase(phrase)
+
+
+class _Connection:
+    """
+    A stand-in for a connection to one of the server's databases.
+    """
+    def __init__(self, dbname: str, autocommit: bool):
+        self.dbname = dbname
+        self.autocommit = autocommit
+        self.closed = False
+
+    def set_isolation_level(self, level: int):
+        self.autocommit = level == ISOLATION_LEVEL_AUTOCOMMIT
+
+    def close(self):
+        self.closed = True
+
+
+class _Server:
+    """
+    A stand-in for a server that records the statements it executes.
+    """
+    def __init__(
+            self,
+            databases: Dict[str, Dict[str, set]],
+            fail: Tuple[str, str] = None,
+            barrier: threading.Barrier = None
+    ):
+        """
+
+        :param databases: the databases that exist, with their extensions and
+            schemas
+        :param fail: the (phrase, name) of a statement that fails
+        :param barrier: a barrier every database's first extension waits at
+        """
+        self.databases = databases
+        self.fail = fail
+        self.barrier = barrier
+        self.connections: List[_Connection] = []
+        self.log: List[Tuple[str, str, str]] = []
+        self._lock = threading.Lock()
+
+    def connect(self, url, dbname=None, autocommit=False):
+        cnx = _Connection(dbname, autocommit)
+        with self._lock:
+            self.connections.append(cnx)
+        return cnx
+
+    def execute_rows(self, cnx, query, timeout=None):
+        phrase, params = query
+        (names,) = params.values()
+        found = (
+            self.databases if phrase == 'select_db_names'
+            else self.databases[cnx.dbname][
+                'extensions' if phrase == 'select_extension_names'
+                else 'schemas'
+            ]
+        )
+        return iter([(name,) for name in names if name in found])
+
+    def execute(self, cnx, query, caller=None, timeout=None):
+        phrase, params = query
+        (name,) = params.values()
+        with self._lock:
+            self.log.append((cnx.dbname, phrase, name))
+        if (phrase, name) == self.fail:
+            raise RuntimeError(f'{name} failed')
+        if phrase == 'create_db':
+            assert cnx.autocommit
+            self.databases[name] = {'extensions': set(), 'schemas': set()}
+            return
+        if phrase == 'create_extension' and self.barrier is not None:
+            self.barrier.wait()
+        self.databases[cnx.dbname][
+            'extensions' if phrase == 'create_extension' else 'schemas'
+        ].add(name)
+
+
+@pytest.fixture
+def server(monkeypatch, request) -> _Server:
+    """
+    Replace the module's connections and queries with a stand-in server.
+    """
+    _server = request.param() if hasattr(request, 'param') else _Server({})
+    # (The database module's helpers check for and create the databases and
+    # schemas.)
+    for module in (provisioning, database):
+        monkeypatch.setattr(module, '_PHRASEBOOK', _Phrasebook())
+        monkeypatch.setattr(module, 'execute', _server.execute)
+        monkeypatch.setattr(module, 'execute_rows', _server.execute_rows)
+    monkeypatch.setattr(provisioning, 'connect', _server.connect)
+    return _server
+
+
+@pytest.mark.parametrize(
+    'server',
+    [
+        lambda: _Server(
+            {'old': {'extensions': {'postgis'}, 'schemas': set()}}
+        )
+    ],
+    indirect=True
+)
+def test_provision_creates_missing_objects_in_order(server: _Server):
+    """
+    Arrange: Stub a server with one of the two databases (and one of its
+        extensions).
+    Act: Provision both databases.
+    Assert: Only the missing objects are created, extensions before
+        schemas, on one connection per database, and every connection is
+        closed.
+    """
+    report = provision(
+        'postgresql://localhost',
+        {
+            'old': {'extensions': ['postgis', 'hstore'], 'schemas': ['raw']},
+            'new': {'extensions': ['postgis'], 'schemas': ['raw', 'app']}
+        },
+        max_workers=1
+    )
+    assert [(s.dbname, s.kind) for s in report.steps[:2]] == [
+        ('old', DATABASE), ('new', DATABASE)
+    ]
+    # (The existing database is provisioned while the new one is created,
+    # so only the order within each database is fixed.)
+    assert sorted((s.dbname, s.name) for s in report.created) == [
+        ('new', 'app'), ('new', 'new'), ('new', 'postgis'), ('new', 'raw'),
+        ('old', 'hstore'), ('old', 'raw')
+    ]
+    for dbname, phrases in (
+            ('postgres', ['create_db']),
+            ('old', ['create_extension', 'create_schema']),
+            ('new', ['create_extension', 'create_schema', 'create_schema'])
+    ):
+        assert [p for db, p, _ in server.log if db == dbname] == phrases
+    assert [n for db, _, n in server.log if db == 'new'] == [
+        'postgis', 'raw', 'app'
+    ]
+    assert sorted(c.dbname for c in server.connections) == [
+        'new', 'old', 'postgres'
+    ]
+    assert all(c.closed for c in server.connections)
+    assert server.databases['new'] == {
+        'extensions': {'postgis'}, 'schemas': {'raw', 'app'}
+    }
+
+
+@pytest.mark.parametrize(
+    'server',
+    [lambda: _Server({}, barrier=threading.Barrier(2, timeout=5))],
+    indirect=True
+)
+def test_provision_works_on_databases_in_parallel(server: _Server):
+    """
+    Arrange: Stub a server whose extensions can only be created when two
+        databases are being provisioned at once.
+    Act: Provision two new databases with two workers.
+    Assert: Nothing fails.
+    """
+    report = provision(
+        'postgresql://localhost',
+        {
+            'a': {'extensions': ['postgis']},
+            'b': {'extensions': ['postgis']}
+        },
+        max_workers=2
+    )
+    assert not report.errors
+    assert len(report.created) == 4
+
+
+@pytest.mark.parametrize(
+    'server',
+    [lambda: _Server({}, fail=('create_extension', 'broken'))],
+    indirect=True
+)
+def test_provision_failures_are_isolated(server: _Server):
+    """
+    Arrange: Stub a server on which one extension can't be created.
+    Act: Provision two databases, one of which needs the extension.
+    Assert: The failing database's remaining steps are skipped, the other
+        database is provisioned, and the error is raised with the report.
+    """
+    with pytest.raises(ProvisioningError) as info:
+        provision(
+            'postgresql://localhost',
+            {
+                'bad': {'extensions': ['broken'], 'schemas': ['raw']},
+                'good': {'schemas': ['raw']}
+            }
+        )
+    report = info.value.report
+    assert [(s.dbname, s.name) for s in report.errors] == [('bad', 'broken')]
+    assert str(info.value.inner) == 'broken failed'
+    assert ('bad', 'create_schema', 'raw') not in server.log
+    assert ('good', 'create_schema', 'raw') in server.log
+
+
+@pytest.mark.parametrize(
+    'spec',
+    [
+        {'tenant': ['postgis']},
+        {'tenant': {'schema': ['raw']}},
+        {'tenant': {'schemas': 3}}
+    ]
+)
+def test_provision_rejects_malformed_specs(server: _Server, spec):
+    """
+    Arrange/Act: Provision a malformed specification.
+    Assert: A `ValueError` is raised before anything is done.
+    """
+    with pytest.raises(ValueError):
+        provision('postgresql://localhost', spec)
+    assert not server.connections
+
+
+def test_provision_accepts_lone_names_and_empty_databases(server: _Server):
+    """
+    Arrange/Act: Provision a database given without a mapping, and another
+        with a lone schema name.
+    Assert: The databases and the schema are created.
+    """
+    report = provision(
+        'postgresql://localhost', {'empty': None, 'tenant': {'schemas': 'raw'}}
+    )
+    assert [s.name for s in report.created] == ['empty', 'tenant', 'raw']
+
+
+def test_provisioning_error_without_errors():
+    """
+    Arrange/Act: Create a provisioning error for a report with no failures.
+    Assert: The error has no inner exception.
+    """
+    assert ProvisioningError('nothing', ProvisionReport()).inner is None
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_replication
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the logical replication consumer.
+"""
+import json
+from normanpg.replication import (
+    decode_test_decoding, decode_wal2json, ChangeStream, FileLsnStore,
+    lsn_to_str, str_to_lsn
+)
+
+
+def test_lsn_round_trip():
+    """
+    Arrange/Act: Format an LSN and parse it again.
+    Assert: The formatted LSN looks like Postgres's and survives the trip.
+    """
+    assert lsn_to_str(0x16B3748) == '0/16B3748'
+    assert str_to_lsn('1/2A') == (1 << 32) + 0x2A
+    assert str_to_lsn(lsn_to_str(0x12345678ABCD)) == 0x12345678ABCD
+
+
+def test_decode_wal2json():
+    """
+    Arrange: Create `wal2json` messages for a transaction and an update.
+    Act: Decode them.
+    Assert: Only the update produces a change, with its new and old values.
+    """
+    assert decode_wal2json(1, json.dumps({'action': 'B'})) == []
+    events = decode_wal2json(42, json.dumps({
+        'action': 'U',
+        'schema': 'public',
+        'table': 'parcels',
+        'columns': [
+            {'name': 'id', 'value': 7}, {'name': 'owner', 'value': 'Pat'}
+        ],
+        'identity': [{'name': 'id', 'value': 6}]
+    }))
+    assert len(events) == 1
+    event = events[0]
+    assert (event.lsn, event.op, event.table) == (42, 'UPDATE', 'parcels')
+    assert event.columns == {'id': 7, 'owner': 'Pat'}
+    assert event.old_keys == {'id': 6}
+
+
+def test_decode_test_decoding():
+    """
+    Arrange: Create `test_decoding` messages.
+    Act: Decode them.
+    Assert: The changes carry the decoded values.
+    """
+    assert decode_test_decoding(1, 'BEGIN 529') == []
+    insert, = decode_test_decoding(
+        2,
+        "table public.data: INSERT: id[integer]:1 "
+        "data[text]:'it''s here' note[character varying]:null"
+    )
+    assert insert.op == 'INSERT'
+    assert insert.columns == {'id': '1', 'data': "it's here", 'note': None}
+    update, = decode_test_decoding(
+        3,
+        "table public.data: UPDATE: old-key: id[integer]:1 "
+        "new-tuple: id[integer]:2 data[text]:'x'"
+    )
+    assert update.old_keys == {'id': '1'}
+    assert update.columns == {'id': '2', 'data': 'x'}
+    delete, = decode_test_decoding(
+        4, 'table public.data: DELETE: id[integer]:2'
+    )
+    assert (delete.op, delete.columns, delete.old_keys) == (
+        'DELETE', {}, {'id': '2'}
+    )
+
+
+def test_file_lsn_store(tmp_path):
+    """
+    Arrange: Create an LSN store.
+    Act: Save an LSN.
+    Assert: The LSN can be loaded again.
+    """
+    store = FileLsnStore(tmp_path / 'slot.lsn')
+    assert store.load() is None
+    store.save(0x16B3748)
+    assert FileLsnStore(tmp_path / 'slot.lsn').load() == 0x16B3748
+
+
+class _Message:
+    """
+    A stand-in for a replication message.
+    """
+    def __init__(self, lsn: int, payload: str):
+        self.data_start = lsn
+        self.payload = payload
+
+
+class _ReplicationCursor:
+    """
+    A stand-in for a replication cursor that plays back messages and records
+    the feedback it's sent.
+    """
+    def __init__(self, messages: list, wal_end: int):
+        self._messages = messages
+        self.wal_end = wal_end
+        self.feedback = []
+
+    def read_message(self):
+        return self._messages.pop(0) if self._messages else None
+
+    def send_feedback(self, flush_lsn: int, reply: bool = False):
+        self.feedback.append(flush_lsn)
+
+
+def _stream(messages: list, wal_end: int) -> ChangeStream:
+    stream = ChangeStream('postgresql://localhost/gis', 'slot',
+                          plugin='test_decoding')
+    # Pretend the stream is open.
+    stream._cnx = object()  # pylint: disable=protected-access
+    stream._crs = _ReplicationCursor(messages, wal_end)
+    return stream
+
+
+def test_idle_stream_advances_the_slot():
+    """
+    Arrange: Create a stream that receives keepalives and transaction
+        boundaries.
+    Act: Read batches as a transaction opens and closes, then deliver a
+        change and read again.
+    Assert: The server's position is only confirmed when the stream is idle,
+        outside a transaction, and every change has been acknowledged.
+    """
+    stream = _stream([_Message(10, 'BEGIN 1')], 50)
+    crs = stream._crs  # pylint: disable=protected-access
+    # (With no time to wait, each read handles one message at most.)
+    assert stream.read_batch(timeout=0) == []
+    assert stream.read_batch(timeout=0) == []
+    assert crs.feedback == []
+    crs._messages.append(_Message(11, 'COMMIT 1'))  # pylint: disable=W0212
+    assert stream.read_batch(timeout=0) == []
+    assert stream.read_batch(timeout=0) == []
+    assert crs.feedback == [50]
+    assert stream.acked_lsn == 50
+    crs._messages.append(  # pylint: disable=protected-access
+        _Message(60, 'table public.data: DELETE: id[integer]:2')
+    )
+    crs.wal_end = 70
+    batch = stream.read_batch(timeout=0)
+    assert [e.lsn for e in batch] == [60]
+    assert stream.read_batch(timeout=0) == []
+    assert crs.feedback == [50]
+    stream.ack(batch)
+    crs.wal_end = 80
+    assert stream.read_batch(timeout=0) == []
+    assert crs.feedback == [50, 60, 80]
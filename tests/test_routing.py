@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_routing
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the read/write router.
+"""
+import threading
+import time
+import pytest
+import normanpg.routing as routing
+from normanpg.routing import LEAST_OUTSTANDING, Router
+
+
+class _FixedLagRouter(Router):
+    """
+    A router whose replicas report fixed lags.
+    """
+    def __init__(self, lags, **kwargs):
+        super().__init__('primary', list(lags), **kwargs)
+        self._lags = lags
+        self.refresh()
+
+    def measure_lag(self, url):
+        lag = self._lags[url]
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+
+def test_round_robin_skips_lagging_replicas():
+    """
+    Arrange: Create a router with one replica that lags too far behind.
+    Act: Get the URLs for several reads.
+    Assert: The reads alternate between the healthy replicas.
+    """
+    urls = []
+    with _FixedLagRouter(
+            {'r1': 0.0, 'r2': 30.0, 'r3': 1.0}, max_lag=5.0
+    ) as router:
+        for _ in range(4):
+            with router.read_url() as url:
+                urls.append(url)
+    assert urls == ['r1', 'r3', 'r1', 'r3']
+
+
+def test_reads_fall_back_to_the_primary():
+    """
+    Arrange: Create a router whose replicas are unhealthy or unreachable.
+    Act: Get the URL for a read.
+    Assert: The read goes to the primary.
+    """
+    with _FixedLagRouter(
+            {'r1': 30.0, 'r2': OSError('unreachable')}, max_lag=5.0
+    ) as router:
+        with router.read_url() as url:
+            assert url == 'primary'
+
+
+def test_least_outstanding_prefers_idle_replicas():
+    """
+    Arrange: Create a least-outstanding router.
+    Act: Start a read and, while it's in flight, start another.
+    Assert: The second read goes to the other replica.
+    """
+    with _FixedLagRouter(
+            {'r1': 0.0, 'r2': 0.0}, strategy=LEAST_OUTSTANDING
+    ) as router:
+        with router.read_url() as first:
+            with router.read_url() as second:
+                assert first != second
+        assert all(r.outstanding == 0 for r in router.replicas)
+
+
+def test_pinned_session_reads_from_the_primary():
+    """
+    Arrange: Create a router that reads its own writes.
+    Act: Pin a session (as a write would) and then unpin it.
+    Assert: Pinned reads go to the primary.
+    """
+    with _FixedLagRouter({'r1': 0.0}, read_your_writes=True) as router:
+        session = router.session()
+        session.pin()
+        assert session.pinned
+        with router.read_url(pinned=session.pinned) as url:
+            assert url == 'primary'
+        session.unpin()
+        with router.read_url(pinned=session.pinned) as url:
+            assert url == 'r1'
+
+
+class _StalledRouter(Router):
+    """
+    A router whose replica's lag can't be measured until it's released.
+    """
+    def __init__(self):
+        super().__init__('primary', ['r1'], lag_check_interval=0.01)
+        self.release = threading.Event()
+
+    def measure_lag(self, url):
+        self.release.wait(5)
+        return 0.0
+
+
+def test_reads_do_not_wait_for_lag_measurements():
+    """
+    Arrange: Create a router whose replica doesn't answer.
+    Act: Get the URL for a read, then let the replica answer.
+    Assert: The read goes to the primary without waiting, and reads go to
+        the replica once its lag has been measured in the background.
+    """
+    with _StalledRouter() as router:
+        started = time.monotonic()
+        with router.read_url() as url:
+            assert url == 'primary'
+        assert time.monotonic() - started < 1.0
+        router.release.set()
+        for _ in range(500):
+            if router.healthy():
+                break
+            time.sleep(0.01)
+        with router.read_url() as url:
+            assert url == 'r1'
+
+
+class _Connection:
+    """
+    A stand-in for a connection that records how it's used.
+    """
+    def __init__(self, url):
+        self.url = url
+        self.closed = 0
+        self.log = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.log.append('commit' if type_ is None else 'rollback')
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """
+    Stand in for connections (and the queries run on them).
+
+    :return: the connections opened, in order
+    """
+    opened = []
+
+    def _connect(url):
+        opened.append(_Connection(url))
+        return opened[-1]
+
+    def _execute_scalar(cnx, query, caller, timeout=None):
+        if query == 'FAIL':
+            cnx.closed = 2  # (as if the server went away)
+            raise OSError('The connection was lost.')
+        return cnx.url
+
+    monkeypatch.setattr(routing, 'connect', _connect)
+    monkeypatch.setattr(routing, 'execute_scalar', _execute_scalar)
+    monkeypatch.setattr(
+        routing, 'execute_rows', lambda cnx, **_: iter([cnx.url])
+    )
+    monkeypatch.setattr(routing, 'execute', lambda **_: None)
+    return opened
+
+
+def test_queries_reuse_connections(connections):
+    """
+    Arrange: Create a router with a replica.
+    Act: Read and write several times, then close the router.
+    Assert: One connection is opened for each database and reused, each
+        query's transaction ends before its connection is reused, and closing
+        the router closes the connections.
+    """
+    with _FixedLagRouter({'r1': 0.0}) as router:
+        for _ in range(3):
+            assert router.execute_scalar('SELECT') == 'r1'
+            assert list(router.execute_rows('SELECT')) == ['r1']
+            assert router.execute_scalar('UPDATE', write=True) == 'primary'
+            router.execute('UPDATE')
+        assert sorted(c.url for c in connections) == ['primary', 'r1']
+        assert all(not c.closed for c in connections)
+        assert all(c.log == ['commit'] * 6 for c in connections)
+    assert all(c.closed for c in connections)
+
+
+def test_pool_discards_broken_and_surplus_connections(connections):
+    """
+    Arrange: Create a router that keeps one idle connection per database.
+    Act: Run two reads at once, then a read that breaks its connection.
+    Assert: Only one connection is kept after the concurrent reads, and the
+        broken connection is replaced.
+    """
+    with Router('primary', pool_size=1) as router:
+        with router.connection('primary') as first, \
+                router.connection('primary') as second:
+            assert first is not second
+        assert (first.closed, second.closed) == (1, 0)
+        with pytest.raises(OSError):
+            router.execute_scalar('FAIL')
+        assert second.log == ['commit', 'rollback']
+        assert router.execute_scalar('SELECT') == 'primary'
+        assert len(connections) == 3 and not connections[-1].closed
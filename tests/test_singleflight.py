@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_singleflight
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the single-flight module.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from psycopg2.sql import Literal, SQL
+from normanpg.singleflight import query_key, SingleFlight
+
+
+def _gated(release: threading.Event, calls: list, result=None, error=None):
+    """
+    Make a function that counts its calls and blocks until it's released.
+    """
+    def _fn():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+    return _fn
+
+
+def _wait_for_waiters(flight: SingleFlight, count: int):
+    """
+    Wait until a number of callers have joined the call in flight.
+    """
+    for _ in range(500):
+        if flight.coalesced >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError('The callers never joined.')
+
+
+def test_threads_share_one_execution():
+    """
+    Arrange: Create a single-flight group.
+    Act: Make the same call from several threads at once.
+    Assert: The function runs once and every thread gets its result.
+    """
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    fn = _gated(release, calls, result=4326)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(flight.do, 'srid', fn) for _ in range(8)]
+        _wait_for_waiters(flight, 7)
+        release.set()
+        results = [f.result() for f in futures]
+    assert results == [4326] * 8
+    assert len(calls) == 1
+    assert (flight.executions, flight.coalesced, flight.in_flight) == (1, 7, 0)
+    # Once the call has finished, the next one runs again.
+    assert flight.do('srid', lambda: 3857) == 3857
+
+
+def test_waiters_share_errors():
+    """
+    Arrange: Create a single-flight group and a function that fails.
+    Act: Make the same call from several threads at once.
+    Assert: Every thread sees the same exception.
+    """
+    flight = SingleFlight()
+    release = threading.Event()
+    error = ValueError('no such table')
+    fn = _gated(release, [], error=error)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flight.do, 'x', fn) for _ in range(4)]
+        _wait_for_waiters(flight, 3)
+        release.set()
+        assert all(f.exception() is error for f in futures)
+
+
+def test_tasks_and_threads_coalesce():
+    """
+    Arrange: Create a single-flight group.
+    Act: Make the same call from a thread and several `asyncio` tasks.
+    Assert: The function runs once and every caller gets its result.
+    """
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    fn = _gated(release, calls, result='ok')
+
+    async def _main():
+        tasks = [
+            asyncio.ensure_future(flight.do_async('k', fn)) for _ in range(5)
+        ]
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _wait_for_waiters, flight, 4)
+        waiter = threading.Thread(target=lambda: flight.do('k', fn))
+        waiter.start()
+        await loop.run_in_executor(None, _wait_for_waiters, flight, 5)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        waiter.join()
+        return results
+
+    assert asyncio.run(_main()) == ['ok'] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 5
+
+
+def test_query_key():
+    """
+    Arrange/Act: Get the keys of equivalent and different queries.
+    Assert: Only the equivalent queries have the same key.
+    """
+    url = 'postgresql://localhost/gis'
+
+    def _query(srid):
+        return SQL('SELECT {}').format(Literal(srid))
+
+    assert query_key(url, _query(4326), 'scalar') == query_key(
+        url, _query(4326), 'scalar'
+    )
+    assert query_key(url, _query(4326), 'scalar') != query_key(
+        url, _query(3857), 'scalar'
+    )
+    assert query_key(url, 'SELECT 1', 'rows') != query_key(
+        'postgresql://localhost/other', 'SELECT 1', 'rows'
+    )
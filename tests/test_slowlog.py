@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_slowlog
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the slow query recorder.
+"""
+import json
+import psycopg2
+import pytest
+from normanpg.pg import ExecuteEvent
+from normanpg.slowlog import explain, is_read_only, SlowQueryRecorder
+
+
+@pytest.mark.parametrize(
+    'sql,expected',
+    [
+        ('SELECT * FROM t', True),
+        ('  with x AS (SELECT 1) SELECT * FROM x', True),
+        ('WITH x AS (DELETE FROM t RETURNING *) SELECT * FROM x', False),
+        ('SELECT * FROM t FOR UPDATE', False),
+        ('INSERT INTO t VALUES (1)', False)
+    ]
+)
+def test_is_read_only(sql: str, expected: bool):
+    """
+    Arrange/Act: Test whether a statement is read-only.
+    Assert: The result is as expected.
+    """
+    assert is_read_only(sql) == expected
+
+
+def test_recorder_records_only_slow_queries(tmp_path):
+    """
+    Arrange: Create a recorder.
+    Act: Pass it a fast event and a slow event.
+    Assert: Only the slow event is written to the file.
+    """
+    path = tmp_path / 'slow.jsonl'
+    recorder = SlowQueryRecorder(str(path), threshold=0.5)
+    for caller, elapsed in (('fast', 0.1), ('slow', 0.9)):
+        event = ExecuteEvent(caller=caller, sql='SELECT 1', cursor=None)
+        event.elapsed = elapsed
+        recorder.after_execute(event)
+    recorder.close()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r['caller'] for r in records] == ['slow']
+    assert records[0]['elapsed'] == 0.9
+
+
+class _Cursor:
+    """
+    A stand-in for a cursor that records the statements it executes.
+    """
+    def __init__(self, statements: list, fail: bool):
+        self._statements = statements
+        self._fail = fail
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        pass
+
+    def execute(self, sql, params=None):
+        self._statements.append((sql, params) if params else sql)
+        if self._fail and sql.startswith('EXPLAIN'):
+            raise psycopg2.Error('canceled')
+
+    def fetchone(self):
+        return [{'Plan': {}}]
+
+
+class _Connection:
+    """
+    A stand-in for a connection whose cursors record their statements.
+    """
+    def __init__(self, autocommit: bool, fail: bool = False):
+        self.autocommit = autocommit
+        self.statements = []
+        self._fail = fail
+
+    def cursor(self):
+        return _Cursor(self.statements, self._fail)
+
+
+def test_explain_runs_in_a_read_only_transaction():
+    """
+    Arrange: Create connections in and out of `autocommit` mode.
+    Act: Explain a query on each of them.
+    Assert: The plan query is limited, read-only, and rolled back.
+    """
+    timeout = ("SELECT set_config('statement_timeout', %s, true)", ('1500',))
+    explained = 'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) SELECT 1'
+    cnx = _Connection(autocommit=True)
+    assert explain(cnx, 'SELECT 1', timeout=1.5) == {'Plan': {}}
+    assert cnx.statements == [
+        'BEGIN', 'SET TRANSACTION READ ONLY', timeout, explained, 'ROLLBACK'
+    ]
+    cnx = _Connection(autocommit=False, fail=True)
+    with pytest.raises(psycopg2.Error):
+        explain(cnx, 'SELECT 1', timeout=1.5)
+    assert cnx.statements == [
+        'SAVEPOINT normanpg_explain',
+        'SET LOCAL transaction_read_only = on',
+        timeout,
+        explained,
+        'ROLLBACK TO SAVEPOINT normanpg_explain',
+        'RELEASE SAVEPOINT normanpg_explain'
+    ]
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_tables
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the table-level functions.
+"""
+from pathlib import Path
+import pytest
+from psycopg2.sql import SQL
+import normanpg.functions.tables as tables
+from normanpg.functions.tables import (
+    audit_spatial_indexes, create_spatial_index, sample_rows,
+    IndexNameTaken, MAX_IDENTIFIER_BYTES
+)
+
+
+class _Phrasebook:
+    """
+    A stand-in for the module's phrasebook that reads the phrase files
+    directly.
+    """
+    def sql(self, phrase: str) -> SQL:
+        path = Path(tables.__file__).with_suffix('.phr') / f'{phrase}.sql'
+        return SQL(path.read_text())
+
+
+class _Connection:
+    """
+    A stand-in for an autocommit connection.
+    """
+    autocommit = True
+
+
+@pytest.fixture
+def phrasebook(monkeypatch):
+    """
+    Replace the module's phrasebook with one that reads the phrase files.
+    """
+    monkeypatch.setattr(tables, '_PHRASEBOOK', _Phrasebook())
+
+
+@pytest.mark.parametrize(
+    'kwargs',
+    [
+        {'percent': 1, 'method': 'RANDOM'},
+        {}
+    ]
+)
+def test_sample_rows_validates_arguments(kwargs):
+    """
+    Arrange/Act: Ask for a sample with an unknown method, or without saying
+        how big the sample should be.
+    Assert: A `ValueError` is raised before anything is sent to the database.
+    """
+    with pytest.raises(ValueError):
+        sample_rows(
+            cnx='postgresql://localhost/nowhere',
+            table_name='t',
+            schema_name='s',
+            **kwargs
+        )
+
+
+def test_create_spatial_index_validates_arguments():
+    """
+    Arrange/Act: Ask for a spatial index with an unknown method.
+    Assert: A `ValueError` is raised before anything is sent to the database.
+    """
+    with pytest.raises(ValueError):
+        create_spatial_index(
+            cnx='postgresql://localhost/nowhere',
+            table_name='t',
+            schema_name='s',
+            method='BTREE'
+        )
+
+
+@pytest.mark.usefixtures('phrasebook')
+def test_audit_reports_invalid_and_partial_indexes(monkeypatch):
+    """
+    Arrange: Stub the query so that one column has only an invalid index,
+        another has only a partial index, and a third has none.
+    Act: Audit the schema's spatial indexes.
+    Assert: Every column is reported along with its unusable indexes.
+    """
+    rows = [
+        ('roads', 'geom', 1000, 81920, ['roads_geom_idx'], []),
+        ('parcels', 'geom', 500, 40960, [], ['parcels_geom_recent_idx']),
+        ('points', 'geom', None, 8192, [], [])
+    ]
+    monkeypatch.setattr(
+        tables, 'execute_rows', lambda cnx, query, timeout=None: iter(rows)
+    )
+    report = audit_spatial_indexes(_Connection(), 'public')
+    assert [r['table_name'] for r in report] == ['roads', 'parcels', 'points']
+    assert report[0]['invalid_indexes'] == ['roads_geom_idx']
+    assert report[0]['partial_indexes'] == []
+    assert report[1]['invalid_indexes'] == []
+    assert report[1]['partial_indexes'] == ['parcels_geom_recent_idx']
+    assert report[2]['estimated_rows'] is None
+    assert report[2]['invalid_indexes'] == report[2]['partial_indexes'] == []
+
+
+@pytest.mark.usefixtures('phrasebook')
+def test_long_index_names_are_truncated(monkeypatch):
+    """
+    Arrange: Stub a table with a long name whose earlier concurrent build
+        left an invalid index behind (under the name PostgreSQL truncated).
+    Act: Create the spatial index.
+    Assert: The invalid index is dropped and the new one is created under
+        the same, truncated name, which keeps its suffix.
+    """
+    table_name = 'a_table_with_a_name_that_is_far_too_long_to_be_indexed_as_is'
+    monkeypatch.setattr(
+        tables, '_require_geometry_column', lambda **_: 'geom'
+    )
+    invalid = (
+        table_name[:MAX_IDENTIFIER_BYTES - len('_geom_idx')] + '_geom_idx'
+    )
+    monkeypatch.setattr(
+        tables,
+        '_spatial_indexes',
+        lambda **_: [
+            {
+                'index_name': invalid,
+                'usable': False,
+                'valid': False,
+                'partial': False
+            }
+        ]
+    )
+    executed = []
+    monkeypatch.setattr(
+        tables, 'execute', lambda cnx, query, **_: executed.append(query)
+    )
+    name = create_spatial_index(
+        cnx=_Connection(),
+        table_name=table_name,
+        schema_name='public',
+        analyze=False
+    )
+    assert name == invalid
+    assert len(name) == MAX_IDENTIFIER_BYTES
+    drop, create = executed
+    assert invalid in repr(drop)
+    assert invalid in repr(create)
+
+
+@pytest.mark.usefixtures('phrasebook')
+def test_valid_partial_indexes_are_never_dropped(monkeypatch):
+    """
+    Arrange: Stub a table with a valid partial index under the name the
+        spatial index would get.
+    Act: Create the spatial index.
+    Assert: The partial index isn't dropped, and an error is raised.
+    """
+    monkeypatch.setattr(
+        tables, '_require_geometry_column', lambda **_: 'geom'
+    )
+    monkeypatch.setattr(
+        tables,
+        '_spatial_indexes',
+        lambda **_: [
+            {
+                'index_name': 'parcels_geom_idx',
+                'usable': False,
+                'valid': True,
+                'partial': True
+            }
+        ]
+    )
+    executed = []
+    monkeypatch.setattr(
+        tables, 'execute', lambda cnx, query, **_: executed.append(query)
+    )
+    with pytest.raises(IndexNameTaken):
+        create_spatial_index(
+            cnx=_Connection(), table_name='parcels', schema_name='public'
+        )
+    assert executed == []
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. currentmodule:: test_tiles
+.. moduleauthor:: Pat Daburu <pat@daburu.net>
+
+This is the test module for the vector tile functions and caches.
+"""
+import pytest
+from normanpg.tiles import (
+    DiskTileCache, LayeredTileCache, MemoryTileCache, TileCache,
+    lonlat_to_mercator, ORIGIN_SHIFT, tile_bounds, tiles_for_bbox
+)
+
+
+def test_tile_bounds_cover_the_grid():
+    """
+    Arrange/Act: Get the bounds of the single tile at zoom level zero.
+    Assert: The tile covers the whole grid.
+    """
+    assert tile_bounds(0, 0, 0) == pytest.approx(
+        (-ORIGIN_SHIFT, -ORIGIN_SHIFT, ORIGIN_SHIFT, ORIGIN_SHIFT)
+    )
+
+
+def test_tiles_for_bbox_finds_covering_tiles():
+    """
+    Arrange: Get the bounds of a tile, shrunk slightly.
+    Act: Get the tiles that cover the bounds at the same and next zoom level.
+    Assert: The tile (and its four children) are found.
+    """
+    minx, miny, maxx, maxy = tile_bounds(3, 2, 5)
+    bbox = (minx + 1, miny + 1, maxx - 1, maxy - 1)
+    assert list(tiles_for_bbox(bbox, 3)) == [(3, 2, 5)]
+    assert sorted(tiles_for_bbox(bbox, 4)) == [
+        (4, 4, 10), (4, 4, 11), (4, 5, 10), (4, 5, 11)
+    ]
+
+
+def test_lonlat_to_mercator():
+    """
+    Arrange/Act: Convert the origin and the antimeridian.
+    Assert: The coordinates are as expected.
+    """
+    assert lonlat_to_mercator(0, 0) == pytest.approx((0, 0), abs=1e-6)
+    assert lonlat_to_mercator(180, 0)[0] == pytest.approx(ORIGIN_SHIFT)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    """
+    Arrange: Create a memory cache that holds two tiles.
+    Act: Put three tiles (after touching the first).
+    Assert: The second tile is evicted.
+    """
+    cache = MemoryTileCache(max_tiles=2)
+    cache.put(('a', 0, 0, 0), b'0')
+    cache.put(('a', 1, 0, 0), b'1')
+    cache.get(('a', 0, 0, 0))
+    cache.put(('a', 1, 1, 0), b'2')
+    assert cache.get(('a', 1, 0, 0)) is None
+    assert cache.get(('a', 0, 0, 0)) == b'0'
+
+
+def test_layered_cache_backfills_and_invalidates(tmp_path):
+    """
+    Arrange: Put tiles into a disk cache behind a memory cache.
+    Act: Get a tile, then invalidate a box around one tile.
+    Assert: The tile is copied into the memory cache, and only the tiles
+        that intersect the box are removed.
+    """
+    memory = MemoryTileCache()
+    disk = DiskTileCache(tmp_path)
+    cache = LayeredTileCache(memory, disk)
+    disk.put(('roads', 2, 0, 0), b'nw')
+    disk.put(('roads', 2, 3, 3), b'se')
+    assert (tmp_path / 'roads' / '2' / '0' / '0.mvt').exists()
+    assert cache.get(('roads', 2, 0, 0)) == b'nw'
+    assert memory.get(('roads', 2, 0, 0)) == b'nw'
+    minx, miny, maxx, maxy = tile_bounds(2, 3, 3)
+    assert cache.invalidate('roads', (minx + 1, miny + 1, maxx, maxy)) == 1
+    assert cache.get(('roads', 2, 3, 3)) is None
+    assert cache.get(('roads', 2, 0, 0)) == b'nw'
+
+
+def test_incomplete_caches_cannot_be_created():
+    """
+    Arrange: Extend the tile cache without implementing `invalidate`.
+    Act: Create an instance.
+    Assert: A `TypeError` is raised.
+    """
+    class _Incomplete(TileCache):
+        def get(self, key):
+            return None
+
+        def put(self, key, tile):
+            pass
+
+    with pytest.raises(TypeError):
+        _Incomplete()